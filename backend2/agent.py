@@ -4,9 +4,26 @@ Erfasst konversationell Budget, Lieferfrist, Präferenzen und erzeugt einen stru
 """
 
 import json
+import re
 from datetime import date
+from typing import Generator, Iterator
 
-from config import GOOGLE_API_KEY, GEMINI_MODEL
+import llm_gateway
+from brief_extractor import extract_brief, is_brief_complete, merge_brief
+from config import BRIEF_FAST_PATH, CHAT_CONTEXT_MESSAGES, CHAT_FOLLOWUP_MODE, CHAT_SUMMARY_MAX_CHARS
+
+_SAVED_REPLY = "Alles klar, ich habe deine Angaben gespeichert."
+_MAX_FOLLOWUPS = 2  # wie im System-Prompt: höchstens 2 Nachfragen
+
+# Grobe Spracherkennung für die lokalen Rückfragen (die es nur auf Deutsch gibt)
+_GERMAN_WORDS = frozenset(
+    "ich du wir und oder der die das den dem ein eine einen für mit bis von auf ist nicht brauche möchte "
+    "suche bitte kein keine mein meine personen größe".split()
+)
+_FOREIGN_WORDS = frozenset(
+    "i you we and or the a an for with by from on is not need want looking please my size people "
+    "je nous et pour avec le la les besoin yo para con el los necesito".split()
+)
 
 
 def _today() -> str:
@@ -77,10 +94,8 @@ _REQUIREMENTS_PROPERTIES = {
 
 
 def _build_gemini_config():
-    from google import genai
     from google.genai import types
 
-    client = genai.Client(api_key=GOOGLE_API_KEY)
     tools = types.Tool(
         function_declarations=[
             {
@@ -101,83 +116,350 @@ def _build_gemini_config():
         automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
         temperature=0.7,
     )
-    return client, config
+    return config
+
+
+def _split_history(conversation: list[dict], keep: int) -> tuple[list[dict], list[dict]]:
+    """(ältere, letzte) Nachrichten; das Fenster der letzten beginnt immer mit einer Nutzernachricht."""
+    start = max(0, len(conversation) - keep)
+    while start < len(conversation) and conversation[start]["role"] == "assistant":
+        start += 1
+    if start >= len(conversation):
+        start = max(0, len(conversation) - 1)
+    return conversation[:start], conversation[start:]
+
+
+def _summarize_history(messages: list[dict], max_chars: int) -> str:
+    """Kompakte Zusammenfassung ohne Modellaufruf: eine gekürzte Zeile pro Nachricht, neueste zuerst behalten."""
+    lines: list[str] = []
+    used = 0
+    for msg in reversed(messages):
+        content = " ".join(msg["content"].split())
+        if len(content) > 120:
+            content = content[:117] + "..."
+        line = f"{'Agent' if msg['role'] == 'assistant' else 'Nutzer'}: {content}"
+        if used + len(line) > max_chars:
+            lines.append("…")
+            break
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(reversed(lines))
+
+
+def _compact_brief(requirements: dict) -> str:
+    # Leere Felder weglassen, kein Einrücken – spart Tokens bei jedem Aufruf
+    return json.dumps({k: v for k, v in requirements.items() if v not in (None, "", [])}, ensure_ascii=False)
 
 
 def _build_contents(conversation: list[dict], current_requirements: dict | None) -> list:
+    """
+    Prompt mit begrenzter Größe: Brief + Zusammenfassung älterer Nachrichten vor der ersten
+    Nachricht im Fenster, danach nur die letzten CHAT_CONTEXT_MESSAGES Nachrichten im Wortlaut.
+    """
     from google.genai import types
 
+    older, recent = _split_history(conversation, CHAT_CONTEXT_MESSAGES)
+    header: list[str] = []
+    if current_requirements:
+        header.append("Aktueller Brief:\n" + _compact_brief(current_requirements))
+    if older:
+        header.append("Bisheriger Verlauf (gekürzt):\n" + _summarize_history(older, CHAT_SUMMARY_MAX_CHARS))
+
     contents = []
-    for msg in conversation:
+    for msg in recent:
         role = "model" if msg["role"] == "assistant" else "user"
         text = msg["content"]
-        if not contents and role == "user" and current_requirements:
-            text = (
-                "Aktueller Brief:\n"
-                + json.dumps(current_requirements, indent=2, ensure_ascii=False)
-                + "\n\n---\nNächste Nutzernachricht:\n"
-                + text
-            )
+        if not contents and role == "user" and header:
+            text = "\n\n".join(header) + "\n\n---\nNächste Nutzernachricht:\n" + text
         contents.append(types.Content(role=role, parts=[types.Part(text=text)]))
     return contents
 
 
+def _tool_call(part) -> dict | None:
+    if not (part.function_call and part.function_call.name):
+        return None
+    fc = part.function_call
+    args = dict(fc.args) if fc.args else {}
+    for k, v in args.items():
+        if hasattr(v, "__iter__") and not isinstance(v, str):
+            args[k] = list(v)
+    return {"name": fc.name, "arguments": args}
+
+
 def _parse_gemini_response(response) -> tuple[list[str], list[dict]]:
     tool_calls = []
     text_parts = []
     if not response.candidates or not response.candidates[0].content:
         return text_parts, tool_calls
     for part in response.candidates[0].content.parts:
-        if part.function_call and part.function_call.name:
-            fc = part.function_call
-            args = dict(fc.args) if fc.args else {}
-            for k, v in args.items():
-                if hasattr(v, "__iter__") and not isinstance(v, str):
-                    args[k] = list(v)
-            tool_calls.append({"name": fc.name, "arguments": args})
+        tc = _tool_call(part)
+        if tc:
+            tool_calls.append(tc)
         elif part.text:
             text_parts.append(part.text)
     return text_parts, tool_calls
 
 
-def process_message(
+def _function_responses(tool_calls: list[dict]):
+    from google.genai import types
+
+    return types.Content(
+        role="user",
+        parts=[
+            types.Part.from_function_response(name=tc["name"], response={"result": {"status": "ok"}})
+            for tc in tool_calls
+        ],
+    )
+
+
+def _fast_path(
     conversation_history: list[dict],
     current_requirements: dict | None,
+) -> tuple[list[dict], dict | None, bool]:
+    """
+    Regelbasierte Erkennung vor dem Modell (brief_extractor).
+    Rückgabe: (Tool-Calls aus den Regeln, Brief inkl. dieser Werte, Brief damit vollständig?).
+    """
+    if not BRIEF_FAST_PATH or not conversation_history or conversation_history[-1]["role"] != "user":
+        return [], current_requirements, False
+    if current_requirements and current_requirements.get("is_complete"):
+        return [], current_requirements, False
+    update = extract_brief(conversation_history[-1]["content"])
+    if not update:
+        return [], current_requirements, False
+    merged = merge_brief(current_requirements, update)
+    tool_calls = [{"name": "update_shopping_requirements", "arguments": update}]
+    if is_brief_complete(merged):
+        tool_calls.append({"name": "mark_requirements_complete", "arguments": {}})
+        llm_gateway.record_skipped("chat")
+        return tool_calls, merged, True
+    return tool_calls, merged, False
+
+
+def _is_german(conversation_history: list[dict]) -> bool:
+    """
+    Schreibt der Nutzer Deutsch? Umlaute/ß oder mehr deutsche als englische/französische/spanische
+    Funktionswörter in den Nutzernachrichten. Ohne Hinweise (z. B. nur "200€") gilt Deutsch.
+    """
+    text = " ".join(m["content"] for m in conversation_history if m["role"] == "user").lower()
+    if re.search(r"[äöüß]", text):
+        return True
+    words = re.findall(r"[a-zé]+", text)
+    return sum(w in _GERMAN_WORDS for w in words) >= sum(w in _FOREIGN_WORDS for w in words)
+
+
+def _next_question(brief: dict) -> str | None:
+    """Rückfrage nach dem wichtigsten noch fehlenden Feld; None, wenn nichts Wichtiges fehlt."""
+    if not (brief.get("reason") or brief.get("event_type")):
+        return "Wofür brauchst du es?"
+    if brief.get("budget_max") is None and brief.get("budget_min") is None:
+        return "Welches Budget hast du?"
+    if not brief.get("delivery_deadline"):
+        return "Bis wann brauchst du es?"
+    if brief.get("category") in ("food", "both") and brief.get("people_count") is None:
+        return "Für wie viele Personen?"
+    if brief.get("category") in ("clothing", "both") and not brief.get("preferences"):
+        return "Welche Größe und welcher Stil?"
+    return None
+
+
+def _repeated_question(conversation_history: list[dict], question: str) -> int:
+    """Wie oft die Rückfrage zuletzt ohne Unterbrechung gestellt wurde – so lange hat sich das Feld nicht gefüllt."""
+    count = 0
+    for msg in reversed(conversation_history):
+        if msg["role"] != "assistant":
+            continue
+        if msg["content"] != question:
+            break
+        count += 1
+    return count
+
+
+def _local_followup(
+    conversation_history: list[dict],
+    current_requirements: dict | None,
+    tool_calls: list[dict],
 ) -> tuple[str, list[dict]]:
-    """Verarbeitet eine Nutzernachricht mit Gemini; gibt (Antworttext, Tool-Calls) zurück."""
-    from google.genai import types
+    """
+    Rückfrage ohne zweiten Modellaufruf: fragt nach dem wichtigsten noch fehlenden Feld.
+    Abgeschlossen wird, wenn nichts Wichtiges mehr fehlt oder dieselbe Frage schon _MAX_FOLLOWUPS-mal
+    unbeantwortet blieb (die Nachfragen zählen ab der letzten Änderung des Briefs).
+    Die Fragen gibt es nur auf Deutsch; für andere Sprachen nutzt _message_steps den Modus "model".
+    Rückgabe: (Text, zusätzliche Tool-Calls).
+    """
+    if any(tc["name"] == "mark_requirements_complete" for tc in tool_calls):
+        return _SAVED_REPLY, []
+    before = dict(current_requirements or {})
+    brief = before
+    for tc in tool_calls:
+        if tc["name"] == "update_shopping_requirements":
+            brief = merge_brief(brief, tc.get("arguments", {}))
+    question = _next_question(brief)
+    if question is None:
+        return _SAVED_REPLY, [{"name": "mark_requirements_complete", "arguments": {}}]
+    asked = 0 if brief != before else _repeated_question(conversation_history, question)
+    if asked >= _MAX_FOLLOWUPS:
+        return _SAVED_REPLY, [{"name": "mark_requirements_complete", "arguments": {}}]
+    return question, []
+
+
+def _use_local_followup(followup_mode: str, conversation_history: list[dict]) -> bool:
+    return followup_mode == "local" and _is_german(conversation_history)
 
-    if not GOOGLE_API_KEY:
+
+def _message_steps(
+    conversation_history: list[dict],
+    current_requirements: dict | None,
+    followup_mode: str | None,
+) -> Generator[tuple, object, tuple[str, list[dict]]]:
+    """
+    Ablauf einer Chat-Runde ohne I/O: liefert (contents, config) für jeden Modellaufruf per yield,
+    erwartet die Antwort per send() und endet mit (Antworttext, Tool-Calls).
+    process_message und aprocess_message führen die Aufrufe blockierend bzw. awaitbar aus.
+    """
+    followup_mode = followup_mode or CHAT_FOLLOWUP_MODE
+    rule_calls, current_requirements, complete = _fast_path(conversation_history, current_requirements)
+    if complete:
+        return _SAVED_REPLY, rule_calls
+
+    if not llm_gateway.is_configured():
         return (
             "Bitte GOOGLE_API_KEY in .env setzen (Google AI Studio / Gemini).",
-            [],
+            rule_calls,
         )
 
-    client, config = _build_gemini_config()
+    config = _build_gemini_config()
     contents = _build_contents(conversation_history, current_requirements)
     if not contents:
         return "Bitte sende eine Nachricht.", []
 
-    response = client.models.generate_content(
-        model=GEMINI_MODEL,
-        contents=contents,
-        config=config,
-    )
+    response = yield contents, config
     text_parts, tool_calls_data = _parse_gemini_response(response)
 
-    if tool_calls_data and not text_parts:
+    if tool_calls_data and not text_parts and _use_local_followup(followup_mode, conversation_history):
+        text, extra_calls = _local_followup(conversation_history, current_requirements, tool_calls_data)
+        text_parts.append(text)
+        tool_calls_data += extra_calls
+    elif tool_calls_data and not text_parts:
         contents.append(response.candidates[0].content)
-        fn_parts = [
-            types.Part.from_function_response(name=tc["name"], response={"result": {"status": "ok"}})
-            for tc in tool_calls_data
-        ]
-        contents.append(types.Content(role="user", parts=fn_parts))
-        follow = client.models.generate_content(model=GEMINI_MODEL, contents=contents, config=config)
+        contents.append(_function_responses(tool_calls_data))
+        follow = yield contents, config
         if follow.candidates and follow.candidates[0].content and getattr(follow.candidates[0].content, "parts", None):
             for part in follow.candidates[0].content.parts:
                 if part.text:
                     text_parts.append(part.text)
         if not text_parts:
-            text_parts.append("Alles klar, ich habe deine Angaben gespeichert.")
+            text_parts.append(_SAVED_REPLY)
+
+    # Regel-Werte zuerst anwenden, Modell-Werte dürfen sie überschreiben
+    return "\n".join(text_parts) if text_parts else "", rule_calls + tool_calls_data
+
+
+def process_message(
+    conversation_history: list[dict],
+    current_requirements: dict | None,
+    followup_mode: str | None = None,
+) -> tuple[str, list[dict]]:
+    """
+    Verarbeitet eine Nutzernachricht; gibt (Antworttext, Tool-Calls) zurück.
+    Macht der Regel-Pfad den Brief vollständig, entfällt der Gemini-Aufruf.
+    followup_mode (Default CHAT_FOLLOWUP_MODE): liefert das Modell nur Tool-Calls, erzeugt
+    "local" die Rückfrage aus den fehlenden Feldern (nur bei deutschsprachigem Nutzer, sonst wie "model"),
+    "model" fragt Gemini ein zweites Mal.
+    """
+    steps = _message_steps(conversation_history, current_requirements, followup_mode)
+    try:
+        contents, config = next(steps)
+        while True:
+            contents, config = steps.send(llm_gateway.generate(contents, config, purpose="chat"))
+    except StopIteration as done:
+        return done.value
+
+
+async def aprocess_message(
+    conversation_history: list[dict],
+    current_requirements: dict | None,
+    followup_mode: str | None = None,
+) -> tuple[str, list[dict]]:
+    """Wie process_message, aber die Modellaufrufe werden awaited (llm_gateway.agenerate)."""
+    steps = _message_steps(conversation_history, current_requirements, followup_mode)
+    try:
+        contents, config = next(steps)
+        while True:
+            contents, config = steps.send(await llm_gateway.agenerate(contents, config, purpose="chat"))
+    except StopIteration as done:
+        return done.value
+
+
+def _iter_stream(contents, config) -> Iterator[tuple[str, object]]:
+    """Chunks eines Streams als ("text", str) / ("tool_call", dict) plus ("part", Part) für den Verlauf."""
+    for chunk in llm_gateway.generate_stream(contents, config, purpose="chat"):
+        if not chunk.candidates or not chunk.candidates[0].content:
+            continue
+        for part in chunk.candidates[0].content.parts or []:
+            tc = _tool_call(part)
+            if tc:
+                yield "part", part
+                yield "tool_call", tc
+            elif part.text:
+                yield "text", part.text
+
+
+def stream_message(
+    conversation_history: list[dict],
+    current_requirements: dict | None,
+    followup_mode: str | None = None,
+) -> Iterator[dict]:
+    """
+    Streaming-Variante von process_message. Liefert Ereignisse in Eingangsreihenfolge:
+    {"type": "delta", "text": ...} für Textstücke und {"type": "tool_call", "name": ..., "arguments": ...}
+    sobald ein Funktionsaufruf geparst ist. Wie process_message folgt auf reine Tool-Calls
+    ein zweiter (ebenfalls gestreamter) Aufruf für die Rückfrage – oder im Modus "local" eine lokale Rückfrage.
+    Regel-Treffer kommen vorab als Tool-Calls.
+    """
+    from google.genai import types
+
+    followup_mode = followup_mode or CHAT_FOLLOWUP_MODE
+    rule_calls, current_requirements, complete = _fast_path(conversation_history, current_requirements)
+    for tc in rule_calls:
+        yield {"type": "tool_call", **tc}
+    if complete:
+        yield {"type": "delta", "text": _SAVED_REPLY}
+        return
+
+    if not llm_gateway.is_configured():
+        yield {"type": "delta", "text": "Bitte GOOGLE_API_KEY in .env setzen (Google AI Studio / Gemini)."}
+        return
+    config = _build_gemini_config()
+    contents = _build_contents(conversation_history, current_requirements)
+    if not contents:
+        yield {"type": "delta", "text": "Bitte sende eine Nachricht."}
+        return
+
+    has_text = False
+    tool_calls: list[dict] = []
+    call_parts = []
+    for kind, value in _iter_stream(contents, config):
+        if kind == "part":
+            call_parts.append(value)
+        elif kind == "tool_call":
+            tool_calls.append(value)
+            yield {"type": "tool_call", **value}
+        else:
+            has_text = True
+            yield {"type": "delta", "text": value}
 
-    return "\n".join(text_parts) if text_parts else "", tool_calls_data
+    if tool_calls and not has_text and _use_local_followup(followup_mode, conversation_history):
+        text, extra_calls = _local_followup(conversation_history, current_requirements, tool_calls)
+        for tc in extra_calls:
+            yield {"type": "tool_call", **tc}
+        yield {"type": "delta", "text": text}
+    elif tool_calls and not has_text:
+        contents.append(types.Content(role="model", parts=call_parts))
+        contents.append(_function_responses(tool_calls))
+        for kind, value in _iter_stream(contents, config):
+            if kind == "text":
+                has_text = True
+                yield {"type": "delta", "text": value}
+        if not has_text:
+            yield {"type": "delta", "text": _SAVED_REPLY}
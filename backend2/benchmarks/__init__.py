@@ -0,0 +1 @@
+"""Offline-Benchmarks (aus backend2/ starten: python -m benchmarks.<name>)."""
@@ -0,0 +1,126 @@
+"""
+Viele gleichzeitige Chat-Requests in einem Prozess, derselbe Ablauf in zwei Varianten:
+POST /sessions/{id}/chat (async, Modellaufruf awaited) und eine synchrone Kopie des Handlers wie vor der
+Umstellung (Session, process_message, Tool-Calls, Commit – im Threadpool, standardmäßig 40 Threads).
+Beide Varianten laden die Session, schreiben Nachrichten und rufen das Fake-Sprachmodell mit fester Antwortzeit.
+Temporäre SQLite-DB; aiosqlite belegt je offener Verbindung einen Thread (höchstens DB_POOL_SIZE + DB_MAX_OVERFLOW).
+
+    python -m benchmarks.chat_concurrency --requests 300 --fake-latency 1.0
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def _configure(args: argparse.Namespace) -> None:
+    # Muss vor dem Import von config/main passieren
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["LLM_FAKE_LATENCY_SECONDS"] = str(args.fake_latency)
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.requests)
+    os.environ["BRIEF_FAST_PATH"] = "0"
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["SERPAPI_CACHE_PATH"] = ""
+
+
+async def _peak_threads(stop: asyncio.Event) -> int:
+    peak = threading.active_count()
+    while not stop.is_set():
+        peak = max(peak, threading.active_count())
+        await asyncio.sleep(0.01)
+    return peak
+
+
+async def _measure(run) -> tuple[float, int, int]:
+    """(Dauer, Threads vorher, Thread-Spitze während des Laufs)."""
+    before = threading.active_count()
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_peak_threads(stop))
+    started = time.perf_counter()
+    await run()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, before, await sampler
+
+
+def _add_sync_chat_route(app) -> None:
+    """Synchroner Chat-Handler (Stand vor den async-Endpunkten) unter /bench/sessions/{id}/chat."""
+    from fastapi import Depends
+    from sqlalchemy.orm import Session
+
+    import main as app_main
+    from agent import process_message
+    from database import get_db
+    from models import ConversationMessage
+    from schemas import MessageRequest, MessageResponse
+
+    def sync_chat(session_id: str, body: MessageRequest, db: Session = Depends(get_db)) -> MessageResponse:
+        session = app_main._get_session(session_id, db, app_main._LOAD_CHAT)
+        conversation = [{"role": m.role, "content": m.content} for m in session.messages]
+        conversation.append({"role": "user", "content": body.message})
+        current_reqs = session.requirements.to_dict() if session.requirements else None
+        db.add(ConversationMessage(session_id=session.id, role="user", content=body.message))
+        db.commit()
+        assistant_text, tool_calls = process_message(conversation, current_reqs)
+        session = app_main._get_session(session_id, db, app_main._LOAD_BRIEF)
+        for tc in tool_calls:
+            app_main._apply_tool_call(session, tc)
+        db.add(ConversationMessage(session_id=session.id, role="assistant", content=assistant_text))
+        response = MessageResponse(
+            session_id=session.id,
+            reply=assistant_text,
+            requirements=app_main._requirements_out(session.requirements),
+            status=session.status,
+        )
+        db.commit()
+        return response
+
+    app.add_api_route("/bench/sessions/{session_id}/chat", sync_chat, methods=["POST"], response_model=MessageResponse)
+
+
+async def _bench(args: argparse.Namespace) -> None:
+    import httpx
+
+    import main as app_main
+
+    _add_sync_chat_route(app_main.app)
+    message = "Ich brauche was für eine Party"
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def new_sessions() -> list[str]:
+            # Eigene Sessions je Variante (der Chat ändert Verlauf und Brief)
+            return [(await client.post("/sessions")).json()["session_id"] for _ in range(args.requests)]
+
+        def run_chats(prefix: str, sids: list[str]):
+            async def run() -> None:
+                responses = await asyncio.gather(
+                    *(client.post(f"{prefix}/sessions/{sid}/chat", json={"message": message}) for sid in sids)
+                )
+                for r in responses:
+                    r.raise_for_status()
+            return run
+
+        for name, prefix in (("sync-Endpunkt", "/bench"), ("async-Endpunkt", "")):
+            elapsed, before, peak = await _measure(run_chats(prefix, await new_sessions()))
+            print(
+                f"{name:15s}: {args.requests} Requests in {elapsed:6.2f} s"
+                f" ({args.requests / elapsed:6.1f}/s), Threads {before} → max. {peak}"
+            )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300, help="gleichzeitige Chat-Requests")
+    parser.add_argument("--fake-latency", type=float, default=1.0, help="Antwortzeit des Fake-Modells (s)")
+    args = parser.parse_args(argv)
+    _configure(args)
+    asyncio.run(_bench(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Chat- und Plan-Pfad offline messen: Fake-Sprachmodell, temporäre SQLite-DB, keine externen APIs.
+
+    python -m benchmarks.chat_plan --sessions 50 --fake-latency 0.2
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MESSAGES = [
+    "Ich brauche ein Ski-Outfit",
+    "Budget 400€, Größe M",
+    "Lieferung in 5 Tagen",
+]
+
+
+def _configure(args: argparse.Namespace) -> None:
+    # Muss vor dem Import von config/main passieren
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["LLM_FAKE_LATENCY_SECONDS"] = str(args.fake_latency)
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmp}/bench.db")
+    os.environ["SERPAPI_CACHE_PATH"] = ""
+    os.environ["SERPAPI_KEY"] = ""
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))] if ordered else 0.0
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=8, help="parallele Clients")
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="Antwortzeit des Fake-Modells (s)")
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+    _configure(args)
+
+    from fastapi.testclient import TestClient
+
+    import llm_gateway
+    import main as app_main
+    import shopping_planner
+
+    # Google Shopping ohne Netz: leere Trefferliste
+    shopping_planner.search_google_shopping = lambda query, location="Germany": []
+
+    async def no_results(query, location="Germany"):
+        return []
+
+    shopping_planner.asearch_google_shopping = no_results
+    # Ein Event-Loop für alle Requests: Verbindungen der AsyncSession sind an ihren Loop gebunden
+    with TestClient(app_main.app) as client:
+        chat_times: list[float] = []
+        plan_times: list[float] = []
+
+        def run_session(_: int) -> None:
+            sid = client.post("/sessions").json()["session_id"]
+            for message in MESSAGES:
+                started = time.perf_counter()
+                r = client.post(f"/sessions/{sid}/chat", json={"message": message})
+                if r.status_code != 200:
+                    break
+                chat_times.append(time.perf_counter() - started)
+                if r.json()["status"] == "ready_for_search":
+                    break
+            for _ in range(2):  # zweiter Abruf zeigt die Wiederverwendung gespeicherter Pläne
+                started = time.perf_counter()
+                client.post(f"/sessions/{sid}/shopping-plan")
+                plan_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(run_session, range(args.sessions)))
+        wall = time.perf_counter() - started
+
+        print(f"{args.sessions} Sessions in {wall:.2f}s ({args.workers} Clients, Fake-Latenz {args.fake_latency}s)")
+        for name, values in (("chat", chat_times), ("plan", plan_times)):
+            if values:
+                print(
+                    f"  {name:5s} n={len(values):4d}  median {1000 * statistics.median(values):7.1f} ms"
+                    f"  p95 {1000 * _percentile(values, 0.95):7.1f} ms"
+                )
+        for purpose, s in llm_gateway.stats()["purposes"].items():
+            print(
+                f"  llm/{purpose}: {s['calls']} Aufrufe, {s['prompt_tokens']} Prompt-Tokens,"
+                f" {s['output_tokens']} Antwort-Tokens, p95 {s['latency_p95_ms']} ms"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Schreibdurchsatz bei parallelen Chat- und Warenkorb-Schreibzugriffen: DB-Profil "default" vs. "production".
+Jeder Client schreibt abwechselnd eine Chat-Runde (zwei Nachrichten + Session-Update) und einen Warenkorb-Artikel.
+
+    python -m benchmarks.db_concurrency --workers 16 --ops 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import OperationalError
+
+
+def _run_profile(profile: str, workers: int, ops: int) -> dict:
+    from sqlalchemy.orm import sessionmaker
+
+    from database import Base, create_db_engine
+    from models import CartItem, ConversationMessage, ShoppingSession
+
+    tmp = tempfile.mkdtemp(prefix="bench-db-")
+    engine = create_db_engine(f"sqlite:///{tmp}/bench.db", profile)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with Session() as db:
+        sessions = [ShoppingSession() for _ in range(workers)]
+        db.add_all(sessions)
+        db.commit()
+        session_ids = [s.id for s in sessions]
+
+    def client(worker: int) -> tuple[list[float], int]:
+        sid = session_ids[worker]
+        latencies: list[float] = []
+        errors = 0
+        for i in range(ops):
+            started = time.perf_counter()
+            db = Session()
+            try:
+                if i % 2 == 0:
+                    db.add(ConversationMessage(session_id=sid, role="user", content=f"Nachricht {i}"))
+                    db.add(ConversationMessage(session_id=sid, role="assistant", content="Bis wann brauchst du es?"))
+                    db.query(ShoppingSession).filter(ShoppingSession.id == sid).update(
+                        {"updated_at": datetime.now(timezone.utc)}
+                    )
+                else:
+                    db.add(CartItem(session_id=sid, retailer_id="stylehub", product_id=f"p{i}", title="Skijacke", price=99.0))
+                db.commit()
+                latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                # z. B. "database is locked"
+                db.rollback()
+                errors += 1
+            finally:
+                db.close()
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(client, range(workers)))
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    latencies = sorted(x for lat, _ in results for x in lat)
+    return {
+        "ok": len(latencies),
+        "errors": sum(err for _, err in results),
+        "elapsed": elapsed,
+        "median_ms": 1000 * statistics.median(latencies) if latencies else 0.0,
+        "p95_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=16, help="parallele Clients")
+    parser.add_argument("--ops", type=int, default=200, help="Schreibvorgänge pro Client")
+    args = parser.parse_args(argv)
+    # Modul-Engine aus database.py nicht auf die echte DB zeigen lassen
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ["DB_POOL_SIZE"] = str(args.workers)
+
+    for profile in ("default", "production"):
+        r = _run_profile(profile, args.workers, args.ops)
+        print(
+            f"{profile:10s}: {r['ok'] / r['elapsed']:8.1f} Schreibvorgänge/s, {r['errors']} Fehler,"
+            f" median {r['median_ms']:.1f} ms, p95 {r['p95_ms']:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
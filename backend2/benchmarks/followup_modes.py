@@ -0,0 +1,48 @@
+"""
+Latenz einer Chat-Runde mit reinen Tool-Calls: Rückfrage lokal vs. zweiter Modellaufruf.
+Nutzt das Fake-Modell mit fester Antwortzeit (entspricht einem Gemini-Round-Trip).
+
+    python -m benchmarks.followup_modes --turns 20 --fake-latency 0.4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Nachrichten, die der Regel-Pfad nicht abschließt → Modell liefert nur Tool-Calls
+MESSAGES = ["Ich brauche was für eine Party", "Größe M", "Budget 200€"]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--fake-latency", type=float, default=0.4, help="Antwortzeit des Fake-Modells (s)")
+    args = parser.parse_args(argv)
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["LLM_FAKE_LATENCY_SECONDS"] = str(args.fake_latency)
+    os.environ["BRIEF_FAST_PATH"] = "0"
+
+    import agent
+    import llm_gateway
+
+    results: dict[str, list[float]] = {}
+    for mode in ("model", "local"):
+        llm_gateway.reset_stats()
+        times = results[mode] = []
+        for i in range(args.turns):
+            history = [{"role": "user", "content": MESSAGES[i % len(MESSAGES)]}]
+            started = time.perf_counter()
+            reply, _ = agent.process_message(history, {}, followup_mode=mode)
+            times.append(time.perf_counter() - started)
+        calls = llm_gateway.stats()["purposes"].get("chat", {}).get("calls", 0)
+        print(
+            f"{mode:6s}: median {1000 * statistics.median(times):7.1f} ms,"
+            f" {calls / args.turns:.1f} Modellaufrufe pro Runde (Antwort z. B. {reply!r})"
+        )
+    saved = statistics.median(results["model"]) - statistics.median(results["local"])
+    print(f"Ersparnis pro Runde: {1000 * saved:.1f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+SQL-Queries pro Endpunkt zählen (Event before_cursor_execute) und gegen ein festes Budget prüfen.
+Jeder Endpunkt wird mit kleiner und großer Session gemessen; die Lese-Queries dürfen nicht mit Nachrichten
+oder Warenkorb-Artikeln wachsen (Schreibzugriffe hängen davon ab, was der Agent ändert). Exit-Code 1 bei Überschreitung.
+Dieselben Budgets prüft tests/test_query_counts.py.
+
+    python -m benchmarks.query_counts --items 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# Maximale Queries pro Request (Session laden + Schreibzugriffe)
+BUDGETS = {
+    "GET /sessions/{id}": 3,
+    "POST /sessions/{id}/chat": 7,
+    "GET /sessions/{id}/cart": 2,
+    "POST /sessions/{id}/checkout-simulation": 3,
+}
+
+
+def _configure() -> None:
+    # Muss vor dem Import von config/main passieren
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["LLM_FAKE_LATENCY_SECONDS"] = "0"
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["SERPAPI_CACHE_PATH"] = ""
+
+
+def measure(client, items: int = 20) -> dict[str, tuple[tuple[int, int], tuple[int, int]]]:
+    """
+    (Queries gesamt, davon lesend) je Endpunkt für eine kleine Session und eine mit items Nachrichten/Artikeln.
+    client: TestClient auf main.app (ein Event-Loop für alle Requests: AsyncSession-Verbindungen hängen am Loop).
+    """
+    from sqlalchemy import event
+
+    from database import SessionLocal, async_engine, engine
+    from models import CartItem, ConversationMessage
+
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    def make_session(size: int) -> str:
+        sid = client.post("/sessions").json()["session_id"]
+        with SessionLocal() as db:
+            for i in range(size):
+                # Nur Assistenten-Nachrichten: der Fake-Agent schließt den Brief dann in beiden Sessions nicht ab
+                db.add(ConversationMessage(session_id=sid, role="assistant", content=f"Nachricht {i}"))
+                db.add(CartItem(session_id=sid, retailer_id=f"shop{i % 3}", product_id=f"p{i}", title="Artikel", price=10.0))
+            db.commit()
+        return sid
+
+    def measure_session(sid: str) -> dict[str, tuple[int, int]]:
+        requests = {
+            "GET /sessions/{id}": lambda: client.get(f"/sessions/{sid}"),
+            "POST /sessions/{id}/chat": lambda: client.post(f"/sessions/{sid}/chat", json={"message": "Größe M"}),
+            "GET /sessions/{id}/cart": lambda: client.get(f"/sessions/{sid}/cart"),
+            "POST /sessions/{id}/checkout-simulation": lambda: client.post(f"/sessions/{sid}/checkout-simulation"),
+        }
+        counts = {}
+        for name, call in requests.items():
+            statements.clear()
+            response = call()
+            response.raise_for_status()
+            reads = sum(1 for stmt in statements if stmt.lstrip().upper().startswith("SELECT"))
+            counts[name] = (len(statements), reads)
+        return counts
+
+    small_sid, large_sid = make_session(1), make_session(items)
+    # Async-Endpunkte laufen über async_engine (Events auf der synchronen Hülle)
+    engines = (engine, async_engine.sync_engine)
+    for e in engines:
+        event.listen(e, "before_cursor_execute", _count)
+    try:
+        small, large = measure_session(small_sid), measure_session(large_sid)
+    finally:
+        for e in engines:
+            event.remove(e, "before_cursor_execute", _count)
+    return {name: (small[name], large[name]) for name in BUDGETS}
+
+
+def within_budget(name: str, small: tuple[int, int], large: tuple[int, int]) -> bool:
+    """Lese-Queries unabhängig von der Session-Größe und Gesamtzahl im Budget."""
+    return small[1] == large[1] and max(small[0], large[0]) <= BUDGETS[name]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=20, help="Nachrichten/Artikel der großen Session")
+    args = parser.parse_args(argv)
+    _configure()
+
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+
+    with TestClient(app_main.app) as client:
+        results = measure(client, args.items)
+    failed = False
+    for name, (small, large) in results.items():
+        ok = within_budget(name, small, large)
+        failed |= not ok
+        print(
+            f"{name:42s} {small[0]:3d} / {large[0]:3d} Queries, davon {small[1]} / {large[1]} lesend"
+            f" (Budget {BUDGETS[name]}) {'ok' if ok else 'FEHLER'}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
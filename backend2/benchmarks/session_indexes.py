@@ -0,0 +1,121 @@
+"""
+Latenz der Session-Endpunkte bei großer DB mit und ohne Indizes (session_id, created_at)
+auf conversation_messages und cart_items. Temporäre SQLite-DB, Fake-Sprachmodell.
+
+    python -m benchmarks.session_indexes --sessions 100000 --requests 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+ENDPOINTS = [
+    ("GET /sessions/{id}", "get", "/sessions/{sid}", None),
+    ("GET /sessions/{id}/cart", "get", "/sessions/{sid}/cart", None),
+    ("POST /sessions/{id}/chat", "post", "/sessions/{sid}/chat", {"message": "Größe M"}),
+    ("POST /sessions/{id}/checkout-simulation", "post", "/sessions/{sid}/checkout-simulation", None),
+]
+
+
+def _configure() -> None:
+    # Muss vor dem Import von config/main passieren
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["LLM_FAKE_LATENCY_SECONDS"] = "0"
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["SERPAPI_CACHE_PATH"] = ""
+
+
+def _seed(engine, sessions: int, messages: int, items: int, batch: int = 5000) -> list[str]:
+    from models import CartItem, ConversationMessage, ShoppingRequirement, ShoppingSession
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    ids: list[str] = []
+    with engine.begin() as conn:
+        for offset in range(0, sessions, batch):
+            chunk = [str(uuid4()) for _ in range(min(batch, sessions - offset))]
+            ids.extend(chunk)
+            conn.execute(ShoppingSession.__table__.insert(), [
+                {"id": sid, "status": "gathering_info", "created_at": start, "updated_at": start} for sid in chunk
+            ])
+            conn.execute(ShoppingRequirement.__table__.insert(), [{"session_id": sid, "is_complete": False} for sid in chunk])
+            conn.execute(ConversationMessage.__table__.insert(), [
+                {
+                    "session_id": sid,
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": f"Nachricht {i}",
+                    "created_at": start + timedelta(minutes=i),
+                }
+                for sid in chunk for i in range(messages)
+            ])
+            conn.execute(CartItem.__table__.insert(), [
+                {
+                    "session_id": sid,
+                    "retailer_id": f"shop{i % 3}",
+                    "product_id": f"p{i}",
+                    "title": "Artikel",
+                    "price": 10.0 + i,
+                    "currency": "EUR",
+                    "quantity": 1,
+                    "created_at": start + timedelta(minutes=i),
+                }
+                for sid in chunk for i in range(items)
+            ])
+    return ids
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, default=4, help="Nachrichten pro Session")
+    parser.add_argument("--items", type=int, default=2, help="Warenkorb-Artikel pro Session")
+    parser.add_argument("--requests", type=int, default=200, help="Requests pro Endpunkt und Variante")
+    args = parser.parse_args(argv)
+    _configure()
+
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    from database import engine
+    from models import CartItem, ConversationMessage
+
+    started = time.perf_counter()
+    session_ids = _seed(engine, args.sessions, args.messages, args.items)
+    print(f"{args.sessions} Sessions angelegt ({time.perf_counter() - started:.1f} s)")
+    indexes = [index for model in (ConversationMessage, CartItem) for index in model.__table__.indexes]
+    # Ein Event-Loop für alle Requests: Verbindungen der AsyncSession sind an ihren Loop gebunden
+    with TestClient(app_main.app) as client:
+        rng = random.Random(0)
+
+        results: dict[str, dict[str, float]] = {}
+        for variant in ("ohne Index", "mit Index"):
+            for index in indexes:
+                if variant == "ohne Index":
+                    index.drop(bind=engine, checkfirst=True)
+                else:
+                    index.create(bind=engine, checkfirst=True)
+            # Jede Variante auf eigenen Sessions (Chat/Checkout ändern den Status)
+            sample = rng.sample(session_ids, args.requests)
+            for name, method, path, body in ENDPOINTS:
+                times = []
+                for sid in sample:
+                    t0 = time.perf_counter()
+                    getattr(client, method)(path.format(sid=sid), **({"json": body} if body else {})).raise_for_status()
+                    times.append(time.perf_counter() - t0)
+                results.setdefault(name, {})[variant] = statistics.median(times)
+
+        for name, by_variant in results.items():
+            before, after = by_variant["ohne Index"], by_variant["mit Index"]
+            print(
+                f"{name:42s} ohne Index {1000 * before:8.2f} ms, mit Index {1000 * after:6.2f} ms"
+                f" (×{before / after if after else 0:.1f})"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
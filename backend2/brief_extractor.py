@@ -0,0 +1,187 @@
+"""
+Regelbasierte Brief-Erkennung ohne Modellaufruf: Budget, Währung, Lieferdatum (relativ/absolut),
+Größen, Personenzahl und bekannte Anlässe aus einer Nutzernachricht.
+Ergebnis im Format von update_shopping_requirements (für ShoppingRequirement.merge_update).
+"""
+import re
+from datetime import date, timedelta
+
+_CURRENCIES = {
+    "€": "EUR", "eur": "EUR", "euro": "EUR",
+    "$": "USD", "usd": "USD", "dollar": "USD",
+    "£": "GBP", "gbp": "GBP", "pfund": "GBP",
+}
+_CUR = r"(€|eur|euro|\$|usd|dollar|£|gbp|pfund)"
+_NUM = r"(\d+(?:[.,]\d{1,2})?)"
+
+_RANGE_RE = re.compile(rf"{_NUM}\s*{_CUR}?\s*(?:-|–|bis)\s*{_NUM}\s*{_CUR}", re.IGNORECASE)
+_RANGE_WORDS_RE = re.compile(rf"zwischen\s+{_NUM}\s*{_CUR}?\s+und\s+{_NUM}\s*{_CUR}", re.IGNORECASE)
+_AMOUNT_RE = re.compile(rf"(?:(max\.?|maximal|höchstens|bis|unter|ab|mindestens)\s+)?(?:{_NUM}\s*{_CUR}|{_CUR}\s*{_NUM})", re.IGNORECASE)
+
+_MONTHS = {
+    "januar": 1, "jan": 1, "februar": 2, "feb": 2, "märz": 3, "maerz": 3, "mär": 3, "april": 4, "apr": 4,
+    "mai": 5, "juni": 6, "jun": 6, "juli": 7, "jul": 7, "august": 8, "aug": 8, "september": 9, "sep": 9,
+    "sept": 9, "oktober": 10, "okt": 10, "november": 11, "nov": 11, "dezember": 12, "dez": 12,
+}
+_WEEKDAYS = {
+    "montag": 0, "dienstag": 1, "mittwoch": 2, "donnerstag": 3, "freitag": 4, "samstag": 5, "sonntag": 6,
+}
+_UNITS = {"tag": 1, "tage": 1, "tagen": 1, "woche": 7, "wochen": 7}
+_NUMBER_WORDS = {
+    "einem": 1, "einer": 1, "eins": 1, "ein": 1, "zwei": 2, "drei": 3, "vier": 4, "fünf": 5,
+    "sechs": 6, "sieben": 7, "acht": 8, "neun": 9, "zehn": 10, "zwölf": 12, "vierzehn": 14,
+}
+
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_DOT_DATE_RE = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{2,4})?(?!\d)")
+_MONTH_DATE_RE = re.compile(r"\b(\d{1,2})\.?\s*(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\b\.?(?:\s*(\d{4}))?", re.IGNORECASE)
+_RELATIVE_RE = re.compile(r"\bin\s+(\d+|" + "|".join(_NUMBER_WORDS) + r")\s+(tag|tage|tagen|woche|wochen)\b", re.IGNORECASE)
+_WEEKDAY_RE = re.compile(r"\b(?:bis|am|zum|spätestens)\s+(?:nächsten\s+|kommenden\s+)?(" + "|".join(_WEEKDAYS) + r")\b", re.IGNORECASE)
+
+_SIZE_RE = re.compile(r"\b(?:größe|groesse|gr\.|size)\s*(xxs|xs|s|m|l|xl|xxl|xxxl|\d{2,3})\b", re.IGNORECASE)
+_SHOE_RE = re.compile(r"\bschuhgröße\s*(\d{2}(?:[.,]5)?)\b", re.IGNORECASE)
+_PEOPLE_RE = re.compile(r"\b(\d{1,4})\s*(?:personen|leute|gäste|teilnehmer(?:innen)?|teilnehmende|people|pers\.)", re.IGNORECASE)
+
+_TOMORROW_RE = re.compile(r"(?<!guten\s)\bmorgen\b", re.IGNORECASE)
+_DAY_AFTER_TOMORROW_RE = re.compile(r"\bübermorgen\b", re.IGNORECASE)
+_NEXT_WEEK_RE = re.compile(r"\bn(?:ä|ae)chste\s+woche\b", re.IGNORECASE)
+
+# Anlass (Regex, nur ganze Wörter bzw. bekannte Komposita) → (reason/event_type, category)
+_OCCASIONS = [
+    (re.compile(p, re.IGNORECASE), reason, category)
+    for p, reason, category in [
+        (r"\bhackathons?\b", "hackathon", "both"),
+        (r"\bsuper\s?bowl\b", "party", "clothing"),
+        (r"\bski(?:er|fahren|urlaub|jacke|hose|anzug|outfit|kleidung)?\b", "ski", "clothing"),
+        (r"\bsnowboard(?:en|jacke|hose)?\b", "ski", "clothing"),
+        (r"\bhochzeit(?:s\w*)?\b", "hochzeit", "clothing"),
+        (r"\bpart(?:y|ys)\b", "party", "clothing"),
+        (r"\bgeburtstag(?:s\w*)?\b", "party", "both"),
+        (r"\bgrill(?:en|party|abend)\b", "party", "food"),
+        (r"\bsnacks?\b", "food", "food"),
+        (r"\boutfits?\b", "outfit", "clothing"),
+    ]
+]
+
+
+def _amount(value: str) -> float:
+    return float(value.replace(",", "."))
+
+
+def _budget(text: str) -> dict:
+    m = _RANGE_WORDS_RE.search(text) or _RANGE_RE.search(text)
+    if m:
+        low, cur1, high, cur2 = m.groups()
+        lo, hi = sorted((_amount(low), _amount(high)))
+        return {"budget_min": lo, "budget_max": hi, "budget_currency": _CURRENCIES[(cur2 or cur1).lower()]}
+    m = _AMOUNT_RE.search(text)
+    if not m:
+        return {}
+    qualifier, num1, cur1, cur2, num2 = m.groups()
+    currency = _CURRENCIES[(cur1 or cur2).lower()]
+    value = _amount(num1 or num2)
+    if qualifier and qualifier.lower() in ("ab", "mindestens"):
+        return {"budget_min": value, "budget_currency": currency}
+    return {"budget_max": value, "budget_currency": currency}
+
+
+def _future(d: date, today: date) -> date:
+    # Datum ohne Jahr: nächstes Vorkommen
+    return d if d >= today else d.replace(year=d.year + 1)
+
+
+def _absolute_date(text: str, today: date) -> str | None:
+    # Jeder Treffer wird geprüft; ungültige Kalenderdaten (z. B. Betrag "12.50.") werden übersprungen
+    for m in _ISO_DATE_RE.finditer(text):
+        try:
+            return date(int(m.group(1)), int(m.group(2)), int(m.group(3))).isoformat()
+        except ValueError:
+            continue
+    for m in _MONTH_DATE_RE.finditer(text):
+        day, month, year = int(m.group(1)), _MONTHS[m.group(2).lower()], m.group(3)
+        try:
+            d = date(int(year) if year else today.year, month, day)
+        except ValueError:
+            continue
+        return (d if year else _future(d, today)).isoformat()
+    for m in _DOT_DATE_RE.finditer(text):
+        day, month, year = int(m.group(1)), int(m.group(2)), m.group(3)
+        try:
+            if year:
+                return date(int(year) + (2000 if len(year) == 2 else 0), month, day).isoformat()
+            return _future(date(today.year, month, day), today).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _deadline(text: str, today: date) -> str | None:
+    if absolute := _absolute_date(text, today):
+        return absolute
+    lower = text.lower()
+    if m := _RELATIVE_RE.search(lower):
+        count = int(m.group(1)) if m.group(1).isdigit() else _NUMBER_WORDS[m.group(1)]
+        return (today + timedelta(days=count * _UNITS[m.group(2)])).isoformat()
+    if _DAY_AFTER_TOMORROW_RE.search(lower):
+        return (today + timedelta(days=2)).isoformat()
+    # "morgen", aber nicht "Guten Morgen" oder "morgens"
+    if _TOMORROW_RE.search(lower):
+        return (today + timedelta(days=1)).isoformat()
+    if _NEXT_WEEK_RE.search(lower):
+        return (today + timedelta(days=7)).isoformat()
+    if m := _WEEKDAY_RE.search(lower):
+        ahead = (_WEEKDAYS[m.group(1)] - today.weekday()) % 7 or 7
+        return (today + timedelta(days=ahead)).isoformat()
+    return None
+
+
+def extract_brief(text: str, today: date | None = None) -> dict:
+    """Alle sicher erkennbaren Felder; leeres dict, wenn nichts gefunden wurde."""
+    today = today or date.today()
+    out: dict = {}
+    out.update(_budget(text))
+    if deadline := _deadline(text, today):
+        out["delivery_deadline"] = deadline
+    preferences = [f"Größe {m.upper()}" for m in _SIZE_RE.findall(text)]
+    preferences += [f"Schuhgröße {m}" for m in _SHOE_RE.findall(text)]
+    if preferences:
+        out["preferences"] = list(dict.fromkeys(preferences))
+    if m := _PEOPLE_RE.search(text):
+        out["people_count"] = int(m.group(1))
+    for pattern, reason, category in _OCCASIONS:
+        if pattern.search(text):
+            out["reason"] = out["event_type"] = reason
+            out["category"] = category
+            break
+    return out
+
+
+def merge_brief(current: dict | None, update: dict) -> dict:
+    """Wie ShoppingRequirement.merge_update, aber auf dem dict aus to_dict()."""
+    merged = dict(current or {})
+    for k, v in update.items():
+        if isinstance(v, list):
+            existing = list(merged.get(k) or [])
+            merged[k] = existing + [item for item in v if item not in existing]
+        elif v is not None:
+            merged[k] = v
+    return merged
+
+
+def is_brief_complete(brief: dict) -> bool:
+    """
+    Abschluss ohne Modell: Anlass und Kategorie bekannt und mindestens drei weitere Angaben
+    (Budget, Lieferfrist, Präferenzen, Personenzahl, Must-haves) – mindestens so streng wie
+    „3 oder mehr Parameter“ im Prompt, z. B. "Ski-Outfit, 400€, Größe M, in 5 Tagen".
+    Alles darunter entscheidet das Modell.
+    """
+    if not (brief.get("reason") or brief.get("event_type")) or not brief.get("category"):
+        return False
+    filled = [
+        brief.get("budget_max") is not None or brief.get("budget_min") is not None,
+        bool(brief.get("delivery_deadline")),
+        bool(brief.get("preferences")),
+        brief.get("people_count") is not None,
+        bool(brief.get("must_haves")),
+    ]
+    return sum(filled) >= 3
@@ -1,6 +1,7 @@
-"""Kombinierter Warenkorb: mehrere Händler, Summen, Ersetzen/Entfernen."""
+"""Kombinierter Warenkorb: mehrere Händler, Summen, Ersetzen/Entfernen (async, AsyncSession)."""
 import json
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import CartItem, ShoppingSession
 from schemas import CartItemOut, CartSummaryOut
@@ -25,10 +26,14 @@ def cart_to_summary(session: ShoppingSession) -> CartSummaryOut:
     )
 
 
-def add_to_cart(db: Session, session_id: str, product: RetailerProduct, quantity: int = 1, variant_info: dict | None = None) -> CartItem | None:
+async def _get_item(db: AsyncSession, session_id: str, cart_item_id: int) -> CartItem | None:
+    result = await db.execute(select(CartItem).where(CartItem.session_id == session_id, CartItem.id == cart_item_id))
+    return result.scalars().first()
+
+
+async def add_to_cart(db: AsyncSession, session_id: str, product: RetailerProduct, quantity: int = 1, variant_info: dict | None = None) -> CartItem | None:
     """Fügt ein Produkt zum Warenkorb hinzu."""
-    session = db.query(ShoppingSession).filter(ShoppingSession.id == session_id).first()
-    if not session:
+    if await db.get(ShoppingSession, session_id) is None:
         return None
     item = CartItem(
         session_id=session_id,
@@ -45,42 +50,41 @@ def add_to_cart(db: Session, session_id: str, product: RetailerProduct, quantity
         raw_product=json.dumps(product.raw) if product.raw else None,
     )
     db.add(item)
-    db.commit()
-    db.refresh(item)
+    await db.commit()
     return item
 
 
-def remove_from_cart(db: Session, session_id: str, cart_item_id: int) -> bool:
+async def remove_from_cart(db: AsyncSession, session_id: str, cart_item_id: int) -> bool:
     """Entfernt einen Eintrag aus dem Warenkorb."""
-    item = db.query(CartItem).filter(CartItem.session_id == session_id, CartItem.id == cart_item_id).first()
+    item = await _get_item(db, session_id, cart_item_id)
     if not item:
         return False
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.commit()
     return True
 
 
-def update_cart_item_quantity(db: Session, session_id: str, cart_item_id: int, quantity: int) -> bool:
+async def update_cart_item_quantity(db: AsyncSession, session_id: str, cart_item_id: int, quantity: int) -> bool:
     """Aktualisiert die Menge eines Cart-Items."""
     if quantity < 1:
-        return remove_from_cart(db, session_id, cart_item_id)
-    item = db.query(CartItem).filter(CartItem.session_id == session_id, CartItem.id == cart_item_id).first()
+        return await remove_from_cart(db, session_id, cart_item_id)
+    item = await _get_item(db, session_id, cart_item_id)
     if not item:
         return False
     item.quantity = quantity
-    db.commit()
+    await db.commit()
     return True
 
 
-def replace_cart_item(
-    db: Session,
+async def replace_cart_item(
+    db: AsyncSession,
     session_id: str,
     cart_item_id: int,
     new_product: RetailerProduct,
     quantity: int = 1,
 ) -> bool:
     """Ersetzt ein Cart-Item durch ein anderes Produkt."""
-    item = db.query(CartItem).filter(CartItem.session_id == session_id, CartItem.id == cart_item_id).first()
+    item = await _get_item(db, session_id, cart_item_id)
     if not item:
         return False
     item.retailer_id = new_product.retailer_id
@@ -93,12 +97,12 @@ def replace_cart_item(
     item.image_url = new_product.image_url
     item.product_url = new_product.product_url
     item.raw_product = json.dumps(new_product.raw) if new_product.raw else None
-    db.commit()
+    await db.commit()
     return True
 
 
-def clear_cart(db: Session, session_id: str) -> int:
+async def clear_cart(db: AsyncSession, session_id: str) -> int:
     """Leert den Warenkorb; gibt Anzahl gelöschter Items zurück."""
-    deleted = db.query(CartItem).filter(CartItem.session_id == session_id).delete()
-    db.commit()
-    return deleted
+    result = await db.execute(delete(CartItem).where(CartItem.session_id == session_id))
+    await db.commit()
+    return result.rowcount
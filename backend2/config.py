@@ -12,3 +12,70 @@ GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
 SERPAPI_KEY: str = os.getenv("SERPAPI_KEY", "")
 
 DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./agentic_commerce.db")
+# Async-Endpunkte (AsyncSession); leer = aus DATABASE_URL abgeleitet (sqlite → sqlite+aiosqlite)
+ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+
+# Datenbank-Profil: "production" (SQLite mit WAL, Pragmas, Busy-Timeout) oder "default" (Treiber-Standard)
+DB_PROFILE: str = os.getenv("DB_PROFILE", "production").lower()
+# SQLite-Pragmas im Profil "production" (cache_size in KiB, mmap_size in Bytes, busy_timeout in ms)
+SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))
+SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Verbindungs-Pool: feste Größe, zusätzliche Verbindungen bei Last, Wartezeit auf eine freie Verbindung (s)
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+
+# Händler-Suche: parallele Abfrage mit Zeitlimits (Sekunden)
+RETAILER_TIMEOUT_SECONDS: float = float(os.getenv("RETAILER_TIMEOUT_SECONDS", "3.0"))
+SEARCH_DEADLINE_SECONDS: float = float(os.getenv("SEARCH_DEADLINE_SECONDS", "5.0"))
+RETAILER_MAX_WORKERS: int = int(os.getenv("RETAILER_MAX_WORKERS", "8"))
+
+# Such-Cache (LRU + TTL) für identische Briefs
+SEARCH_CACHE_MAXSIZE: int = int(os.getenv("SEARCH_CACHE_MAXSIZE", "256"))
+SEARCH_CACHE_TTL_SECONDS: float = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+# Cursor für weitere Ergebnisseiten: eigene Größe/TTL, unabhängig vom Such-Cache (mind. 1, sonst liefe
+# jeder next_cursor ins Leere)
+SEARCH_CURSOR_MAXSIZE: int = max(1, int(os.getenv("SEARCH_CURSOR_MAXSIZE", "256")))
+SEARCH_CURSOR_TTL_SECONDS: float = max(1.0, float(os.getenv("SEARCH_CURSOR_TTL_SECONDS", "900")))
+
+# Händler-Kataloge spaltenorientiert halten (weniger Speicher pro Produkt bei großen Katalogen)
+CATALOG_COLUMNAR: bool = os.getenv("CATALOG_COLUMNAR", "0").lower() in ("1", "true", "yes")
+
+# Optionale Katalog-DB (SQLite FTS5); Händler darin ersetzen gleichnamige Demo-Händler
+CATALOG_DB_PATH: str = os.getenv("CATALOG_DB_PATH", "")
+
+# Shopping-Plan: Suchen pro Komponente parallel (max. gleichzeitige Aufrufe, Zeitlimit pro Aufruf in Sekunden)
+PLAN_LOOKUP_MAX_WORKERS: int = int(os.getenv("PLAN_LOOKUP_MAX_WORKERS", "4"))
+PLAN_LOOKUP_TIMEOUT_SECONDS: float = float(os.getenv("PLAN_LOOKUP_TIMEOUT_SECONDS", "10.0"))
+
+# Persistenter Cache für SerpAPI-Antworten (leer = aus); veraltete Einträge werden noch
+# SERPAPI_CACHE_STALE_SECONDS lang ausgeliefert und im Hintergrund erneuert
+SERPAPI_CACHE_PATH: str = os.getenv("SERPAPI_CACHE_PATH", "./serpapi_cache.db")
+SERPAPI_CACHE_MAXSIZE: int = int(os.getenv("SERPAPI_CACHE_MAXSIZE", "5000"))
+SERPAPI_CACHE_TTL_SECONDS: float = float(os.getenv("SERPAPI_CACHE_TTL_SECONDS", "86400"))
+SERPAPI_CACHE_STALE_SECONDS: float = float(os.getenv("SERPAPI_CACHE_STALE_SECONDS", "604800"))
+
+# Sprachmodell-Zugang (llm_gateway): "gemini" oder "fake" (deterministisch, offline für Benchmarks)
+LLM_BACKEND: str = os.getenv("LLM_BACKEND", "gemini").lower()
+LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS: float = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_FAKE_LATENCY_SECONDS: float = float(os.getenv("LLM_FAKE_LATENCY_SECONDS", "0"))
+
+# Chat-Prompt: nur die letzten N Nachrichten im Wortlaut, ältere als Zusammenfassung (max. Zeichen)
+CHAT_CONTEXT_MESSAGES: int = int(os.getenv("CHAT_CONTEXT_MESSAGES", "6"))
+CHAT_SUMMARY_MAX_CHARS: int = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "600"))
+
+# Chat: Budget, Datum, Größen usw. zuerst per Regeln erkennen; ist der Brief damit vollständig, kein Modellaufruf
+BRIEF_FAST_PATH: bool = os.getenv("BRIEF_FAST_PATH", "1").lower() in ("1", "true", "yes")
+
+# Rückfrage nach reinen Tool-Calls: "local" (aus fehlenden Brief-Feldern, kein zweiter Modellaufruf) oder "model"
+CHAT_FOLLOWUP_MODE: str = os.getenv("CHAT_FOLLOWUP_MODE", "local").lower()
+
+# Hintergrund-Jobs (Shopping-Plan): Worker-Threads, Job ohne Lebenszeichen gilt nach N Sekunden als abgebrochen
+JOB_MAX_WORKERS: int = int(os.getenv("JOB_MAX_WORKERS", "4"))
+JOB_STALE_SECONDS: float = float(os.getenv("JOB_STALE_SECONDS", "600"))
+JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "0.5"))
@@ -1,13 +1,112 @@
-"""Datenbankverbindung und Session."""
-from sqlalchemy import create_engine
+"""Datenbankverbindung und Session (synchron und async)."""
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-from config import DATABASE_URL
+from config import (
+    ASYNC_DATABASE_URL,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_PROFILE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SYNCHRONOUS,
+)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+PROFILES = ("production", "default")
+
+# Async-Treiber je Datenbank, falls ASYNC_DATABASE_URL nicht gesetzt ist
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def _sqlite_pragmas() -> list[str]:
+    # journal_mode wirkt dauerhaft auf die Datei, die übrigen pro Verbindung
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+
+
+def _engine_options(parsed: URL, profile: str) -> tuple[dict, bool]:
+    """create_engine-Argumente für das Profil und ob SQLite-Pragmas gesetzt werden sollen."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unbekanntes DB_PROFILE {profile!r} (erlaubt: {', '.join(PROFILES)})")
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    in_memory = is_sqlite and parsed.database in (None, "", ":memory:")
+    kwargs: dict = {}
+    if is_sqlite:
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if profile == "production" and not in_memory:
+        kwargs.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT_SECONDS)
+        if is_sqlite:
+            # Wartezeit des Treibers bei gesperrter DB (Sekunden), zusätzlich zu PRAGMA busy_timeout
+            kwargs["connect_args"]["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000
+        else:
+            kwargs["pool_pre_ping"] = True
+    return kwargs, profile == "production" and is_sqlite and not in_memory
+
+
+def _install_sqlite_pragmas(engine: Engine) -> None:
+    pragmas = _sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def create_db_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE) -> Engine:
+    """
+    Engine für url. Profil "production": bei SQLite WAL + Pragmas auf jeder neuen Verbindung,
+    bei allen Datenbanken feste Pool-Größe. Profil "default": Treiber- und SQLAlchemy-Standard.
+    """
+    kwargs, pragmas = _engine_options(make_url(url), profile)
+    engine = create_engine(url, **kwargs)
+    if pragmas:
+        _install_sqlite_pragmas(engine)
+    return engine
+
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    """DATABASE_URL mit Async-Treiber (sqlite:///x.db → sqlite+aiosqlite:///x.db); ASYNC_DATABASE_URL hat Vorrang."""
+    if ASYNC_DATABASE_URL:
+        return ASYNC_DATABASE_URL
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"Kein Async-Treiber für {backend!r} bekannt; ASYNC_DATABASE_URL setzen.")
+    return parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str | None = None, profile: str = DB_PROFILE) -> AsyncEngine:
+    """Wie create_db_engine, aber für AsyncSession (gleiches Profil, Pragmas über die synchrone Engine-Hülle)."""
+    url = url or async_database_url()
+    kwargs, pragmas = _engine_options(make_url(url), profile)
+    engine = create_async_engine(url, **kwargs)
+    if pragmas:
+        _install_sqlite_pragmas(engine.sync_engine)
+    return engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = create_async_db_engine()
+# expire_on_commit=False: geladene Objekte bleiben nach dem Commit lesbar (kein Nachladen im Event-Loop)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db():
     """FastAPI-Dependency: eine DB-Session pro Request."""
@@ -16,3 +115,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """FastAPI-Dependency für async-Endpunkte: eine AsyncSession pro Request."""
+    async with AsyncSessionLocal() as db:
+        yield db
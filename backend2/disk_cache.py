@@ -0,0 +1,204 @@
+"""
+Persistenter Antwort-Cache (SQLite-Datei) mit TTL, Größenlimit (LRU) und Stale-While-Revalidate.
+Überlebt Neustarts; gedacht für teure externe Aufrufe (z. B. SerpAPI).
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed ON cache_entries (accessed_at);
+"""
+
+
+class DiskTTLCache:
+    """
+    Einträge jünger als ttl_seconds sind frisch. Bis ttl_seconds + stale_seconds werden sie noch
+    ausgeliefert, aber im Hintergrund neu geladen (get_or_fetch). Danach gelten sie als verfallen.
+    Über maxsize hinaus fliegen die am längsten nicht gelesenen Einträge.
+    Werte müssen JSON-serialisierbar sein.
+    """
+
+    def __init__(self, path: str, maxsize: int = 5000, ttl_seconds: float = 86400.0, stale_seconds: float = 0.0):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._refreshing: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Eine Verbindung, Zugriffe serialisiert über self._lock
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _lookup(self, key: str) -> tuple[str, Any | None]:
+        """("fresh" | "stale" | "miss", Wert) und Zähler aktualisieren."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT value, stored_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return "miss", None
+            value, stored_at = row
+            age = now - stored_at
+            if age > self.ttl_seconds + self.stale_seconds:
+                db.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return "miss", None
+            db.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            if age > self.ttl_seconds:
+                self.stale_hits += 1
+                return "stale", json.loads(value)
+            self.hits += 1
+            return "fresh", json.loads(value)
+
+    def get(self, key: str) -> Any | None:
+        """Wert, solange er nicht verfallen ist (auch im Stale-Fenster); sonst None."""
+        return self._lookup(key)[1]
+
+    def set(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            overflow = db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.maxsize
+            if overflow > 0:
+                db.execute(
+                    "DELETE FROM cache_entries WHERE key IN "
+                    "(SELECT key FROM cache_entries ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Frischer Eintrag → sofort. Veralteter Eintrag → sofort, plus einmaliges Neuladen im Hintergrund.
+        Kein Eintrag → fetch() synchron ausführen und speichern (Fehler werden durchgereicht).
+        """
+        state, value = self._lookup(key)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            self._refresh_in_background(key, fetch)
+            return value
+        value = fetch()
+        self.set(key, value)
+        return value
+
+    def _refresh_in_background(self, key: str, fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run() -> None:
+            try:
+                self.set(key, fetch())
+                with self._lock:
+                    self.refreshes += 1
+            except Exception:
+                # Alter Wert bleibt bis zum Verfall stehen
+                with self._lock:
+                    self.refresh_errors += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name="cache-refresh", daemon=True).start()
+
+    async def aget_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Wie get_or_fetch für async fetch(); das Neuladen veralteter Einträge läuft als Task im Event-Loop.
+        SQLite-Zugriffe (Lesen inkl. accessed_at-Update, Schreiben) laufen in einem Worker-Thread.
+        """
+        state, value = await asyncio.to_thread(self._lookup, key)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            self._refresh_in_task(key, fetch)
+            return value
+        value = await fetch()
+        await asyncio.to_thread(self.set, key, value)
+        return value
+
+    def _refresh_in_task(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        async def run() -> None:
+            try:
+                value = await fetch()
+                await asyncio.to_thread(self.set, key, value)
+                with self._lock:
+                    self.refreshes += 1
+            except Exception:
+                with self._lock:
+                    self.refresh_errors += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        # Referenz halten, sonst kann der Task vorzeitig eingesammelt werden
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db().execute("DELETE FROM cache_entries")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def stats(self) -> dict:
+        size = len(self)
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": size,
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "stale_seconds": self.stale_seconds,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+            }
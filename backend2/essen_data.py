@@ -3,6 +3,18 @@ Statische „Essen-API“-Daten – nur im Quellcode, keine externe API.
 Realistische Lebensmittel-Produkte für Suche bei category=food.
 Format kompatibel mit SerpAPI shopping_results (title, link, price, thumbnail, source).
 """
+import heapq
+import math
+import sqlite3
+from bisect import bisect_left, bisect_right
+
+from retailers.catalog_index import substring_terms, word_parts
+from ttl_cache import LRUTTLCache
+
+# Teilwort-Treffer je Suchbegriff; begrenzt, da die Begriffe aus beliebigen Nutzeranfragen stammen
+_TERM_CACHE_SIZE = 1024
+# N-Gramm-Längen des Vokabular-Index; Suchbegriffe haben mindestens 2 Zeichen
+_GRAM_SIZES = (2, 3)
 
 # Real-life-artige Lebensmittel-Produkte (Demo-Daten im Code)
 ESSEN_PRODUKTE = [
@@ -69,6 +81,143 @@ def _parse_price(price_str: str) -> float:
         return 0.0
 
 
+def _search_essen_catalog_db(
+    query: str,
+    budget_min: float | None,
+    budget_max: float | None,
+    limit: int,
+) -> list[dict] | None:
+    """
+    Suche in der SQLite-Katalog-DB (retailers.sqlite_catalog) mit derselben Teilwort-Suche und Reihenfolge
+    wie EssenIndex; None wenn dort kein Essen-Katalog liegt.
+    """
+    from config import CATALOG_DB_PATH
+    from retailers.base import ProductFilter
+    from retailers.sqlite_catalog import catalog_retailers, search_catalog, search_catalog_substring
+
+    if "essen" not in {rid for rid, _ in catalog_retailers(CATALOG_DB_PATH)}:
+        return None
+    filters = ProductFilter(price_min=budget_min, price_max=budget_max)
+    try:
+        products = search_catalog_substring(CATALOG_DB_PATH, "essen", query, limit=limit, filters=filters)
+    except sqlite3.OperationalError:
+        # Katalog-DB von vor dem Trigramm-Index (neu importieren): Volltextsuche nach bm25
+        products = search_catalog(CATALOG_DB_PATH, "essen", query, limit=limit, filters=filters, fill=not query.strip())
+    return [
+        {
+            "title": p.title,
+            "link": p.product_url or "",
+            "price": p.raw.get("price") or f"{p.price:.2f}",
+            "extracted_price": p.price,
+            "source": p.raw.get("source", ""),
+            "thumbnail": p.image_url or "",
+            "product_id": p.product_id,
+        }
+        for p in products
+    ]
+
+
+def _ngrams(text: str, n: int) -> set[str]:
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+class EssenIndex:
+    """
+    Einmal vorverarbeiteter Essen-Katalog: Token-Index über Titel + Quelle, N-Gramm-Index über das
+    Vokabular (Teilwort-Suche), vorab geparste Preise und eine nach Preis sortierte Liste für
+    Budget-Bereiche per Binärsuche.
+    """
+
+    def __init__(self, products: list[dict]):
+        self.products = products
+        self.prices = [_parse_price(p.get("price", "0")) for p in products]
+        self._postings: dict[str, list[int]] = {}
+        for doc_id, p in enumerate(products):
+            for token in set(word_parts(f"{p.get('title') or ''} {p.get('source') or ''}")):
+                self._postings.setdefault(token, []).append(doc_id)
+        # Bi- und Trigramme → Vokabular-Tokens, damit Teilwort-Suchen nicht das ganze Vokabular prüfen
+        self._vocab = list(self._postings)
+        self._grams: dict[str, list[int]] = {}
+        for token_id, token in enumerate(self._vocab):
+            for n in _GRAM_SIZES:
+                for gram in _ngrams(token, n):
+                    self._grams.setdefault(gram, []).append(token_id)
+        order = sorted(range(len(products)), key=self.prices.__getitem__)
+        self._by_price = order
+        self._sorted_prices = [self.prices[i] for i in order]
+        # Position jedes Dokuments in _by_price (für den Abgleich von Treffern mit dem Preisbereich)
+        self._price_rank = [0] * len(products)
+        for rank, doc_id in enumerate(order):
+            self._price_rank[doc_id] = rank
+        self._term_cache = LRUTTLCache(maxsize=_TERM_CACHE_SIZE, ttl_seconds=math.inf)
+
+    def _tokens_containing(self, term: str) -> list[str]:
+        """Vokabular-Tokens, die term enthalten: Kandidaten aus der kürzesten N-Gramm-Liste, dann prüfen."""
+        n = min(len(term), _GRAM_SIZES[-1])
+        lists = sorted((self._grams.get(gram, ()) for gram in _ngrams(term, n)), key=len)
+        if not lists or not lists[0]:
+            return []
+        candidates = set(lists[0])
+        for ids in lists[1:]:
+            candidates.intersection_update(ids)
+        return [self._vocab[i] for i in candidates if term in self._vocab[i]]
+
+    def _docs_for_term(self, term: str) -> frozenset[int]:
+        """Teilwort-Treffer wie bisher ("chip" findet "Chips"), über den N-Gramm-Index des Vokabulars."""
+        docs = self._term_cache.get(term)
+        if docs is None:
+            docs = frozenset(d for token in self._tokens_containing(term) for d in self._postings[token])
+            self._term_cache.set(term, docs)
+        return docs
+
+    def _price_bounds(self, budget_min: float | None, budget_max: float | None) -> tuple[int, int]:
+        """Bereich [lo, hi) in _by_price per Binärsuche."""
+        lo = 0 if budget_min is None else bisect_left(self._sorted_prices, budget_min)
+        hi = len(self._sorted_prices) if budget_max is None else bisect_right(self._sorted_prices, budget_max)
+        return lo, hi
+
+    def search(
+        self,
+        query: str,
+        budget_min: float | None = None,
+        budget_max: float | None = None,
+        limit: int = 3,
+    ) -> list[int]:
+        """Dokument-IDs nach Anzahl getroffener Suchbegriffe (absteigend), bei Gleichstand Katalog-Reihenfolge."""
+        terms = substring_terms(query)
+        lo, hi = self._price_bounds(budget_min, budget_max)
+        if not terms:
+            return heapq.nsmallest(limit, self._by_price[lo:hi])
+        coverage: dict[int, int] = {}
+        for term in terms:
+            for d in self._docs_for_term(term):
+                coverage[d] = coverage.get(d, 0) + 1
+        # Schnittmenge mit dem Preisbereich: über die kleinere Seite laufen
+        if hi - lo < len(coverage):
+            hits = ((-coverage[d], d) for d in self._by_price[lo:hi] if d in coverage)
+        else:
+            rank = self._price_rank
+            hits = ((-n, d) for d, n in coverage.items() if lo <= rank[d] < hi)
+        return [d for _, d in heapq.nsmallest(limit, hits)]
+
+
+_index: EssenIndex | None = None
+
+
+def load_essen_catalog(products: list[dict]) -> None:
+    """Essen-Katalog ersetzen (z. B. komplettes Supermarkt-Sortiment) und den Index neu aufbauen."""
+    global ESSEN_PRODUKTE, _index
+    ESSEN_PRODUKTE = products
+    _index = EssenIndex(products)
+
+
+def _get_index() -> EssenIndex:
+    global _index
+    if _index is None or _index.products is not ESSEN_PRODUKTE:
+        _index = EssenIndex(ESSEN_PRODUKTE)
+    return _index
+
+
 def search_essen(
     query: str,
     budget_min: float | None = None,
@@ -76,39 +225,26 @@ def search_essen(
     limit: int = 3,
 ) -> list[dict]:
     """
-    Filtert die statischen Essen-Daten nach Suchbegriff und optional Budget.
+    Sucht im Essen-Katalog nach Suchbegriff und optional Budget (über EssenIndex).
+    Treffer mit mehr passenden Suchbegriffen zuerst.
     Rückgabe im SerpAPI-ähnlichen Format (title, link, price, source, thumbnail, product_id).
+    Ist eine Katalog-DB mit Händler „essen“ konfiguriert, wird dort (bm25) gesucht.
     """
-    q_lower = (query or "").lower()
-    # Suchbegriffe: einzelne Wörter für Treffer
-    terms = [t for t in q_lower.split() if len(t) > 1]
-
-    def matches(product: dict) -> bool:
-        title = (product.get("title") or "").lower()
-        source = (product.get("source") or "").lower()
-        text = f"{title} {source}"
-        if not terms:
-            return True
-        return any(t in text for t in terms)
-
-    filtered = [p for p in ESSEN_PRODUKTE if matches(p)]
+    db_results = _search_essen_catalog_db(query, budget_min, budget_max, limit)
+    if db_results is not None:
+        return db_results
+    index = _get_index()
     out = []
-    for p in filtered:
-        price_val = _parse_price(p.get("price", "0"))
-        if budget_min is not None and price_val < budget_min:
-            continue
-        if budget_max is not None and price_val > budget_max:
-            continue
+    for doc_id in index.search(query, budget_min, budget_max, limit):
+        p = index.products[doc_id]
         # Kopie mit einheitlichen Keys (SerpAPI-kompatibel)
         out.append({
             "title": p.get("title", ""),
             "link": p.get("link", ""),
             "price": p.get("price", ""),
-            "extracted_price": price_val,
+            "extracted_price": index.prices[doc_id],
             "source": p.get("source", ""),
             "thumbnail": p.get("thumbnail", ""),
             "product_id": p.get("product_id", ""),
         })
-        if len(out) >= limit:
-            break
     return out
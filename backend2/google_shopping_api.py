@@ -1,14 +1,11 @@
-"""Plan aus Session-Anforderungen + Google-Shopping-Suche pro Komponente."""
+"""Ausgabe pro Komponente für gespeicherte Pläne (plan_service.get_or_create_plan) mit Google-Shopping-Treffern."""
 
-from shopping_planner import run_shopping_plan
 
-
-def plan_and_search(requirements: dict, location: str = "Germany") -> list[dict] | None:
+def plan_component_results(plan: dict | None) -> list[dict] | None:
     """
-    Erzeugt den KI-Plan und führt pro Komponente eine Google-Shopping-Suche (q=Name) aus.
+    Zerlegt einen Plan (run_shopping_plan bzw. gespeichert) in die Ausgabe pro Komponente.
     Rückgabe: Liste von {"component": {...}, "shopping_results": [...]} für PlanComponentSearchOut.
     """
-    plan = run_shopping_plan(requirements)
     if not plan or not isinstance(plan.get("components"), list):
         return None
     out = []
@@ -20,3 +17,4 @@ def plan_and_search(requirements: dict, location: str = "Germany") -> list[dict]
             "shopping_results": c.get("shopping_results", []),
         })
     return out
+
@@ -0,0 +1,90 @@
+"""
+Bulk-Import von Produktkatalogen in die SQLite-Katalog-DB (retailers/sqlite_catalog.py).
+
+    python ingest_catalog.py ingest dump.jsonl --retailer myshop --name "My Shop"
+    python ingest_catalog.py ingest-demo
+
+JSONL: eine Zeile pro Produkt im ProductOut-Format (product_id, title, price, currency,
+delivery_estimate_days, image_url, product_url, variants, raw).
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Iterator
+
+from config import CATALOG_DB_PATH
+from essen_data import ESSEN_PRODUKTE, _parse_price
+from retailers.base import RetailerProduct
+from retailers.mock_retailers import SPORTDIRECT_PRODUCTS, STYLEHUB_PRODUCTS, URBAN_PRODUCTS
+from retailers.sqlite_catalog import ingest_products
+from schemas import ProductVariant
+
+
+def iter_jsonl(path: Path, retailer_id: str) -> Iterator[RetailerProduct]:
+    """Eine Zeile = ein Produkt im ProductOut-Format (retailer_id optional)."""
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            d = json.loads(line)
+            yield RetailerProduct(
+                retailer_id=retailer_id,
+                product_id=str(d["product_id"]),
+                title=d["title"],
+                price=float(d["price"]),
+                currency=d.get("currency") or "EUR",
+                delivery_estimate_days=d.get("delivery_estimate_days"),
+                image_url=d.get("image_url"),
+                product_url=d.get("product_url"),
+                variants=[ProductVariant(**v) for v in d.get("variants") or []],
+                raw=d.get("raw") or {},
+            )
+
+
+def essen_products() -> Iterator[RetailerProduct]:
+    for p in ESSEN_PRODUKTE:
+        yield RetailerProduct(
+            retailer_id="essen",
+            product_id=p.get("product_id", ""),
+            title=p.get("title", ""),
+            price=_parse_price(p.get("price", "0")),
+            currency="EUR",
+            delivery_estimate_days=None,
+            image_url=p.get("thumbnail") or None,
+            product_url=p.get("link") or None,
+            variants=[],
+            raw={"source": p.get("source", ""), "price": p.get("price", "")},
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Produktkataloge in die SQLite-Katalog-DB importieren.")
+    parser.add_argument("--db", default=CATALOG_DB_PATH or "catalog.db", help="Pfad der Katalog-DB")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_ingest = sub.add_parser("ingest", help="JSONL-Dump eines Händlers importieren (ersetzt dessen Katalog)")
+    p_ingest.add_argument("file", type=Path)
+    p_ingest.add_argument("--retailer", required=True, help="retailer_id")
+    p_ingest.add_argument("--name", help="Anzeigename (Default: retailer_id)")
+    p_ingest.add_argument("--batch-size", type=int, default=5000)
+    sub.add_parser("ingest-demo", help="Eingebaute Demo-Kataloge (Mock-Händler + Essen) importieren")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        n = ingest_products(
+            args.db, args.retailer, args.name or args.retailer,
+            iter_jsonl(args.file, args.retailer), batch_size=args.batch_size,
+        )
+        print(f"{n} Produkte für {args.retailer} importiert → {args.db}")
+    else:
+        for retailer_id, name, products in (
+            ("stylehub", "StyleHub", STYLEHUB_PRODUCTS),
+            ("urbanoutfit", "UrbanOutfit", URBAN_PRODUCTS),
+            ("sportdirect", "SportDirect", SPORTDIRECT_PRODUCTS),
+            ("essen", "Essen", essen_products()),
+        ):
+            n = ingest_products(args.db, retailer_id, name, products)
+            print(f"{n} Produkte für {retailer_id} importiert → {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Hintergrund-Jobs für Shopping-Plan und Komponenten-Suche: lokaler Worker-Pool, Status und Fortschritt
+in der Tabelle jobs. Gleiche Aufträge (Session, Art, Brief-Hash) laufen nur einmal gleichzeitig.
+"""
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+import orjson
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import JOB_MAX_WORKERS, JOB_POLL_INTERVAL_SECONDS, JOB_STALE_SECONDS
+from database import SessionLocal
+from google_shopping_api import plan_component_results
+from models import Job
+from plan_service import get_or_create_plan, requirements_hash
+from schemas import JobOut, PlanComponentSearchOut, ShoppingPlanComponent, ShoppingPlanOut
+
+KINDS = ("shopping_plan", "google_shopping")
+ACTIVE = ("queued", "running")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_futures: dict[str, Future] = {}
+# Benachrichtigt wartende Streams über Statusänderungen (innerhalb des Prozesses)
+_changed = threading.Condition()
+
+
+class JobCancelled(Exception):
+    """Job wurde abgebrochen (oder ist nicht mehr aktiv); Worker beendet die Arbeit."""
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, JOB_MAX_WORKERS), thread_name_prefix="job")
+        return _executor
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _is_stale(job: Job) -> bool:
+    """Aktiver Job ohne Lebenszeichen (z. B. Worker-Prozess beendet)."""
+    if job.status not in ACTIVE or job.updated_at is None:
+        return False
+    updated = job.updated_at if job.updated_at.tzinfo else job.updated_at.replace(tzinfo=timezone.utc)
+    return _now() - updated > timedelta(seconds=JOB_STALE_SECONDS)
+
+
+def _update_active(job_id: str, **fields) -> None:
+    """Felder nur setzen, solange der Job aktiv ist; sonst JobCancelled (abgebrochen, ggf. von anderem Prozess)."""
+    db = SessionLocal()
+    try:
+        fields["updated_at"] = _now()
+        updated = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status.in_(ACTIVE))
+            .update(fields, synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+    with _changed:
+        _changed.notify_all()
+    if not updated:
+        raise JobCancelled(job_id)
+
+
+def _result_payload(kind: str, plan: dict):
+    """Ergebnis im Format der synchronen Endpunkte (ShoppingPlanOut bzw. list[PlanComponentSearchOut])."""
+    if kind == "shopping_plan":
+        return ShoppingPlanOut(**plan).model_dump(mode="json")
+    return [
+        PlanComponentSearchOut(
+            component=ShoppingPlanComponent(**item["component"]),
+            shopping_results=item["shopping_results"],
+        ).model_dump(mode="json")
+        for item in plan_component_results(plan) or []
+    ]
+
+
+def _run(job_id: str, kind: str, session_id: str, requirements: dict) -> None:
+    def progress(step: str, done: int, total: int) -> None:
+        # KI-Plan zählt 10 %, die Komponenten-Suche den Rest
+        value = 0.0 if step == "plan" else 0.1 + 0.9 * (done / total if total else 1.0)
+        _update_active(job_id, step=step, progress=round(value, 3))
+
+    db = SessionLocal()
+    try:
+        _update_active(job_id, status="running")
+        plan = get_or_create_plan(db, session_id, requirements, on_progress=progress)
+        if not plan:
+            _update_active(
+                job_id, status="failed", error="Plan konnte nicht erstellt werden (KI oder GOOGLE_API_KEY fehlt)."
+            )
+            return
+        _update_active(
+            job_id,
+            status="succeeded",
+            progress=1.0,
+            result=json.dumps(_result_payload(kind, plan), ensure_ascii=False),
+        )
+    except JobCancelled:
+        pass
+    except Exception as exc:
+        try:
+            _update_active(job_id, status="failed", error=f"{type(exc).__name__}: {exc}")
+        except JobCancelled:
+            pass
+    finally:
+        db.close()
+        _futures.pop(job_id, None)
+
+
+def submit_plan_job(db: Session, session_id: str, kind: str, requirements: dict) -> Job:
+    """
+    Legt einen Job an und reiht ihn in den Worker-Pool ein; kehrt sofort zurück.
+    Läuft für (Session, kind, Brief-Hash) schon ein Job, wird dieser zurückgegeben.
+    """
+    key = requirements_hash(requirements)
+    for _ in range(2):
+        existing = (
+            db.query(Job)
+            .filter(
+                Job.session_id == session_id,
+                Job.kind == kind,
+                Job.requirements_hash == key,
+                Job.status.in_(ACTIVE),
+            )
+            .first()
+        )
+        if existing is not None and not _is_stale(existing):
+            return existing
+        if existing is not None:
+            existing.status = "failed"
+            existing.error = "Job abgebrochen (Worker nicht mehr aktiv)."
+        job = Job(session_id=session_id, kind=kind, requirements_hash=key)
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Gleichzeitige Einreichung: der andere Job gewinnt (Unique-Index auf aktive Jobs)
+            db.rollback()
+            continue
+        db.refresh(job)
+        _futures[job.id] = _get_executor().submit(_run, job.id, kind, session_id, requirements)
+        return job
+    raise RuntimeError("Job konnte nicht angelegt werden.")
+
+
+def get_job(db: Session, job_id: str) -> Job | None:
+    job = db.get(Job, job_id)
+    if job is not None and _is_stale(job):
+        job.status = "failed"
+        job.error = "Job abgebrochen (Worker nicht mehr aktiv)."
+        db.commit()
+    return job
+
+
+def cancel_job(db: Session, job_id: str) -> Job | None:
+    """Bricht einen wartenden oder laufenden Job ab; beendete Jobs bleiben unverändert."""
+    job = db.get(Job, job_id)
+    if job is None:
+        return None
+    if job.status in ACTIVE:
+        job.status = "cancelled"
+        db.commit()
+        future = _futures.pop(job_id, None)
+        if future is not None:
+            future.cancel()  # greift nur, solange der Job noch wartet
+        with _changed:
+            _changed.notify_all()
+    return job
+
+
+def iter_job_events(job_id: str) -> Iterator[bytes]:
+    """
+    NDJSON-Stream: {"event": "progress", "data": JobOut} bei jeder Änderung,
+    zum Schluss {"event": "done", "data": JobOut} (succeeded, failed oder cancelled).
+    """
+    last = None
+    while True:
+        db = SessionLocal()
+        try:
+            job = get_job(db, job_id)
+            if job is None:
+                return
+            data = JobOut(**job.to_dict()).model_dump(mode="json")
+        finally:
+            db.close()
+        finished = data["status"] not in ACTIVE
+        state = (data["status"], data["step"], data["progress"])
+        if finished:
+            yield orjson.dumps({"event": "done", "data": data}) + b"\n"
+            return
+        if state != last:
+            yield orjson.dumps({"event": "progress", "data": data}) + b"\n"
+            last = state
+        with _changed:
+            _changed.wait(JOB_POLL_INTERVAL_SECONDS)
@@ -0,0 +1,432 @@
+"""
+Gemeinsamer Zugang zum Sprachmodell für Chat-Agent und Shopping-Plan.
+Ein langlebiger Client (Verbindungspool), begrenzte Parallelität, Wiederholungen mit Jitter,
+Zeitlimit pro Aufruf sowie Token-/Latenz-Zähler; generate/generate_stream blockierend, agenerate
+awaitbar, alle mit derselben Parallelitätsgrenze. LLM_BACKEND=fake liefert ein deterministisches
+Modell im Prozess (ohne Netz und API-Key) für Offline-Benchmarks.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from config import (
+    GEMINI_MODEL,
+    GOOGLE_API_KEY,
+    LLM_BACKEND,
+    LLM_FAKE_LATENCY_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_TIMEOUT_SECONDS,
+)
+
+# HTTP-Status, bei denen sich ein erneuter Versuch lohnt
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+_client = None
+_client_lock = threading.Lock()
+# Ein Limit für alle Aufrufer (Threads und Event-Loops); async wartet per Polling statt einen Thread zu blockieren
+_slots = threading.BoundedSemaphore(max(1, LLM_MAX_CONCURRENCY))
+_ASYNC_SLOT_POLL_SECONDS = 0.01
+
+
+@dataclass
+class _PurposeStats:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    streams: int = 0
+    first_token_total: float = 0.0
+    prompt_tokens_max: int = 0
+    skipped: int = 0
+    recent_prompt_tokens: list[int] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        ok = self.calls - self.errors
+        recent = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "prompt_tokens_avg": round(self.prompt_tokens / ok, 1) if ok else 0.0,
+            "prompt_tokens_max": self.prompt_tokens_max,
+            "recent_prompt_tokens": list(self.recent_prompt_tokens),
+            "latency_avg_ms": round(1000 * self.latency_total / ok, 1) if ok else 0.0,
+            "latency_p95_ms": round(1000 * recent[int(0.95 * (len(recent) - 1))], 1) if recent else 0.0,
+            "latency_max_ms": round(1000 * self.latency_max, 1),
+            "first_token_avg_ms": round(1000 * self.first_token_total / self.streams, 1) if self.streams else 0.0,
+        }
+
+
+_stats: dict[str, _PurposeStats] = {}
+_stats_lock = threading.Lock()
+_LATENCY_WINDOW = 1000  # für p95 nur die letzten N Aufrufe
+_RECENT_CALLS = 20  # Prompt-Tokens der letzten N Aufrufe einzeln ausweisen
+
+
+def is_configured() -> bool:
+    """True, wenn Aufrufe möglich sind (Fake-Backend oder API-Key gesetzt)."""
+    return LLM_BACKEND == "fake" or bool(GOOGLE_API_KEY)
+
+
+def get_client():
+    """Langlebiger genai-Client; hält den HTTP-Verbindungspool über Requests hinweg."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from google import genai
+            from google.genai import types
+
+            _client = genai.Client(
+                api_key=GOOGLE_API_KEY,
+                http_options=types.HttpOptions(timeout=int(LLM_TIMEOUT_SECONDS * 1000)),
+            )
+        return _client
+
+
+def _is_retryable(exc: Exception) -> bool:
+    from google.genai import errors
+
+    if isinstance(exc, errors.APIError):
+        return exc.code in _RETRYABLE_STATUS
+    # Netzwerk-/Timeout-Fehler von httpx
+    return type(exc).__module__.startswith("httpx") or isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def _record(
+    purpose: str,
+    latency: float | None,
+    retries: int,
+    response=None,
+    first_token: float | None = None,
+) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    with _stats_lock:
+        s = _stats.setdefault(purpose, _PurposeStats())
+        s.calls += 1
+        s.retries += retries
+        if latency is None:
+            s.errors += 1
+            return
+        if first_token is not None:
+            s.streams += 1
+            s.first_token_total += first_token
+        s.latency_total += latency
+        s.latency_max = max(s.latency_max, latency)
+        s.latencies.append(latency)
+        del s.latencies[:-_LATENCY_WINDOW]
+        if usage is not None:
+            prompt_tokens = usage.prompt_token_count or 0
+            s.prompt_tokens += prompt_tokens
+            s.output_tokens += usage.candidates_token_count or 0
+            s.prompt_tokens_max = max(s.prompt_tokens_max, prompt_tokens)
+            # Prompt-Größe pro Aufruf: bleibt sie bei langen Gesprächen flach?
+            s.recent_prompt_tokens.append(prompt_tokens)
+            del s.recent_prompt_tokens[:-_RECENT_CALLS]
+
+
+def record_skipped(purpose: str) -> None:
+    """Zählt einen Aufruf, der ohne Modell beantwortet wurde (z. B. Regel-Pfad im Chat)."""
+    with _stats_lock:
+        _stats.setdefault(purpose, _PurposeStats()).skipped += 1
+
+
+def generate(contents, config, purpose: str = "default", model: str | None = None, timeout: float | None = None):
+    """
+    generate_content über den gemeinsamen Client (bzw. das Fake-Modell).
+    Höchstens LLM_MAX_CONCURRENCY Aufrufe gleichzeitig; vorübergehende Fehler (429, 5xx, Netzwerk)
+    werden bis zu LLM_MAX_RETRIES-mal mit exponentiellem Backoff und vollem Jitter wiederholt.
+    Der letzte Fehler wird durchgereicht.
+    """
+    config = _with_timeout(config, timeout)
+    model = model or GEMINI_MODEL
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        try:
+            with _slots:
+                if LLM_BACKEND == "fake":
+                    response = _fake_generate(contents, config)
+                else:
+                    response = get_client().models.generate_content(model=model, contents=contents, config=config)
+        except Exception as exc:
+            if attempt >= LLM_MAX_RETRIES or not _is_retryable(exc):
+                _record(purpose, None, attempt)
+                raise
+            attempt += 1
+            _backoff(attempt)
+            continue
+        _record(purpose, time.monotonic() - started, attempt, response)
+        return response
+
+
+@asynccontextmanager
+async def _async_slot():
+    """Platz in _slots belegen, ohne den Event-Loop zu blockieren (Abbruch beim Warten belegt nichts)."""
+    while not _slots.acquire(blocking=False):
+        await asyncio.sleep(_ASYNC_SLOT_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+async def agenerate(contents, config, purpose: str = "default", model: str | None = None, timeout: float | None = None):
+    """
+    Wie generate, aber awaitbar über client.aio: belegt während der Antwortzeit keinen Thread.
+    Gleiche Wiederholungen, Zähler und Parallelitätsgrenze (geteilt mit generate/generate_stream).
+    """
+    config = _with_timeout(config, timeout)
+    model = model or GEMINI_MODEL
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        try:
+            async with _async_slot():
+                if LLM_BACKEND == "fake":
+                    response = await _afake_generate(contents, config)
+                else:
+                    response = await get_client().aio.models.generate_content(
+                        model=model, contents=contents, config=config,
+                    )
+        except Exception as exc:
+            if attempt >= LLM_MAX_RETRIES or not _is_retryable(exc):
+                _record(purpose, None, attempt)
+                raise
+            attempt += 1
+            await asyncio.sleep(_backoff_seconds(attempt))
+            continue
+        _record(purpose, time.monotonic() - started, attempt, response)
+        return response
+
+
+def generate_stream(
+    contents,
+    config,
+    purpose: str = "default",
+    model: str | None = None,
+    timeout: float | None = None,
+) -> Iterator:
+    """
+    Wie generate, aber über generate_content_stream: liefert die Teilantworten (Chunks) sofort weiter.
+    Wiederholt wird nur, solange noch kein Chunk ausgeliefert wurde. Zusätzlich zur Gesamtdauer
+    wird die Zeit bis zum ersten Chunk gezählt.
+    """
+    config = _with_timeout(config, timeout)
+    model = model or GEMINI_MODEL
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        first_token: float | None = None
+        last = None
+        try:
+            with _slots:
+                if LLM_BACKEND == "fake":
+                    stream = _fake_stream(contents, config)
+                else:
+                    stream = get_client().models.generate_content_stream(model=model, contents=contents, config=config)
+                for chunk in stream:
+                    if first_token is None:
+                        first_token = time.monotonic() - started
+                    last = chunk
+                    yield chunk
+        except Exception as exc:
+            if first_token is not None or attempt >= LLM_MAX_RETRIES or not _is_retryable(exc):
+                _record(purpose, None, attempt)
+                raise
+            attempt += 1
+            _backoff(attempt)
+            continue
+        _record(purpose, time.monotonic() - started, attempt, last, first_token)
+        return
+
+
+def _with_timeout(config, timeout: float | None):
+    if timeout is None or config is None:
+        return config
+    from google.genai import types
+
+    return config.model_copy(update={"http_options": types.HttpOptions(timeout=int(timeout * 1000))})
+
+
+def _backoff_seconds(attempt: int) -> float:
+    # Exponentiell mit vollem Jitter: zufällig zwischen 0 und base * 2^(n-1)
+    return random.uniform(0, LLM_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+
+
+def _backoff(attempt: int) -> None:
+    time.sleep(_backoff_seconds(attempt))
+
+
+def stats() -> dict:
+    """Zähler je Zweck (z. B. "chat", "plan"): Aufrufe, Fehler, Wiederholungen, Tokens, Latenz."""
+    with _stats_lock:
+        return {
+            "backend": LLM_BACKEND,
+            "max_concurrency": LLM_MAX_CONCURRENCY,
+            "purposes": {k: v.as_dict() for k, v in _stats.items()},
+        }
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+# ---- Fake-Modell (deterministisch, ohne Netz) ----
+
+_BUDGET_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:€|eur|euro)", re.IGNORECASE)
+_PEOPLE_RE = re.compile(r"(\d+)\s*(?:personen|leute|gäste|teilnehmer|people)", re.IGNORECASE)
+_SIZE_RE = re.compile(r"größe\s*([a-z0-9]{1,4})", re.IGNORECASE)
+_REASONS = ("ski", "party", "hackathon", "outfit", "hochzeit", "geburtstag")
+
+
+def _count_tokens(text: str) -> int:
+    # Grobe Näherung wie bei Gemini: ~4 Zeichen pro Token
+    return max(1, len(text) // 4)
+
+
+def _content_text(contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    return "\n".join(p.text for c in contents for p in (c.parts or []) if p.text)
+
+
+def _fake_chat_arguments(text: str) -> dict:
+    args: dict = {}
+    lower = text.lower()
+    if m := _BUDGET_RE.search(text):
+        args["budget_max"] = float(m.group(1).replace(",", "."))
+        args["budget_currency"] = "EUR"
+    if m := _PEOPLE_RE.search(text):
+        args["people_count"] = int(m.group(1))
+    if m := _SIZE_RE.search(text):
+        args["preferences"] = [f"Größe {m.group(1).upper()}"]
+    for reason in _REASONS:
+        if reason in lower:
+            args["reason"] = args["event_type"] = reason
+            break
+    if "snack" in lower or "essen" in lower or "hackathon" in lower:
+        args["category"] = "food"
+    elif args.get("reason"):
+        args["category"] = "clothing"
+    return args
+
+
+def _fake_chat(contents, config):
+    from google.genai import types
+
+    last = contents[-1]
+    if any(p.function_response for p in last.parts or []):
+        # Zweite Runde nach den Tool-Antworten: kurze Nachfrage
+        return [types.Part(text="Bis wann brauchst du es?")]
+    user_turns = [c for c in contents if c.role == "user" and any(p.text for p in c.parts or [])]
+    last_text = " ".join(p.text for p in last.parts or [] if p.text)
+    args = _fake_chat_arguments(last_text.split("Nächste Nutzernachricht:")[-1])
+    parts = [types.Part(function_call=types.FunctionCall(name="update_shopping_requirements", args=args))]
+    if ("budget_max" in args and "reason" in args) or len(user_turns) >= 3:
+        parts.append(types.Part(function_call=types.FunctionCall(name="mark_requirements_complete", args={})))
+    return parts
+
+
+def _fake_plan(prompt: str):
+    from google.genai import types
+
+    match = re.search(r"\{\n.*?\n\}", prompt, re.DOTALL)
+    brief = json.loads(match.group(0)) if match else {}
+    names = brief.get("must_haves") or brief.get("nice_to_haves") or ["Hauptartikel", "Zubehör", "Sonstiges"]
+    budget_max = brief.get("budget_max") or 100.0
+    budget_min = brief.get("budget_min") or 0.0
+    category = brief.get("category") if brief.get("category") in ("clothing", "food") else "other"
+    share = 1.0 / len(names)
+    plan = {
+        "currency": brief.get("budget_currency") or "EUR",
+        "total_budget_min": budget_min,
+        "total_budget_max": budget_max,
+        "components": [
+            {
+                "id": str(i + 1),
+                "name": name,
+                "category": category,
+                "budget_min": round(budget_min * share, 2),
+                "budget_max": round(budget_max * share, 2),
+                "priority": "must_have",
+                "quantity": brief.get("people_count") or 1,
+                "notes": list(brief.get("preferences") or []),
+            }
+            for i, name in enumerate(names)
+        ],
+    }
+    return [types.Part(text=json.dumps(plan, ensure_ascii=False))]
+
+
+def _fake_parts(contents, config) -> list:
+    if getattr(config, "response_mime_type", None) == "application/json":
+        return _fake_plan(_content_text(contents))
+    return _fake_chat(contents, config)
+
+
+def _fake_response(parts: list, contents, config, counted: list | None):
+    """counted: Parts, deren Tokens in usage_metadata gezählt werden (None = ohne Zählung)."""
+    from google.genai import types
+
+    metadata = None
+    if counted is not None:
+        output = " ".join(p.text or (p.function_call.name if p.function_call else "") for p in counted)
+        system = (config.system_instruction or "") if config is not None else ""
+        metadata = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=_count_tokens(str(system) + _content_text(contents)),
+            candidates_token_count=_count_tokens(output),
+        )
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+        usage_metadata=metadata,
+    )
+
+
+def _fake_generate(contents, config):
+    """Antwortet wie Gemini (GenerateContentResponse), rein regelbasiert und reproduzierbar."""
+    if LLM_FAKE_LATENCY_SECONDS > 0:
+        time.sleep(LLM_FAKE_LATENCY_SECONDS)
+    parts = _fake_parts(contents, config)
+    return _fake_response(parts, contents, config, parts)
+
+
+async def _afake_generate(contents, config):
+    if LLM_FAKE_LATENCY_SECONDS > 0:
+        await asyncio.sleep(LLM_FAKE_LATENCY_SECONDS)
+    parts = _fake_parts(contents, config)
+    return _fake_response(parts, contents, config, parts)
+
+
+def _fake_stream(contents, config) -> Iterator:
+    """Streaming-Variante: Text wortweise, Funktionsaufrufe als eigene Chunks; Latenz auf die Chunks verteilt."""
+    from google.genai import types
+
+    parts = _fake_parts(contents, config)
+    pieces: list = []
+    for part in parts:
+        if part.text:
+            words = part.text.split(" ")
+            pieces.extend(types.Part(text=w if i == 0 else " " + w) for i, w in enumerate(words))
+        else:
+            pieces.append(part)
+    for i, piece in enumerate(pieces):
+        if LLM_FAKE_LATENCY_SECONDS > 0:
+            time.sleep(LLM_FAKE_LATENCY_SECONDS / len(pieces))
+        # Token-Zählung wie bei Gemini nur im letzten Chunk
+        yield _fake_response([piece], contents, config, parts if i == len(pieces) - 1 else None)
@@ -3,14 +3,17 @@ Agentic Commerce API – FastAPI Backend.
 Konversationeller Brief, Multi-Händler-Suche, Ranking, kombinierter Warenkorb, simulierter Checkout.
 """
 from pathlib import Path
+from typing import Iterator
 
-from fastapi import FastAPI, Depends, HTTPException
+import orjson
+from fastapi import FastAPI, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from database import engine, get_db, Base
+from database import engine, get_db, get_async_db, SessionLocal
 from models import ShoppingSession, ShoppingRequirement, ConversationMessage, CartItem, CheckoutDetails, SearchFilter
 from schemas import (
     MessageRequest,
@@ -20,8 +23,12 @@ from schemas import (
     ShoppingSpecOut,
     CartItemOut,
     CartSummaryOut,
+    SearchPageOut,
     SearchResultOut,
     CheckoutSimulationOut,
+    CacheStatsOut,
+    LLMStatsOut,
+    JobOut,
     ShoppingPlanOut,
     ShoppingPlanComponent,
     PlanComponentSearchOut,
@@ -32,40 +39,20 @@ from schemas import (
     FilterOut,
     FilterRequest,
 )
-from agent import process_message
-from shopping_planner import run_shopping_plan
-from google_shopping_api import plan_and_search
-from search_service import run_search
+import llm_gateway
+from agent import aprocess_message, stream_message
+from shopping_planner import SERPAPI_CACHE
+from google_shopping_api import plan_component_results
+from plan_service import aget_or_create_plan
+from job_queue import KINDS as JOB_KINDS, cancel_job, get_job, iter_job_events, submit_plan_job
+from search_service import SEARCH_CACHE, get_search_page_json, iter_search, run_search_json
 from cart_service import cart_to_summary, add_to_cart, remove_from_cart, update_cart_item_quantity
 from checkout_simulation import run_checkout_simulation
-from retailers.base import RetailerProduct
+from retailers.base import ProductFilter, RetailerProduct
+from migrations import migrate
 
-# Tabellen anlegen
-Base.metadata.create_all(bind=engine)
-
-
-def _migrate_checkout_details_columns():
-    """Neue Spalten in checkout_details anlegen (Kreditkarte + Hausnummer), falls noch nicht vorhanden."""
-    new_columns = [
-        ("card_holder_name", "VARCHAR"),
-        ("card_brand", "VARCHAR"),
-        ("card_last_four", "VARCHAR"),
-        ("expiry_month", "INTEGER"),
-        ("expiry_year", "INTEGER"),
-        ("house_number", "VARCHAR"),
-    ]
-    with engine.connect() as conn:
-        for col_name, col_type in new_columns:
-            try:
-                conn.execute(text(f"ALTER TABLE checkout_details ADD COLUMN {col_name} {col_type}"))
-                conn.commit()
-            except Exception:
-                conn.rollback()
-                # Spalte existiert bereits
-                pass
-
-
-_migrate_checkout_details_columns()
+# Schema auf den neuesten Stand bringen (aktuelle DB: nur eine Lese-Query, keine DDL)
+migrate(engine)
 
 app = FastAPI(
     title="Agentic Commerce API",
@@ -95,8 +82,42 @@ def _requirements_out(req: ShoppingRequirement | None) -> ShoppingSpecOut:
     return ShoppingSpecOut(**req.to_dict())
 
 
-def _get_session(session_id: str, db: Session) -> ShoppingSession:
-    session = db.query(ShoppingSession).filter(ShoppingSession.id == session_id).first()
+def _active_filters(db: Session) -> ProductFilter:
+    """Global gespeicherte Filter (POST /filters) für die Händler-Suche."""
+    f = db.query(SearchFilter).first()
+    return ProductFilter.from_search_filter(f.to_dict() if f else None)
+
+
+# Ladestrategie pro Endpunkt: Beziehungen, die die Antwort braucht, in fester Anzahl Queries vorladen
+_LOAD_BRIEF = (joinedload(ShoppingSession.requirements),)
+_LOAD_CHAT = (joinedload(ShoppingSession.requirements), selectinload(ShoppingSession.messages))
+_LOAD_CART = (selectinload(ShoppingSession.cart_items),)
+_LOAD_DETAIL = (
+    joinedload(ShoppingSession.requirements),
+    selectinload(ShoppingSession.messages),
+    selectinload(ShoppingSession.cart_items),
+)
+
+
+def _get_session(session_id: str, db: Session, load: tuple = ()) -> ShoppingSession:
+    session = db.query(ShoppingSession).options(*load).filter(ShoppingSession.id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session nicht gefunden")
+    return session
+
+
+async def _aget_session(
+    session_id: str, db: AsyncSession, load: tuple = (), reload: bool = False
+) -> ShoppingSession:
+    """
+    Wie _get_session für async-Endpunkte; was die Antwort braucht, muss über load vorgeladen sein.
+    reload: bereits geladene Objekte mit dem DB-Stand überschreiben (expire_on_commit=False hält sonst den alten Stand).
+    """
+    stmt = select(ShoppingSession).options(*load).where(ShoppingSession.id == session_id)
+    if reload:
+        stmt = stmt.execution_options(populate_existing=True)
+    result = await db.execute(stmt)
+    session = result.scalars().first()
     if not session:
         raise HTTPException(status_code=404, detail="Session nicht gefunden")
     return session
@@ -115,14 +136,13 @@ def health():
 
 
 @app.post("/sessions", response_model=SessionResponse)
-def create_session(db: Session = Depends(get_db)):
+async def create_session(db: AsyncSession = Depends(get_async_db)):
     """Neue Shopping-Session anlegen (Brief + Cart)."""
     session = ShoppingSession()
     req = ShoppingRequirement(session_id=session.id)
     session.requirements = req
     db.add(session)
-    db.commit()
-    db.refresh(session)
+    await db.commit()
     return SessionResponse(
         session_id=session.id,
         status=session.status,
@@ -134,9 +154,9 @@ def create_session(db: Session = Depends(get_db)):
 
 
 @app.get("/sessions/{session_id}", response_model=SessionResponse)
-def get_session(session_id: str, db: Session = Depends(get_db)):
+async def get_session(session_id: str, db: AsyncSession = Depends(get_async_db)):
     """Session inkl. Nachrichten und Warenkorb abrufen."""
-    session = _get_session(session_id, db)
+    session = await _aget_session(session_id, db, _LOAD_DETAIL)
     cart = [CartItemOut(**i.to_dict()) for i in session.cart_items]
     return SessionResponse(
         session_id=session.id,
@@ -149,53 +169,125 @@ def get_session(session_id: str, db: Session = Depends(get_db)):
 
 
 @app.post("/sessions/{session_id}/chat", response_model=MessageResponse)
-def chat(session_id: str, body: MessageRequest, db: Session = Depends(get_db)):
-    """Nutzer-Nachricht senden; Agent antwortet und aktualisiert den Brief."""
-    session = _get_session(session_id, db)
+async def chat(session_id: str, body: MessageRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Nutzer-Nachricht senden; Agent antwortet und aktualisiert den Brief.
+    Der Modellaufruf wird awaited und hält keine DB-Verbindung. Die DB-Zugriffe selbst laufen über aiosqlite,
+    das je offener Verbindung einen Thread nutzt (höchstens DB_POOL_SIZE + DB_MAX_OVERFLOW).
+    """
+    session = await _aget_session(session_id, db, _LOAD_CHAT)
     if session.status == "ready_for_search":
         raise HTTPException(status_code=400, detail="Brief ist bereits vollständig. Starte die Suche.")
 
-    user_msg = ConversationMessage(session_id=session.id, role="user", content=body.message)
-    db.add(user_msg)
-    db.commit()
-
     conversation = [{"role": m.role, "content": m.content} for m in session.messages]
+    conversation.append({"role": "user", "content": body.message})
     current_reqs = session.requirements.to_dict() if session.requirements else None
-    assistant_text, tool_calls = process_message(conversation, current_reqs)
+    db.add(ConversationMessage(session_id=session.id, role="user", content=body.message))
+    await db.commit()
 
-    req = session.requirements
-    for tc in tool_calls:
-        if tc["name"] == "update_shopping_requirements":
-            req.merge_update(tc.get("arguments", {}))
-        elif tc["name"] == "mark_requirements_complete":
-            req.is_complete = True
-            session.status = "ready_for_search"
-    if req:
-        db.add(req)
-        db.add(session)
-
-    assistant_msg = ConversationMessage(session_id=session.id, role="assistant", content=assistant_text)
-    db.add(assistant_msg)
-    db.commit()
-    db.refresh(session)
+    assistant_text, tool_calls = await aprocess_message(conversation, current_reqs)
 
-    return MessageResponse(
+    # Session und Brief nach dem Modellaufruf neu lesen: parallele Chats können sie inzwischen geändert haben
+    session = await _aget_session(session_id, db, _LOAD_BRIEF, reload=True)
+    for tc in tool_calls:
+        _apply_tool_call(session, tc)
+    db.add(ConversationMessage(session_id=session.id, role="assistant", content=assistant_text))
+    response = MessageResponse(
         session_id=session.id,
         reply=assistant_text,
         requirements=_requirements_out(session.requirements),
         status=session.status,
     )
+    await db.commit()
+    return response
+
+
+def _apply_tool_call(session: ShoppingSession, tc: dict) -> None:
+    """Einen Tool-Call des Agenten auf den Brief der Session anwenden."""
+    req = session.requirements
+    if tc["name"] == "update_shopping_requirements":
+        req.merge_update(tc.get("arguments", {}))
+    elif tc["name"] == "mark_requirements_complete":
+        req.is_complete = True
+        session.status = "ready_for_search"
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+def _chat_events(session_id: str, conversation: list[dict], current_reqs: dict | None) -> Iterator[bytes]:
+    """
+    SSE-Ereignisse des Streaming-Chats. Eigene DB-Session, da der Stream länger lebt als der Request-Handler.
+    Die Antwort wird am Ende gespeichert – bei Abbruch oder Fehler mit dem bis dahin empfangenen Text.
+    """
+    db = SessionLocal()
+    reply: list[str] = []
+    saved = False
+    try:
+        session = db.get(ShoppingSession, session_id, options=_LOAD_BRIEF)
+        for event in stream_message(conversation, current_reqs):
+            if event["type"] == "delta":
+                reply.append(event["text"])
+                yield _sse("delta", {"text": event["text"]})
+                continue
+            # Tool-Calls sofort übernehmen, damit der Brief schon während des Streams aktuell ist
+            _apply_tool_call(session, event)
+            db.commit()
+            yield _sse("requirements", {
+                "requirements": _requirements_out(session.requirements).model_dump(mode="json"),
+                "status": session.status,
+            })
+        db.add(ConversationMessage(session_id=session_id, role="assistant", content="".join(reply)))
+        db.commit()
+        saved = True
+        yield _sse("done", MessageResponse(
+            session_id=session_id,
+            reply="".join(reply),
+            requirements=_requirements_out(session.requirements),
+            status=session.status,
+        ).model_dump(mode="json"))
+    except Exception as exc:
+        db.rollback()
+        yield _sse("error", {"detail": str(exc)})
+    finally:
+        if not saved and reply:
+            db.add(ConversationMessage(session_id=session_id, role="assistant", content="".join(reply)))
+            db.commit()
+        db.close()
+
+
+@app.post("/sessions/{session_id}/chat/stream")
+async def chat_stream(session_id: str, body: MessageRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Wie /chat, aber als Server-Sent Events: "delta" je Textstück (ab dem ersten Token),
+    "requirements" nach jedem übernommenen Tool-Call, zum Schluss "done" mit MessageResponse.
+    """
+    session = await _aget_session(session_id, db, _LOAD_CHAT)
+    if session.status == "ready_for_search":
+        raise HTTPException(status_code=400, detail="Brief ist bereits vollständig. Starte die Suche.")
+
+    conversation = [{"role": m.role, "content": m.content} for m in session.messages]
+    conversation.append({"role": "user", "content": body.message})
+    current_reqs = session.requirements.to_dict() if session.requirements else None
+    db.add(ConversationMessage(session_id=session_id, role="user", content=body.message))
+    await db.commit()
+    return StreamingResponse(
+        _chat_events(session_id, conversation, current_reqs),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/sessions/{session_id}/shopping-plan", response_model=ShoppingPlanOut)
-def create_shopping_plan(session_id: str, db: Session = Depends(get_db)):
-    """KI-Denkprozess: Aus den in der Session gesammelten Daten eine Einkaufsliste mit Budgetaufteilung erzeugen (nur JSON)."""
-    session = _get_session(session_id, db)
+async def create_shopping_plan(session_id: str, db: AsyncSession = Depends(get_async_db)):
+    """KI-Denkprozess: Aus den in der Session gesammelten Daten eine Einkaufsliste mit Budgetaufteilung erzeugen (nur JSON).
+    Bei unverändertem Brief wird der gespeicherte Plan wiederverwendet."""
+    session = await _aget_session(session_id, db, _LOAD_BRIEF)
     req = session.requirements
     if not req:
         raise HTTPException(status_code=400, detail="Session hat keine Anforderungen.")
-    requirements = req.to_dict()
-    plan = run_shopping_plan(requirements)
+    plan = await aget_or_create_plan(db, session.id, req.to_dict())
     if not plan:
         raise HTTPException(
             status_code=503,
@@ -205,13 +297,13 @@ def create_shopping_plan(session_id: str, db: Session = Depends(get_db)):
 
 
 @app.post("/sessions/{session_id}/shopping-plan/google-shopping", response_model=list[PlanComponentSearchOut])
-def shopping_plan_google_search(session_id: str, db: Session = Depends(get_db)):
+async def shopping_plan_google_search(session_id: str, db: AsyncSession = Depends(get_async_db)):
     """KI-Plan aus Session-Anforderungen, pro Komponente Google-Shopping-Suche (q=Name), je 3 Treffer."""
-    session = _get_session(session_id, db)
+    session = await _aget_session(session_id, db, _LOAD_BRIEF)
     req = session.requirements
     if not req:
         raise HTTPException(status_code=400, detail="Session hat keine Anforderungen.")
-    results = plan_and_search(req.to_dict(), location="Germany")
+    results = plan_component_results(await aget_or_create_plan(db, session.id, req.to_dict()))
     if results is None:
         raise HTTPException(
             status_code=503,
@@ -226,17 +318,123 @@ def shopping_plan_google_search(session_id: str, db: Session = Depends(get_db)):
     ]
 
 
+@app.post("/sessions/{session_id}/shopping-plan/jobs", response_model=JobOut, status_code=202)
+def create_shopping_plan_job(
+    session_id: str,
+    kind: str = Query("shopping_plan", description="shopping_plan | google_shopping"),
+    db: Session = Depends(get_db),
+):
+    """
+    Wie /shopping-plan bzw. /shopping-plan/google-shopping, aber als Hintergrund-Job: liefert sofort die Job-ID.
+    Läuft für denselben Brief schon ein Job, wird dieser zurückgegeben.
+    """
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unbekannte Job-Art: {kind}")
+    session = _get_session(session_id, db, _LOAD_BRIEF)
+    req = session.requirements
+    if not req:
+        raise HTTPException(status_code=400, detail="Session hat keine Anforderungen.")
+    job = submit_plan_job(db, session.id, kind, req.to_dict())
+    return JobOut(**job.to_dict())
+
+
+@app.get("/jobs/{job_id}", response_model=JobOut)
+def get_job_status(job_id: str, db: Session = Depends(get_db)):
+    """Status, Fortschritt und (wenn fertig) Ergebnis eines Jobs."""
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job nicht gefunden")
+    return JobOut(**job.to_dict())
+
+
+@app.get("/jobs/{job_id}/stream")
+def stream_job(job_id: str, db: Session = Depends(get_db)):
+    """Fortschritt als NDJSON-Stream: {"event": "progress", ...} bei jeder Änderung, zum Schluss {"event": "done", ...}."""
+    if not get_job(db, job_id):
+        raise HTTPException(status_code=404, detail="Job nicht gefunden")
+    return StreamingResponse(iter_job_events(job_id), media_type="application/x-ndjson")
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=JobOut)
+def cancel_job_endpoint(job_id: str, db: Session = Depends(get_db)):
+    """Job abbrechen (wartend oder laufend); bereits beendete Jobs bleiben unverändert."""
+    job = cancel_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job nicht gefunden")
+    return JobOut(**job.to_dict())
+
+
 @app.post("/sessions/{session_id}/search", response_model=SearchResultOut)
-def search(session_id: str, db: Session = Depends(get_db)):
+def search(
+    session_id: str,
+    limit: int | None = Query(None, ge=1, description="Nur die besten N Produkte; Rest über next_cursor"),
+    db: Session = Depends(get_db),
+):
     """Multi-Händler-Suche + Ranking basierend auf dem gespeicherten Brief."""
-    session = _get_session(session_id, db)
+    session = _get_session(session_id, db, _LOAD_BRIEF)
     if session.status != "ready_for_search":
         raise HTTPException(status_code=400, detail="Brief noch nicht abgeschlossen. Chat zuerst nutzen.")
     spec = ShoppingSpecOut(**(session.requirements.to_dict()))
+    filters = _active_filters(db)
     session.status = "searching"
     db.commit()
-    result = run_search(spec)
-    return result
+    # Schlanker Pfad: Ergebnis direkt als JSON-Bytes (Schema = SearchResultOut), ohne Pydantic pro Produkt
+    return Response(content=run_search_json(spec, limit=limit, filters=filters), media_type="application/json")
+
+
+@app.get("/sessions/{session_id}/search/next", response_model=SearchPageOut)
+def search_next_page(
+    session_id: str,
+    cursor: str,
+    limit: int = Query(20, ge=1),
+    db: Session = Depends(get_db),
+):
+    """Weitere Produkte einer Suche laden (cursor = next_cursor aus der vorherigen Antwort)."""
+    _get_session(session_id, db)
+    page = get_search_page_json(cursor, limit=limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Cursor ungültig oder abgelaufen. Suche erneut starten.")
+    return Response(content=page, media_type="application/json")
+
+
+@app.post("/sessions/{session_id}/search/stream")
+def search_stream(
+    session_id: str,
+    limit: int | None = Query(None, ge=1),
+    db: Session = Depends(get_db),
+):
+    """
+    Wie /search, aber als NDJSON-Stream: pro Händler sofort eine Zeile
+    {"event": "batch", "data": SearchBatchOut}, zum Schluss {"event": "result", "data": SearchResultOut}.
+    """
+    session = _get_session(session_id, db, _LOAD_BRIEF)
+    if session.status != "ready_for_search":
+        raise HTTPException(status_code=400, detail="Brief noch nicht abgeschlossen. Chat zuerst nutzen.")
+    spec = ShoppingSpecOut(**(session.requirements.to_dict()))
+    filters = _active_filters(db)
+    session.status = "searching"
+    db.commit()
+    return StreamingResponse(iter_search(spec, limit=limit, filters=filters), media_type="application/x-ndjson")
+
+
+@app.get("/search/cache/stats", response_model=CacheStatsOut)
+def search_cache_stats():
+    """Kennzahlen des Such-Caches (Treffer, Fehlzugriffe, Verdrängungen)."""
+    return CacheStatsOut(**SEARCH_CACHE.stats())
+
+
+@app.get("/google-shopping/cache/stats", response_model=CacheStatsOut)
+def google_shopping_cache_stats():
+    """Kennzahlen des persistenten SerpAPI-Caches (Trefferquote, veraltete Treffer, Verdrängungen)."""
+    if SERPAPI_CACHE is None:
+        raise HTTPException(status_code=404, detail="SerpAPI-Cache ist deaktiviert (SERPAPI_CACHE_PATH leer).")
+    return CacheStatsOut(**SERPAPI_CACHE.stats())
+
+
+@app.get("/llm/stats", response_model=LLMStatsOut)
+def llm_stats():
+    """Kennzahlen des Sprachmodell-Zugangs je Zweck: Aufrufe, Fehler, Wiederholungen, Tokens, Latenz."""
+    return LLMStatsOut(**llm_gateway.stats())
 
 
 @app.get("/filters", response_model=FilterOut)
@@ -277,20 +475,20 @@ def save_filters(body: FilterRequest, db: Session = Depends(get_db)):
     db.refresh(f)
     return FilterOut(**f.to_dict())
 @app.get("/sessions/{session_id}/cart", response_model=CartSummaryOut)
-def get_cart(session_id: str, db: Session = Depends(get_db)):
+async def get_cart(session_id: str, db: AsyncSession = Depends(get_async_db)):
     """Kombinierten Warenkorb abrufen."""
-    session = _get_session(session_id, db)
+    session = await _aget_session(session_id, db, _LOAD_CART)
     return cart_to_summary(session)
 
 
 @app.post("/sessions/{session_id}/cart/items")
-def cart_add_item(
+async def cart_add_item(
     session_id: str,
     body: AddToCartRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Produkt aus Suchergebnis in den Warenkorb legen."""
-    session = _get_session(session_id, db)
+    await _aget_session(session_id, db)
     rp = RetailerProduct(
         retailer_id=body.retailer_id,
         product_id=body.product_id,
@@ -303,30 +501,30 @@ def cart_add_item(
         variants=body.variants,
         raw={},
     )
-    item = add_to_cart(db, session_id, rp, quantity=body.quantity)
+    item = await add_to_cart(db, session_id, rp, quantity=body.quantity)
     if not item:
         raise HTTPException(status_code=400, detail="Konnte nicht hinzugefügt werden")
     return {"cart_item_id": item.id, "message": "In den Warenkorb gelegt."}
 
 
 @app.delete("/sessions/{session_id}/cart/items/{cart_item_id}")
-def cart_remove_item(session_id: str, cart_item_id: int, db: Session = Depends(get_db)):
+async def cart_remove_item(session_id: str, cart_item_id: int, db: AsyncSession = Depends(get_async_db)):
     """Item aus dem Warenkorb entfernen."""
-    ok = remove_from_cart(db, session_id, cart_item_id)
+    ok = await remove_from_cart(db, session_id, cart_item_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Cart-Item nicht gefunden")
     return {"message": "Entfernt."}
 
 
 @app.patch("/sessions/{session_id}/cart/items/{cart_item_id}")
-def cart_update_quantity(
+async def cart_update_quantity(
     session_id: str,
     cart_item_id: int,
     body: UpdateQuantityRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Menge eines Cart-Items ändern."""
-    ok = update_cart_item_quantity(db, session_id, cart_item_id, body.quantity)
+    ok = await update_cart_item_quantity(db, session_id, cart_item_id, body.quantity)
     if not ok:
         raise HTTPException(status_code=404, detail="Cart-Item nicht gefunden")
     return {"message": "Aktualisiert."}
@@ -342,45 +540,49 @@ def _update_checkout_details(details: CheckoutDetails, body: CheckoutDetailsRequ
             setattr(details, field, val)
 
 
+async def _get_checkout_details(db: AsyncSession, session_id: str) -> CheckoutDetails | None:
+    result = await db.execute(select(CheckoutDetails).where(CheckoutDetails.session_id == session_id))
+    return result.scalars().first()
+
+
 @app.post("/sessions/{session_id}/checkout-details", response_model=CheckoutDetailsOut)
-def save_checkout_details(
+async def save_checkout_details(
     session_id: str,
     body: CheckoutDetailsRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Kreditkarten-Infos und Standort (Land, Straße, Hausnummer, Postleitzahl, Ort) in der DB speichern."""
-    session = _get_session(session_id, db)
-    details = db.query(CheckoutDetails).filter(CheckoutDetails.session_id == session_id).first()
+    await _aget_session(session_id, db)
+    details = await _get_checkout_details(db, session_id)
     if details:
         _update_checkout_details(details, body)
     else:
         details = CheckoutDetails(session_id=session_id)
         _update_checkout_details(details, body)
         db.add(details)
-    db.commit()
-    db.refresh(details)
+    await db.commit()
     return CheckoutDetailsOut(**details.to_dict())
 
 
 @app.get("/sessions/{session_id}/checkout-details", response_model=CheckoutDetailsOut | None)
-def get_checkout_details(session_id: str, db: Session = Depends(get_db)):
+async def get_checkout_details(session_id: str, db: AsyncSession = Depends(get_async_db)):
     """Gespeicherte Zahlungsmethode und Standort der Session abrufen."""
-    _get_session(session_id, db)
-    details = db.query(CheckoutDetails).filter(CheckoutDetails.session_id == session_id).first()
+    await _aget_session(session_id, db)
+    details = await _get_checkout_details(db, session_id)
     if not details:
         return None
     return CheckoutDetailsOut(**details.to_dict())
 
 
 @app.post("/sessions/{session_id}/checkout-simulation", response_model=CheckoutSimulationOut)
-def checkout_simulation(session_id: str, db: Session = Depends(get_db)):
+async def checkout_simulation(session_id: str, db: AsyncSession = Depends(get_async_db)):
     """Simulierten Checkout ausführen (eine Adresse/Zahlung, Schritte pro Händler)."""
-    session = _get_session(session_id, db)
+    session = await _aget_session(session_id, db, _LOAD_CART)
     if not session.cart_items:
         raise HTTPException(status_code=400, detail="Warenkorb ist leer.")
     result = run_checkout_simulation(session)
     session.status = "checkout_simulated"
-    db.commit()
+    await db.commit()
     return result
 
 
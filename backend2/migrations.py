@@ -0,0 +1,256 @@
+"""
+Versionierte Schema-Migrationen: Tabelle schema_version (eine Zeile je angewandter Migration),
+MIGRATIONS in fester Reihenfolge. Jede Migration läuft genau einmal, unter einer Schreibsperre
+(SQLite: BEGIN IMMEDIATE, PostgreSQL: Advisory-Lock), damit parallel startende Worker nicht kollidieren.
+Ist die DB aktuell, kostet der Start eine einzige Lese-Query und keine DDL.
+
+Version 1 ist ein eingefrorener Stand des Schemas (Tabellen unten, nicht models.py): eine Änderung an
+models.py braucht immer eine neue Migration. Version 1 enthält bereits die Spalten und Indizes aus 2 und 3,
+da es sie auf älteren DBs noch nachträglich anlegt; diese prüfen daher vorhandene Spalten/Indizes.
+tests/test_migrations.py vergleicht eine frisch migrierte DB mit models.py.
+
+    python migrations.py            # Migrationen anwenden (z. B. einmal pro Deploy), Version ausgeben
+"""
+import sys
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+_meta = MetaData()
+schema_version = Table(
+    "schema_version",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Schlüssel für pg_advisory_xact_lock (beliebig, aber fest)
+_PG_LOCK_KEY = 72_410_001
+
+
+# ---- Version 1: Schema-Stand zum Zeitpunkt der Einführung von schema_version (nicht mehr ändern) ----
+
+_v1 = MetaData()
+Table(
+    "shopping_sessions", _v1,
+    Column("id", String, primary_key=True),
+    Column("status", String),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+Table(
+    "shopping_requirements", _v1,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("session_id", String, ForeignKey("shopping_sessions.id"), unique=True),
+    Column("budget_min", Float),
+    Column("budget_max", Float),
+    Column("budget_currency", String),
+    Column("delivery_deadline", String),
+    Column("category", String),
+    Column("country", String),
+    Column("city", String),
+    Column("event_type", String),
+    Column("event_name", String),
+    Column("people_count", Integer),
+    Column("reason", String),
+    Column("preferences", Text),
+    Column("must_haves", Text),
+    Column("nice_to_haves", Text),
+    Column("is_complete", Boolean),
+)
+_v1_messages = Table(
+    "conversation_messages", _v1,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("session_id", String, ForeignKey("shopping_sessions.id")),
+    Column("role", String),
+    Column("content", Text),
+    Column("created_at", DateTime),
+    Index("ix_conversation_messages_session_created", "session_id", "created_at"),
+)
+Table(
+    "shopping_plans", _v1,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("session_id", String, ForeignKey("shopping_sessions.id"), nullable=False),
+    Column("requirements_hash", String(64), nullable=False),
+    Column("plan", Text, nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    UniqueConstraint("session_id", "requirements_hash"),
+)
+Table(
+    "jobs", _v1,
+    Column("id", String, primary_key=True),
+    Column("session_id", String, ForeignKey("shopping_sessions.id"), nullable=False, index=True),
+    Column("kind", String, nullable=False),
+    Column("requirements_hash", String(64), nullable=False),
+    Column("status", String),
+    Column("step", String),
+    Column("progress", Float),
+    Column("result", Text),
+    Column("error", Text),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Index(
+        "uq_jobs_active",
+        "session_id", "kind", "requirements_hash",
+        unique=True,
+        sqlite_where=text("status IN ('queued', 'running')"),
+        postgresql_where=text("status IN ('queued', 'running')"),
+    ),
+)
+Table(
+    "checkout_details", _v1,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("session_id", String, ForeignKey("shopping_sessions.id"), unique=True),
+    Column("card_holder_name", String),
+    Column("card_brand", String),
+    Column("card_last_four", String),
+    Column("expiry_month", Integer),
+    Column("expiry_year", Integer),
+    Column("country", String),
+    Column("street", String),
+    Column("house_number", String),
+    Column("postal_code", String),
+    Column("city", String),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+_v1_cart_items = Table(
+    "cart_items", _v1,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("session_id", String, ForeignKey("shopping_sessions.id")),
+    Column("retailer_id", String, nullable=False),
+    Column("product_id", String, nullable=False),
+    Column("title", String, nullable=False),
+    Column("price", Float, nullable=False),
+    Column("currency", String),
+    Column("delivery_estimate_days", Integer),
+    Column("quantity", Integer),
+    Column("variant_info", Text),
+    Column("image_url", String),
+    Column("product_url", String),
+    Column("raw_product", Text),
+    Column("created_at", DateTime),
+    Index("ix_cart_items_session_created", "session_id", "created_at"),
+)
+Table(
+    "search_filters", _v1,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("gender", String),
+    Column("size_clothing", String),
+    Column("size_pants", String),
+    Column("size_shoes", String),
+    Column("price_min", Float),
+    Column("price_max", Float),
+    Column("color", String),
+    Column("delivery_time_days", Integer),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+
+def _create_schema(conn: Connection) -> None:
+    # Fehlende Tabellen anlegen; vorhandene (DBs von vor schema_version) bleiben unverändert
+    _v1.create_all(bind=conn)
+
+
+def _add_checkout_details_columns(conn: Connection) -> None:
+    # DBs aus der Zeit vor Kreditkarte + Hausnummer
+    existing = {c["name"] for c in inspect(conn).get_columns("checkout_details")}
+    for name, sql_type in [
+        ("card_holder_name", "VARCHAR"),
+        ("card_brand", "VARCHAR"),
+        ("card_last_four", "VARCHAR"),
+        ("expiry_month", "INTEGER"),
+        ("expiry_year", "INTEGER"),
+        ("house_number", "VARCHAR"),
+    ]:
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE checkout_details ADD COLUMN {name} {sql_type}"))
+
+
+def _add_session_indexes(conn: Connection) -> None:
+    # (session_id, created_at) auf Nachrichten und Warenkorb; Tabellen aus Version 1 haben sie schon
+    for table in (_v1_messages, _v1_cart_items):
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+# (Version, Beschreibung, Funktion) – nur anhängen, nie umsortieren oder ändern
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Basisschema aus models.py", _create_schema),
+    (2, "checkout_details: Kreditkarte und Hausnummer", _add_checkout_details_columns),
+    (3, "Indizes (session_id, created_at) auf conversation_messages und cart_items", _add_session_indexes),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+def _read_version(conn: Connection) -> int:
+    return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc()).limit(1)).scalar() or 0
+
+
+def current_version(engine: Engine) -> int:
+    """Angewandte Schema-Version; 0, wenn noch keine Migration gelaufen ist (auch bei DBs von vor schema_version)."""
+    with engine.connect() as conn:
+        try:
+            return _read_version(conn)
+        except DBAPIError:
+            # Tabelle schema_version existiert noch nicht
+            return 0
+
+
+def _lock(conn: Connection) -> None:
+    """Schreibsperre bis zum Commit; weitere Worker warten hier (SQLite: busy_timeout)."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif dialect == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+
+
+def migrate(engine: Engine) -> int:
+    """Fehlende Migrationen in Reihenfolge anwenden; gibt die danach gültige Version zurück."""
+    if current_version(engine) >= LATEST:
+        return LATEST
+    with engine.connect() as conn:
+        _lock(conn)
+        # Unter der Sperre neu lesen: ein anderer Worker kann inzwischen migriert haben
+        schema_version.create(bind=conn, checkfirst=True)
+        version = _read_version(conn)
+        for number, description, apply in MIGRATIONS:
+            if number <= version:
+                continue
+            apply(conn)
+            conn.execute(schema_version.insert().values(
+                version=number, description=description, applied_at=datetime.now(timezone.utc),
+            ))
+            version = number
+        conn.commit()
+    return version
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    print(f"Schema-Version {migrate(engine)} (aktuell: {LATEST})")
+    sys.exit(0)
@@ -3,7 +3,7 @@ import json
 from datetime import datetime, timezone
 from uuid import uuid4
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -47,6 +47,11 @@ class ShoppingSession(Base):
         uselist=False,
         cascade="all, delete-orphan",
     )
+    shopping_plans = relationship(
+        "ShoppingPlan",
+        back_populates="session",
+        cascade="all, delete-orphan",
+    )
 
 
 class ShoppingRequirement(Base):
@@ -115,6 +120,8 @@ class ShoppingRequirement(Base):
 class ConversationMessage(Base):
     """Eine Nachricht in der Konversation."""
     __tablename__ = "conversation_messages"
+    # Nachrichten einer Session in Reihenfolge (ShoppingSession.messages) ohne Tabellen-Scan
+    __table_args__ = (Index("ix_conversation_messages_session_created", "session_id", "created_at"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     session_id = Column(String, ForeignKey("shopping_sessions.id"))
@@ -125,6 +132,65 @@ class ConversationMessage(Base):
     session = relationship("ShoppingSession", back_populates="messages")
 
 
+class ShoppingPlan(Base):
+    """Gespeicherter KI-Einkaufsplan inkl. Treffern pro Komponente, je Session und Stand des Briefs."""
+    __tablename__ = "shopping_plans"
+    __table_args__ = (UniqueConstraint("session_id", "requirements_hash"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String, ForeignKey("shopping_sessions.id"), nullable=False)
+    requirements_hash = Column(String(64), nullable=False)  # sha256 von ShoppingRequirement.to_dict()
+    plan = Column(Text, nullable=False)  # JSON wie run_shopping_plan (components mit shopping_results)
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
+
+    session = relationship("ShoppingSession", back_populates="shopping_plans")
+
+    def to_dict(self) -> dict:
+        return json.loads(self.plan)
+
+
+class Job(Base):
+    """Hintergrund-Auftrag (z. B. Shopping-Plan erzeugen) mit Status und Fortschritt."""
+    __tablename__ = "jobs"
+    # Höchstens ein aktiver Job je (Session, Art, Brief-Hash) – Deduplizierung auch bei gleichzeitigen Requests
+    __table_args__ = (
+        Index(
+            "uq_jobs_active",
+            "session_id", "kind", "requirements_hash",
+            unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid4()))
+    session_id = Column(String, ForeignKey("shopping_sessions.id"), nullable=False, index=True)
+    kind = Column(String, nullable=False)  # shopping_plan | google_shopping
+    requirements_hash = Column(String(64), nullable=False)
+    status = Column(String, default="queued")  # queued | running | succeeded | failed | cancelled
+    step = Column(String, nullable=True)  # plan | lookup
+    progress = Column(Float, default=0.0)  # 0.0 – 1.0
+    result = Column(Text, nullable=True)  # JSON, Format je nach kind
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "session_id": self.session_id,
+            "kind": self.kind,
+            "status": self.status,
+            "step": self.step,
+            "progress": self.progress,
+            "result": json.loads(self.result) if self.result else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
 class CheckoutDetails(Base):
     """Kreditkarten-Infos und Lieferadresse/Standort pro Session."""
     __tablename__ = "checkout_details"
@@ -171,6 +237,8 @@ class CheckoutDetails(Base):
 class CartItem(Base):
     """Ein Artikel im kombinierten Warenkorb (mehrere Händler)."""
     __tablename__ = "cart_items"
+    # Warenkorb einer Session in Reihenfolge (ShoppingSession.cart_items) ohne Tabellen-Scan
+    __table_args__ = (Index("ix_cart_items_session_created", "session_id", "created_at"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     session_id = Column(String, ForeignKey("shopping_sessions.id"))
@@ -0,0 +1,98 @@
+"""Einkaufspläne je Session und Brief-Stand speichern und wiederverwenden (kein erneuter KI-Aufruf)."""
+import hashlib
+import json
+from typing import Callable
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import ShoppingPlan
+from shopping_planner import alookup_components, arun_shopping_plan, lookup_components, run_shopping_plan
+
+
+def requirements_hash(requirements: dict) -> str:
+    """Stabiler Hash von ShoppingRequirement.to_dict() (Schlüsselreihenfolge egal)."""
+    canonical = json.dumps(requirements, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+ProgressCallback = Callable[[str, int, int], None]
+
+
+def _plan_query(session_id: str, key: str):
+    return select(ShoppingPlan).where(ShoppingPlan.session_id == session_id, ShoppingPlan.requirements_hash == key)
+
+
+def _failed_components(plan: dict) -> list[dict]:
+    """Komponenten mit lookup_error (Marker entfernt) für eine erneute Suche; leer, wenn alles geklappt hat."""
+    failed = [c for c in plan.get("components", []) if c.get("lookup_error")]
+    for c in failed:
+        del c["lookup_error"]
+    return failed
+
+
+def _new_plan_row(session_id: str, key: str, plan: dict) -> ShoppingPlan:
+    return ShoppingPlan(session_id=session_id, requirements_hash=key, plan=json.dumps(plan, ensure_ascii=False))
+
+
+def get_or_create_plan(
+    db: Session,
+    session_id: str,
+    requirements: dict,
+    on_progress: ProgressCallback | None = None,
+) -> dict | None:
+    """
+    Gespeicherten Plan für (Session, Brief-Hash) liefern, sonst per run_shopping_plan erzeugen und speichern.
+    Gescheiterte Komponenten-Suchen eines gespeicherten Plans werden beim nächsten Abruf wiederholt.
+    None, wenn kein Plan erzeugt werden konnte. on_progress wie bei run_shopping_plan.
+    """
+    key = requirements_hash(requirements)
+    row = db.execute(_plan_query(session_id, key)).scalars().first()
+    if row is not None:
+        plan = row.to_dict()
+        if failed := _failed_components(plan):
+            lookup_components(
+                failed,
+                requirements.get("category"),
+                on_progress=(lambda done, total: on_progress("lookup", done, total)) if on_progress else None,
+            )
+            row.plan = json.dumps(plan, ensure_ascii=False)
+            db.commit()
+        return plan
+
+    plan = run_shopping_plan(requirements, on_progress)
+    if not plan:
+        return None
+    db.add(_new_plan_row(session_id, key, plan))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Paralleler Request hat denselben Plan bereits gespeichert
+        db.rollback()
+    return plan
+
+
+async def aget_or_create_plan(db: AsyncSession, session_id: str, requirements: dict) -> dict | None:
+    """Wie get_or_create_plan für async-Endpunkte: Modell, Suchen und DB-Zugriffe werden awaited."""
+    key = requirements_hash(requirements)
+    row = (await db.execute(_plan_query(session_id, key))).scalars().first()
+    if row is not None:
+        plan = row.to_dict()
+        if failed := _failed_components(plan):
+            await alookup_components(failed, requirements.get("category"))
+            row.plan = json.dumps(plan, ensure_ascii=False)
+            await db.commit()
+        return plan
+
+    plan = await arun_shopping_plan(requirements)
+    if not plan:
+        return None
+    db.add(_new_plan_row(session_id, key, plan))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Paralleler Request hat denselben Plan bereits gespeichert
+        await db.rollback()
+    return plan
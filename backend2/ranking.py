@@ -1,5 +1,7 @@
 """Ranking-Engine: transparente Bewertung (Kosten, Lieferung, Präferenz, Kohärenz)."""
-from datetime import date, timedelta
+from datetime import date
+
+import numpy as np
 
 from schemas import RankedProductOut, ShoppingSpecOut
 from retailers.base import RetailerProduct
@@ -14,97 +16,174 @@ def _parse_deadline(deadline: str | None) -> date | None:
         return None
 
 
-def _delivery_feasibility_score(product: RetailerProduct, deadline: date | None) -> float:
-    """1.0 = lieferbar bis Deadline, 0.0 = zu spät oder unbekannt."""
-    if not deadline or product.delivery_estimate_days is None:
-        return 0.5  # neutral
-    delivery_date = date.today() + timedelta(days=product.delivery_estimate_days)
-    if delivery_date <= deadline:
-        return 1.0
-    # Je später, desto schlechter
-    days_late = (delivery_date - deadline).days
-    return max(0.0, 1.0 - days_late / 14.0)
-
-
-def _cost_score(product: RetailerProduct, budget_max: float | None) -> float:
-    """1.0 = gut im Budget, 0.0 = deutlich drüber."""
-    if budget_max is None or budget_max <= 0:
-        return 1.0
-    if product.price <= budget_max:
-        return 1.0
-    ratio = budget_max / product.price
-    return max(0.0, ratio)
-
-
-def _preference_match_score(product: RetailerProduct, spec: ShoppingSpecOut) -> float:
-    """Einfache Text-Übereinstimmung mit preferences/must_haves."""
-    keywords = [p.lower() for p in (spec.preferences or []) + (spec.must_haves or [])]
-    if not keywords:
-        return 0.5
-    title = product.title.lower()
-    hits = sum(1 for k in keywords if k in title)
-    return min(1.0, 0.5 + 0.5 * (hits / len(keywords)))
-
-
-def _set_coherence_score(products: list[RetailerProduct], index: int, spec: ShoppingSpecOut) -> float:
-    """Kohärenz: gleicher Stil/Kategorie (vereinfacht: gleicher Retailer oder ähnlicher Preisbereich)."""
-    if len(products) <= 1:
-        return 1.0
-    # Vereinfacht: mittlere Abweichung vom mittleren Preis
-    prices = [p.price for p in products]
-    avg = sum(prices) / len(prices)
-    p = products[index].price
-    deviation = abs(p - avg) / avg if avg else 0
-    return max(0.0, 1.0 - deviation)
+DEFAULT_WEIGHTS = {
+    "cost": 0.35,
+    "delivery": 0.35,
+    "preference": 0.2,
+    "coherence": 0.1,
+}
 
 
-def rank_products(
+def score_batch(
     products: list[RetailerProduct],
     spec: ShoppingSpecOut,
     weights: dict[str, float] | None = None,
-) -> list[RankedProductOut]:
-    """Berechnet für jedes Produkt einen Score und sortiert absteigend."""
-    if not products:
-        return []
-
-    w = weights or {
-        "cost": 0.35,
-        "delivery": 0.35,
-        "preference": 0.2,
-        "coherence": 0.1,
-    }
-    deadline = _parse_deadline(spec.delivery_deadline)
+    today: date | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Berechnet alle Teil-Scores für die ganze Kandidatenliste in einem O(n)-Durchlauf als Arrays:
+    Kosten 1.0 im Budget, sonst budget_max/Preis; Lieferung 1.0 bis zur Frist, dann −1/14 je Tag Verspätung
+    (0.5 ohne Frist oder Lieferzeit); Präferenz 0.5 + 0.5 · Anteil der Keywords im Titel; Kohärenz 1 − relative
+    Abweichung vom Durchschnittspreis.
+    Rückgabe: {"cost", "delivery", "preference", "coherence", "score"} je als float64-Array.
+    """
+    w = weights or DEFAULT_WEIGHTS
+    n = len(products)
+    prices = np.fromiter((p.price for p in products), dtype=np.float64, count=n)
+
+    # Kosten
     budget_max = spec.budget_max
+    if budget_max is None or budget_max <= 0:
+        cost = np.ones(n)
+    else:
+        over = prices > budget_max
+        cost = np.ones(n)
+        cost[over] = np.maximum(0.0, budget_max / prices[over])
 
-    ranked: list[RankedProductOut] = []
-    for i, p in enumerate(products):
-        cost_s = _cost_score(p, budget_max)
-        del_s = _delivery_feasibility_score(p, deadline)
-        pref_s = _preference_match_score(p, spec)
-        coh_s = _set_coherence_score(products, i, spec)
-
-        score = (
-            w["cost"] * cost_s
-            + w["delivery"] * del_s
-            + w["preference"] * pref_s
-            + w["coherence"] * coh_s
+    # Lieferung (NaN = unbekannte Lieferzeit)
+    deadline = _parse_deadline(spec.delivery_deadline)
+    delivery = np.full(n, 0.5)
+    if deadline:
+        days = np.fromiter(
+            (np.nan if p.delivery_estimate_days is None else p.delivery_estimate_days for p in products),
+            dtype=np.float64,
+            count=n,
         )
-        breakdown = {"cost": cost_s, "delivery": del_s, "preference": pref_s, "coherence": coh_s}
-        explanation = (
+        known = ~np.isnan(days)
+        days_late = days[known] - (deadline - (today or date.today())).days
+        delivery[known] = np.where(days_late <= 0, 1.0, np.maximum(0.0, 1.0 - days_late / 14.0))
+
+    # Präferenz: Stringvergleich bleibt Python, aber Keywords nur einmal aufbereitet
+    keywords = [k.lower() for k in (spec.preferences or []) + (spec.must_haves or [])]
+    if keywords:
+        hits = np.fromiter(
+            (sum(1 for k in keywords if k in p.title.lower()) for p in products),
+            dtype=np.float64,
+            count=n,
+        )
+        preference = np.minimum(1.0, 0.5 + 0.5 * (hits / len(keywords)))
+    else:
+        preference = np.full(n, 0.5)
+
+    # Kohärenz: Durchschnittspreis einmal statt pro Produkt
+    if n <= 1:
+        coherence = np.ones(n)
+    else:
+        avg = sum(p.price for p in products) / n
+        coherence = np.maximum(0.0, 1.0 - np.abs(prices - avg) / avg) if avg else np.ones(n)
+
+    score = (
+        w["cost"] * cost
+        + w["delivery"] * delivery
+        + w["preference"] * preference
+        + w["coherence"] * coherence
+    )
+    return {"cost": cost, "delivery": delivery, "preference": preference, "coherence": coherence, "score": score}
+
+
+def _select_top(rounded: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indizes der k besten Kandidaten in Ranking-Reihenfolge (Score absteigend, bei Gleichstand
+    Eingangsreihenfolge – wie ein stabiler Sort). O(n + k log k) statt Sortieren der ganzen Liste.
+    """
+    n = len(rounded)
+    if k >= n:
+        idx = np.arange(n)
+    else:
+        threshold = -np.partition(-rounded, k - 1)[k - 1]
+        above = np.flatnonzero(rounded > threshold)
+        ties = np.flatnonzero(rounded == threshold)[: k - len(above)]
+        idx = np.concatenate([above, ties])
+    return idx[np.lexsort((idx, -rounded[idx]))]
+
+
+class RankedCandidates:
+    """
+    Gescorte Kandidaten, deren Ausgabeobjekte erst bei Bedarf erzeugt werden.
+    Seiten jenseits der ersten k können über materialize(offset, limit) nachgeladen werden.
+    """
+
+    def __init__(
+        self,
+        products: list[RetailerProduct],
+        spec: ShoppingSpecOut,
+        weights: dict[str, float] | None = None,
+    ):
+        self.products = products
+        scores = score_batch(products, spec, weights)
+        self._cost = scores["cost"]
+        self._delivery = scores["delivery"]
+        self._preference = scores["preference"]
+        self._coherence = scores["coherence"]
+        # Sortiert wird – wie bisher – nach dem gerundeten Score
+        self._rounded = np.array([round(x, 4) for x in scores["score"].tolist()], dtype=np.float64)
+        self._order = np.empty(0, dtype=np.intp)
+        self._records: dict[int, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def order(self, k: int) -> np.ndarray:
+        """Indizes der ersten k Plätze (Präfix wird gemerkt und nur bei Bedarf erweitert)."""
+        k = min(k, len(self.products))
+        if k > len(self._order):
+            self._order = _select_top(self._rounded, k)
+        return self._order[:k]
+
+    def record(self, i: int) -> dict:
+        """Ausgabe-Datensatz im Layout von RankedProductOut (plain dict, wird gemerkt)."""
+        rec = self._records.get(i)
+        if rec is not None:
+            return rec
+        p = self.products[i]
+        cost_s = float(self._cost[i])
+        pref_s = float(self._preference[i])
+        rec = p.to_record()
+        rec["score"] = float(self._rounded[i])
+        rec["score_breakdown"] = {
+            "cost": cost_s,
+            "delivery": float(self._delivery[i]),
+            "preference": pref_s,
+            "coherence": float(self._coherence[i]),
+        }
+        rec["explanation"] = (
             f"Preis: {'im Budget' if cost_s >= 0.9 else 'über Budget'}, "
             f"Lieferung: {p.delivery_estimate_days or '?'} Tage, "
             f"Präferenz-Match: {pref_s:.0%}."
         )
-        po = p.to_product_out()
-        ranked.append(RankedProductOut(
-            **po.model_dump(),
-            score=round(score, 4),
-            score_breakdown=breakdown,
-            explanation=explanation,
-        ))
-
-    ranked.sort(key=lambda x: x.score, reverse=True)
-    return ranked
+        self._records[i] = rec
+        return rec
+
+    def records(self, offset: int = 0, limit: int | None = None) -> list[dict]:
+        """Datensätze nur für die Plätze offset .. offset+limit erzeugen."""
+        end = len(self.products) if limit is None else offset + limit
+        return [self.record(int(i)) for i in self.order(end)[offset:]]
+
+    def materialize(self, offset: int = 0, limit: int | None = None) -> list[RankedProductOut]:
+        """Wie records(), aber als Pydantic-Objekte."""
+        return [RankedProductOut.model_validate(r) for r in self.records(offset, limit)]
+
+
+def rank_products(
+    products: list[RetailerProduct],
+    spec: ShoppingSpecOut,
+    weights: dict[str, float] | None = None,
+    top_k: int | None = None,
+) -> list[RankedProductOut]:
+    """Berechnet für jedes Produkt einen Score und sortiert absteigend (optional nur die besten top_k)."""
+    if not products:
+        return []
+    return RankedCandidates(products, spec, weights).materialize(0, top_k)
 
 
 def why_first(ranked: list[RankedProductOut], spec: ShoppingSpecOut) -> str:
@@ -1,8 +1,11 @@
-"""Multi-Retailer: nur Demo-Mock-Händler (StyleHub, UrbanOutfit, SportDirect)."""
-from typing import Any
+"""Multi-Retailer: Demo-Mock-Händler (StyleHub, UrbanOutfit, SportDirect), optional ersetzt/ergänzt durch die Katalog-DB."""
+from functools import partial
+from typing import Any, Iterator
 
-from .base import RetailerProduct, search_all_retailers
+from config import CATALOG_DB_PATH
+from .base import ProductFilter, RetailerProduct, RetailerResult, RetailerSearchOutcome, iter_retailer_results, search_all_retailers
 from .mock_retailers import search_stylehub, search_urbanoutfit, search_sportdirect
+from .sqlite_catalog import catalog_retailers, check_catalog_changes, search_catalog
 
 RETAILERS = [
     ("stylehub", search_stylehub, "StyleHub"),
@@ -10,18 +13,58 @@ RETAILERS = [
     ("sportdirect", search_sportdirect, "SportDirect"),
 ]
 
+# Händler aus der Katalog-DB (ohne Essen, das läuft über die Plan-Komponenten)
+_DB_RETAILERS = [(rid, name) for rid, name in catalog_retailers(CATALOG_DB_PATH) if rid != "essen"]
+for _rid, _name in _DB_RETAILERS:
+    _entry = (_rid, partial(search_catalog, CATALOG_DB_PATH, _rid), _name)
+    _pos = next((i for i, r in enumerate(RETAILERS) if r[0] == _rid), None)
+    if _pos is None:
+        RETAILERS.append(_entry)
+    else:
+        RETAILERS[_pos] = _entry
+# Stand der Import-Zähler merken; spätere Importe erkennt check_catalog_db
+check_catalog_changes(CATALOG_DB_PATH)
+
+
+def check_catalog_db() -> None:
+    """Neu importierte Kataloge der Katalog-DB erkennen (Import in anderem Prozess) und Reload melden."""
+    if CATALOG_DB_PATH:
+        check_catalog_changes(CATALOG_DB_PATH)
+
 
 def search_products(
     query: str,
     category: str | None = None,
     limit_per_retailer: int = 10,
     spec: Any = None,
-) -> list[RetailerProduct]:
-    """Durchsucht alle Demo-Händler und gibt vereinheitlichte Produkte zurück."""
+    concurrent: bool = True,
+    filters: ProductFilter | None = None,
+) -> RetailerSearchOutcome:
+    """Durchsucht alle Demo-Händler parallel (Filter per Pushdown); liefert Produkte plus Händler mit Timeout/Fehler."""
     return search_all_retailers(
         retailers=RETAILERS,
         query=query,
         category=category,
         limit_per_retailer=limit_per_retailer,
         spec=spec,
+        concurrent=concurrent,
+        filters=filters,
+    )
+
+
+def iter_products(
+    query: str,
+    category: str | None = None,
+    limit_per_retailer: int = 10,
+    spec: Any = None,
+    filters: ProductFilter | None = None,
+) -> Iterator[RetailerResult]:
+    """Wie search_products, liefert aber jede Händler-Antwort sofort bei Eintreffen."""
+    return iter_retailer_results(
+        retailers=RETAILERS,
+        query=query,
+        category=category,
+        limit_per_retailer=limit_per_retailer,
+        spec=spec,
+        filters=filters,
     )
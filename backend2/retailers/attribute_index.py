@@ -0,0 +1,121 @@
+"""Attribut-Index (Größe, Farbe, Preis, Lieferzeit) für schnelles Filtern eines Händler-Katalogs."""
+import numpy as np
+
+from retailers.base import ProductFilter, RetailerProduct
+from retailers.catalog_index import normalize
+from retailers.columnar import ColumnarCatalog
+
+
+def _norm_size(size: str) -> str:
+    return size.strip().upper()
+
+
+def _norm_color(color: str) -> str:
+    return normalize(color.strip())
+
+
+class AttributeIndex:
+    """
+    Bitmaps (bool-Arrays, ein Bit pro Produkt) für Größe/Farbe aus den Varianten,
+    sortierte Arrays für Preis und Lieferzeit (Bereichsabfrage per Binärsuche).
+    """
+
+    def __init__(self, products: list[RetailerProduct] | ColumnarCatalog):
+        n = len(products)
+        self._n = n
+        self._sizes: dict[str, np.ndarray] = {}
+        self._colors: dict[str, np.ndarray] = {}
+        # Produkte ohne Größen-/Farbangabe gelten als passend („Einheitsgröße“)
+        self._no_size = np.ones(n, dtype=bool)
+        self._no_color = np.ones(n, dtype=bool)
+        if isinstance(products, ColumnarCatalog):
+            prices, delivery = self._index_columnar(products)
+        else:
+            prices, delivery = self._index_objects(products)
+
+        self._price_order = np.argsort(prices, kind="stable")
+        self._prices_sorted = prices[self._price_order]
+
+        self._delivery_unknown = np.isnan(delivery)
+        known = np.flatnonzero(~self._delivery_unknown)
+        order = np.argsort(delivery[known], kind="stable")
+        self._delivery_order = known[order]
+        self._delivery_sorted = delivery[known][order]
+
+    def _index_objects(self, products: list[RetailerProduct]) -> tuple[np.ndarray, np.ndarray]:
+        n = self._n
+        for doc_id, product in enumerate(products):
+            for v in product.variants:
+                if v.size:
+                    self._bitmap(self._sizes, _norm_size(v.size))[doc_id] = True
+                    self._no_size[doc_id] = False
+                if v.color:
+                    self._bitmap(self._colors, _norm_color(v.color))[doc_id] = True
+                    self._no_color[doc_id] = False
+        prices = np.fromiter((p.price for p in products), dtype=np.float64, count=n)
+        delivery = np.fromiter(
+            (np.nan if p.delivery_estimate_days is None else p.delivery_estimate_days for p in products),
+            dtype=np.float64,
+            count=n,
+        )
+        return prices, delivery
+
+    def _index_columnar(self, catalog: ColumnarCatalog) -> tuple[np.ndarray, np.ndarray]:
+        """Schneller Aufbau direkt aus den Spalten, ohne RetailerProduct-Objekte zu erzeugen."""
+        rows = catalog.variant_rows()
+        for codes, bitmaps, unknown, norm in (
+            (catalog.variant_sizes, self._sizes, self._no_size, _norm_size),
+            (catalog.variant_colors, self._colors, self._no_color, _norm_color),
+        ):
+            present = codes >= 0
+            variant_rows = rows[present]
+            unknown[variant_rows] = False
+            # Einmal nach Code gruppieren (argsort) statt je Code alle Varianten zu vergleichen
+            unique_codes, inverse = np.unique(codes[present], return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.searchsorted(inverse[order], np.arange(len(unique_codes) + 1))
+            for i, code in enumerate(unique_codes):
+                key = norm(catalog.strings.values[code])
+                self._bitmap(bitmaps, key)[variant_rows[order[bounds[i]:bounds[i + 1]]]] = True
+        delivery = catalog.delivery_days.astype(np.float64)
+        delivery[catalog.delivery_days < 0] = np.nan
+        return catalog.prices, delivery
+
+    def _bitmap(self, bitmaps: dict[str, np.ndarray], key: str) -> np.ndarray:
+        bitmap = bitmaps.get(key)
+        if bitmap is None:
+            bitmap = bitmaps[key] = np.zeros(self._n, dtype=bool)
+        return bitmap
+
+    def _any_of(self, bitmaps: dict[str, np.ndarray], keys: list[str], unknown: np.ndarray) -> np.ndarray:
+        mask = unknown.copy()
+        for key in keys:
+            bitmap = bitmaps.get(key)
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def _range(self, order: np.ndarray, sorted_values: np.ndarray, low: float | None, high: float | None) -> np.ndarray:
+        lo = 0 if low is None else int(np.searchsorted(sorted_values, low, side="left"))
+        hi = len(sorted_values) if high is None else int(np.searchsorted(sorted_values, high, side="right"))
+        mask = np.zeros(self._n, dtype=bool)
+        mask[order[lo:hi]] = True
+        return mask
+
+    def mask(self, filters: ProductFilter | None) -> np.ndarray | None:
+        """bool-Array „Produkt erfüllt alle Filter“; None wenn keine Filter aktiv sind."""
+        if filters is None or filters.is_empty():
+            return None
+        mask = np.ones(self._n, dtype=bool)
+        if filters.sizes:
+            mask &= self._any_of(self._sizes, [_norm_size(s) for s in filters.sizes], self._no_size)
+        if filters.colors:
+            mask &= self._any_of(self._colors, [_norm_color(c) for c in filters.colors], self._no_color)
+        if filters.price_min is not None or filters.price_max is not None:
+            mask &= self._range(self._price_order, self._prices_sorted, filters.price_min, filters.price_max)
+        if filters.max_delivery_days is not None:
+            mask &= (
+                self._range(self._delivery_order, self._delivery_sorted, None, filters.max_delivery_days)
+                | self._delivery_unknown
+            )
+        return mask
@@ -1,9 +1,24 @@
-"""Basis-Datenstruktur und Aggregation für alle Händler."""
-from dataclasses import dataclass
-from typing import Any, Callable
+"""
+Basis-Datenstruktur und Aggregation für alle Händler.
 
+Händler-Schnittstelle: search_fn(query, category, limit) -> list[RetailerProduct]. Optional nimmt
+search_fn zusätzlich filters: ProductFilter | None entgegen und wendet die Filter selbst an (Pushdown);
+Händler ohne diesen Parameter werden nachträglich über einen AttributeIndex ihrer Treffer gefiltert.
+"""
+import inspect
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from config import RETAILER_MAX_WORKERS, RETAILER_TIMEOUT_SECONDS, SEARCH_DEADLINE_SECONDS
 from schemas import ProductOut, ProductVariant
 
+# Feldreihenfolge der JSON-Ausgabe, direkt aus den Schemas abgeleitet
+PRODUCT_FIELDS = tuple(ProductOut.model_fields)
+VARIANT_FIELDS = tuple(ProductVariant.model_fields)
+
 
 @dataclass
 class RetailerProduct:
@@ -18,6 +33,7 @@ class RetailerProduct:
     product_url: str | None
     variants: list[ProductVariant]
     raw: dict
+    relevance: float | None = None  # BM25-Score der Katalogsuche (falls vorhanden)
 
     def to_product_out(self) -> ProductOut:
         return ProductOut(
@@ -31,7 +47,193 @@ class RetailerProduct:
             product_url=self.product_url,
             variants=self.variants,
             raw=self.raw,
+            relevance=self.relevance,
+        )
+
+    def to_record(self) -> dict:
+        """Wie to_product_out().model_dump(), aber ohne Pydantic – für die schnelle JSON-Ausgabe."""
+        record = {f: getattr(self, f) for f in PRODUCT_FIELDS}
+        record["variants"] = [{f: getattr(v, f) for f in VARIANT_FIELDS} for v in self.variants]
+        return record
+
+
+@dataclass
+class ProductFilter:
+    """
+    Attribut-Filter, die direkt in die Händler-Suche gereicht werden (Pushdown).
+    Unbekannte Attribute (z. B. Artikel ohne Größenangabe) schließen ein Produkt nicht aus.
+    """
+    sizes: list[str] = field(default_factory=list)
+    colors: list[str] = field(default_factory=list)
+    price_min: float | None = None
+    price_max: float | None = None
+    max_delivery_days: int | None = None
+
+    @classmethod
+    def from_search_filter(cls, data: dict | None) -> "ProductFilter":
+        """Aus SearchFilter.to_dict() (global gespeicherte Filter) erzeugen."""
+        data = data or {}
+        sizes = [data.get(k) for k in ("size_clothing", "size_pants", "size_shoes")]
+        colors = (data.get("color") or "").split(",")
+        return cls(
+            sizes=[s.strip() for s in sizes if s and s.strip()],
+            colors=[c.strip() for c in colors if c.strip()],
+            price_min=data.get("price_min"),
+            price_max=data.get("price_max"),
+            max_delivery_days=data.get("delivery_time_days"),
+        )
+
+    def is_empty(self) -> bool:
+        return not (
+            self.sizes or self.colors or self.price_min is not None
+            or self.price_max is not None or self.max_delivery_days is not None
+        )
+
+
+@dataclass
+class RetailerResult:
+    """Antwort eines einzelnen Händlers innerhalb einer Suche."""
+    retailer_id: str
+    products: list[RetailerProduct] = field(default_factory=list)
+    status: str = "ok"  # ok | failed | timeout
+    error: str | None = None
+
+
+@dataclass
+class RetailerSearchOutcome:
+    """Gesammeltes Ergebnis aller Händler inkl. ausgefallener/zu später Händler."""
+    products: list[RetailerProduct] = field(default_factory=list)
+    timed_out: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+
+
+_catalog_reload_listeners: list[Callable[[str], None]] = []
+
+
+def on_catalog_reload(listener: Callable[[str], None]) -> None:
+    """Callback registrieren, der nach dem (Neu-)Laden eines Händler-Katalogs aufgerufen wird."""
+    _catalog_reload_listeners.append(listener)
+
+
+def notify_catalog_reloaded(retailer_id: str) -> None:
+    for listener in list(_catalog_reload_listeners):
+        listener(retailer_id)
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Gemeinsamer Thread-Pool; verspätete Händler blockieren so nicht den Request."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RETAILER_MAX_WORKERS, thread_name_prefix="retailer")
+        return _executor
+
+
+def accepts_filters(search_fn: Callable) -> bool:
+    """Nimmt die Händler-Suche filters= entgegen (auch über functools.partial oder **kwargs)?"""
+    try:
+        params = inspect.signature(search_fn).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.name == "filters" or p.kind is inspect.Parameter.VAR_KEYWORD for p in params)
+
+
+def _search_retailer(search_fn: Callable, kwargs: dict, filters: ProductFilter | None) -> list[RetailerProduct]:
+    """Händler-Suche mit Filter-Pushdown; Händler ohne filters-Parameter werden danach gefiltert."""
+    if filters is None or filters.is_empty():
+        return list(search_fn(**kwargs))
+    if accepts_filters(search_fn):
+        return list(search_fn(**kwargs, filters=filters))
+    from retailers.attribute_index import AttributeIndex
+
+    products = list(search_fn(**kwargs))
+    mask = AttributeIndex(products).mask(filters)
+    return [p for p, keep in zip(products, mask) if keep]
+
+
+def _call_retailer(
+    search_fn: Callable, started: dict[str, float], retailer_id: str, kwargs: dict, filters: ProductFilter | None
+) -> list[RetailerProduct]:
+    started[retailer_id] = time.monotonic()
+    return _search_retailer(search_fn, kwargs, filters)
+
+
+def _iter_sequential(
+    retailers: list[tuple[str, Callable, str]],
+    kwargs: dict,
+    filters: ProductFilter | None,
+    retailer_timeout: float,
+    deadline_at: float,
+) -> Iterator[RetailerResult]:
+    # Nacheinander, aber jeder Aufruf über den Pool – so gelten Zeitlimit pro Händler und Gesamtfrist auch hier
+    for retailer in retailers:
+        yield from _iter_concurrent([retailer], kwargs, filters, retailer_timeout, deadline_at)
+
+
+def _iter_concurrent(
+    retailers: list[tuple[str, Callable, str]],
+    kwargs: dict,
+    filters: ProductFilter | None,
+    retailer_timeout: float,
+    deadline_at: float,
+) -> Iterator[RetailerResult]:
+    executor = _get_executor()
+    started: dict[str, float] = {}
+    pending = {
+        executor.submit(_call_retailer, search_fn, started, retailer_id, kwargs, filters): retailer_id
+        for retailer_id, search_fn, _ in retailers
+    }
+    while pending:
+        now = time.monotonic()
+        # Zeitlimit pro Händler zählt ab Start des Aufrufs (nicht ab Einreihung in den Pool)
+        expired = [
+            f for f, rid in pending.items()
+            if now >= deadline_at or (rid in started and now >= started[rid] + retailer_timeout)
+        ]
+        for f in expired:
+            f.cancel()
+            yield RetailerResult(pending.pop(f), status="timeout")
+        if not pending:
+            break
+        next_limit = min(
+            [deadline_at] + [started[rid] + retailer_timeout for rid in pending.values() if rid in started]
         )
+        done, _ = wait(pending, timeout=max(0.0, next_limit - now), return_when=FIRST_COMPLETED)
+        for f in done:
+            retailer_id = pending.pop(f)
+            try:
+                yield RetailerResult(retailer_id, list(f.result()))
+            except Exception as exc:
+                yield RetailerResult(retailer_id, status="failed", error=str(exc) or type(exc).__name__)
+
+
+def iter_retailer_results(
+    retailers: list[tuple[str, Callable, str]],
+    query: str,
+    category: str | None = None,
+    limit_per_retailer: int = 10,
+    spec: Any = None,
+    concurrent: bool = True,
+    retailer_timeout: float | None = None,
+    deadline: float | None = None,
+    filters: ProductFilter | None = None,
+) -> Iterator[RetailerResult]:
+    """
+    Fragt alle Händler ab und liefert die Antworten in der Reihenfolge ihres Eintreffens.
+    retailer_timeout: max. Sekunden pro Händler; deadline: max. Sekunden für die gesamte Suche.
+    filters: gehen an jeden Händler, der filters= annimmt (Pushdown), sonst werden seine Treffer nachgefiltert.
+    """
+    retailer_timeout = RETAILER_TIMEOUT_SECONDS if retailer_timeout is None else retailer_timeout
+    deadline = SEARCH_DEADLINE_SECONDS if deadline is None else deadline
+    deadline_at = time.monotonic() + deadline
+    kwargs = {"query": query, "category": category, "limit": limit_per_retailer}
+    if concurrent:
+        return _iter_concurrent(retailers, kwargs, filters, retailer_timeout, deadline_at)
+    return _iter_sequential(retailers, kwargs, filters, retailer_timeout, deadline_at)
 
 
 def search_all_retailers(
@@ -40,13 +242,32 @@ def search_all_retailers(
     category: str | None = None,
     limit_per_retailer: int = 10,
     spec: Any = None,
-) -> list[RetailerProduct]:
-    """Ruft jeden Händler auf und sammelt Produkte (nur Demo-Händler)."""
-    results: list[RetailerProduct] = []
-    for _retailer_id, search_fn, _ in retailers:
-        try:
-            products = search_fn(query=query, category=category, limit=limit_per_retailer)
-            results.extend(products)
-        except Exception:
-            continue
-    return results
+    concurrent: bool = True,
+    retailer_timeout: float | None = None,
+    deadline: float | None = None,
+    filters: ProductFilter | None = None,
+) -> RetailerSearchOutcome:
+    """Ruft alle Händler (standardmäßig parallel) auf und sammelt Produkte sowie Ausfälle."""
+    outcome = RetailerSearchOutcome()
+    by_retailer: dict[str, list[RetailerProduct]] = {}
+    for result in iter_retailer_results(
+        retailers,
+        query=query,
+        category=category,
+        limit_per_retailer=limit_per_retailer,
+        spec=spec,
+        concurrent=concurrent,
+        retailer_timeout=retailer_timeout,
+        deadline=deadline,
+        filters=filters,
+    ):
+        if result.status == "timeout":
+            outcome.timed_out.append(result.retailer_id)
+        elif result.status == "failed":
+            outcome.failed.append(result.retailer_id)
+        else:
+            by_retailer[result.retailer_id] = result.products
+    # Stabile Reihenfolge wie in der Händlerliste, unabhängig vom Eintreffen
+    for retailer_id, _, _ in retailers:
+        outcome.products.extend(by_retailer.get(retailer_id, []))
+    return outcome
@@ -0,0 +1,127 @@
+"""Invertierter Index mit BM25-Ranking für Händler-Kataloge (einmal beim Laden aufgebaut)."""
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Sequence
+
+from retailers.base import RetailerProduct
+from retailers.columnar import ColumnarCatalog
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_WORD_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+_PART_RE = re.compile(r"[a-z0-9]+")
+
+# Häufige Füllwörter in Titeln/Suchanfragen, die nichts zur Relevanz beitragen
+STOPWORDS = frozenset({
+    "der", "die", "das", "den", "dem", "des", "ein", "eine", "einer", "und", "oder",
+    "mit", "fuer", "von", "im", "in", "am", "an", "auf", "zu", "bis",
+    "the", "and", "for", "with", "of",
+})
+
+
+def normalize(text: str) -> str:
+    """Kleinschreibung + deutsche Umlaute/ß ausschreiben (Wärme-Größe → waerme-groesse)."""
+    text = unicodedata.normalize("NFC", text or "").lower().translate(_UMLAUTS)
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def word_parts(text: str) -> list[str]:
+    """Normalisierte [a-z0-9]-Folgen ohne Stoppwort-Filter (Grundlage der Teilwort-Suche im Essen-Katalog)."""
+    return _PART_RE.findall(normalize(text))
+
+
+def substring_terms(query: str) -> list[str]:
+    """Suchbegriffe der Teilwort-Suche: eindeutige Wortteile ab 2 Zeichen, in Reihenfolge der Anfrage."""
+    return list(dict.fromkeys(t for t in word_parts(query or "") if len(t) > 1))
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Zerlegt Text in normalisierte Tokens. Bindestrich-Komposita liefern ihre Teile
+    und die zusammengeschriebene Form, damit „Ski-Jacke“ und „Skijacke“ sich treffen.
+    """
+    tokens: list[str] = []
+    for word in _WORD_RE.findall(normalize(text)):
+        parts = word.split("-")
+        tokens.extend(p for p in parts if p not in STOPWORDS)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+    return tokens
+
+
+def _rank_key(item: tuple[int, float]) -> tuple[float, int]:
+    # Bei Gleichstand gewinnt die Katalogreihenfolge
+    return item[1], -item[0]
+
+
+class CatalogIndex:
+    """
+    Invertierter Index über Produkttitel eines Händlers.
+    Suchkosten skalieren mit der Länge der Posting-Listen der Suchbegriffe, nicht mit der Kataloggröße.
+    """
+
+    def __init__(self, products: list[RetailerProduct] | ColumnarCatalog, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        postings: dict[str, list[tuple[int, int]]] = {}
+        doc_lengths: list[int] = []
+        if isinstance(products, ColumnarCatalog):
+            # Titel sind interniert: jeden eindeutigen Titel nur einmal tokenisieren
+            self.products = products
+            by_code: dict[int, Counter] = {}
+
+            def counts_for(code: int) -> Counter:
+                if code not in by_code:
+                    by_code[code] = Counter(tokenize(products.strings.values[code]))
+                return by_code[code]
+
+            term_counts = (counts_for(code) for code in products.title_codes.tolist())
+        else:
+            self.products = list(products)
+            term_counts = (Counter(tokenize(p.title)) for p in self.products)
+        for doc_id, counts in enumerate(term_counts):
+            doc_lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((doc_id, tf))
+        self._postings = postings
+
+        n_docs = len(self.products)
+        avgdl = (sum(doc_lengths) / n_docs) if n_docs else 1.0
+        # Längennormierung pro Dokument vorberechnet: k1 * (1 - b + b * dl / avgdl)
+        self._norm = [k1 * (1 - b + b * dl / (avgdl or 1.0)) for dl in doc_lengths]
+        self._idf = {
+            token: math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for token, plist in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def search(
+        self,
+        query: str,
+        limit: int | None = None,
+        allowed: Sequence[bool] | None = None,
+    ) -> list[tuple[RetailerProduct, float]]:
+        """
+        BM25-Suche (ODER-Verknüpfung der Begriffe); Rückgabe (Produkt, Score) absteigend.
+        allowed: optionale Maske pro Produkt (z. B. aus AttributeIndex.mask); andere werden übersprungen.
+        """
+        scores: dict[int, float] = {}
+        k1_plus_1 = self.k1 + 1
+        for token in set(tokenize(query)):
+            plist = self._postings.get(token)
+            if not plist:
+                continue
+            idf = self._idf[token]
+            norm = self._norm
+            for doc_id, tf in plist:
+                if allowed is not None and not allowed[doc_id]:
+                    continue
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * k1_plus_1 / (tf + norm[doc_id])
+        if limit is not None:
+            top = heapq.nlargest(limit, scores.items(), key=_rank_key)
+        else:
+            top = sorted(scores.items(), key=_rank_key, reverse=True)
+        return [(self.products[doc_id], score) for doc_id, score in top]
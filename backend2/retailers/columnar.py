@@ -0,0 +1,131 @@
+"""Spaltenorientierter Händler-Katalog: zusammenhängende Arrays statt einer Liste von RetailerProduct."""
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from retailers.base import RetailerProduct
+from schemas import ProductVariant
+
+_NONE = -1  # Code für fehlende Werte in den Code-Arrays
+
+
+class StringTable:
+    """Internierte Zeichenketten: jeder Wert wird einmal gespeichert und über einen int-Code referenziert."""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def code(self, value: str | None) -> int:
+        if value is None:
+            return _NONE
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def get(self, code: int) -> str | None:
+        return None if code == _NONE else self.values[code]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class ColumnarCatalog:
+    """
+    Katalog als Spalten: Preis, Lieferzeit und Händler-Code als Arrays, Titel/Währung/Größe/Farbe
+    interniert, Varianten über ein Offset-Array (Varianten von Zeile i: offsets[i]..offsets[i+1]).
+    RetailerProduct-Objekte werden erst bei Zugriff (catalog[i]) erzeugt.
+    """
+
+    def __init__(self, products: Iterable[RetailerProduct]):
+        self.strings = StringTable()
+        retailer_codes: list[int] = []
+        title_codes: list[int] = []
+        currency_codes: list[int] = []
+        prices: list[float] = []
+        delivery: list[int] = []
+        offsets: list[int] = [0]
+        variant_sizes: list[int] = []
+        variant_colors: list[int] = []
+        self.product_ids: list[str] = []
+        self.image_urls: list[str | None] = []
+        self.product_urls: list[str | None] = []
+        # Selten belegte Felder nur dünn besetzt speichern (Zeile/Variante → Wert)
+        self._raw: dict[int, dict] = {}
+        self._variant_skus: dict[int, str] = {}
+        self._variant_extra: dict[int, dict] = {}
+
+        s = self.strings
+        for row, p in enumerate(products):
+            retailer_codes.append(s.code(p.retailer_id))
+            title_codes.append(s.code(p.title))
+            currency_codes.append(s.code(p.currency))
+            prices.append(p.price)
+            delivery.append(_NONE if p.delivery_estimate_days is None else p.delivery_estimate_days)
+            self.product_ids.append(p.product_id)
+            self.image_urls.append(p.image_url)
+            self.product_urls.append(p.product_url)
+            if p.raw:
+                self._raw[row] = p.raw
+            for v in p.variants:
+                if v.sku is not None:
+                    self._variant_skus[len(variant_sizes)] = v.sku
+                if v.extra:
+                    self._variant_extra[len(variant_sizes)] = v.extra
+                variant_sizes.append(s.code(v.size))
+                variant_colors.append(s.code(v.color))
+            offsets.append(len(variant_sizes))
+
+        self.retailer_codes = np.array(retailer_codes, dtype=np.int32)
+        self.title_codes = np.array(title_codes, dtype=np.int32)
+        self.currency_codes = np.array(currency_codes, dtype=np.int32)
+        self.prices = np.array(prices, dtype=np.float64)
+        self.delivery_days = np.array(delivery, dtype=np.int32)  # -1 = unbekannt
+        self.variant_offsets = np.array(offsets, dtype=np.int64)
+        self.variant_sizes = np.array(variant_sizes, dtype=np.int32)
+        self.variant_colors = np.array(variant_colors, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def variant_rows(self) -> np.ndarray:
+        """Zeilennummer je Variante (gleiche Länge wie variant_sizes/variant_colors)."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.variant_offsets))
+
+    def _variants(self, row: int) -> list[ProductVariant]:
+        s = self.strings
+        start, end = int(self.variant_offsets[row]), int(self.variant_offsets[row + 1])
+        return [
+            ProductVariant(
+                size=s.get(int(self.variant_sizes[j])),
+                color=s.get(int(self.variant_colors[j])),
+                sku=self._variant_skus.get(j),
+                extra=self._variant_extra.get(j, {}),
+            )
+            for j in range(start, end)
+        ]
+
+    def __getitem__(self, row: int) -> RetailerProduct:
+        row = int(row)
+        if row < 0:
+            row += len(self)
+        s = self.strings
+        days = int(self.delivery_days[row])
+        return RetailerProduct(
+            retailer_id=s.values[self.retailer_codes[row]],
+            product_id=self.product_ids[row],
+            title=s.values[self.title_codes[row]],
+            price=float(self.prices[row]),
+            currency=s.values[self.currency_codes[row]],
+            delivery_estimate_days=None if days == _NONE else days,
+            image_url=self.image_urls[row],
+            product_url=self.product_urls[row],
+            variants=self._variants(row),
+            raw=self._raw.get(row, {}),
+        )
+
+    def __iter__(self) -> Iterator[RetailerProduct]:
+        for row in range(len(self)):
+            yield self[row]
@@ -1,6 +1,12 @@
 """Drei Mock-Händler mit vielen Demo-Produktdaten (StyleHub, UrbanOutfit, SportDirect)."""
+from dataclasses import replace
+
+from config import CATALOG_COLUMNAR
 from schemas import ProductVariant
-from retailers.base import RetailerProduct
+from retailers.attribute_index import AttributeIndex
+from retailers.base import ProductFilter, RetailerProduct, notify_catalog_reloaded
+from retailers.catalog_index import CatalogIndex
+from retailers.columnar import ColumnarCatalog
 
 # StyleHub: Mode, Sport, Party
 STYLEHUB_PRODUCTS = [
@@ -51,21 +57,62 @@ SPORTDIRECT_PRODUCTS = [
 ]
 
 
-def _filter_mock(query: str, products: list[RetailerProduct], limit: int) -> list[RetailerProduct]:
-    q = (query or "").lower()
-    if not q:
-        return products[:limit]
-    out = [p for p in products if q in p.title.lower() or q in p.retailer_id]
-    return (out + products)[:limit]
+# Indizes werden einmal beim Laden aufgebaut (nicht pro Suche)
+_CATALOGS: dict[str, CatalogIndex] = {}
+_ATTRIBUTES: dict[str, AttributeIndex] = {}
+
+
+def load_catalog(
+    retailer_id: str,
+    products: list[RetailerProduct] | ColumnarCatalog,
+    columnar: bool = CATALOG_COLUMNAR,
+) -> None:
+    """
+    Katalog eines Händlers (neu) laden und Such- sowie Attribut-Index aufbauen.
+    columnar: Produkte als ColumnarCatalog halten; RetailerProduct entsteht dann erst pro Treffer.
+    """
+    if columnar and not isinstance(products, ColumnarCatalog):
+        products = ColumnarCatalog(products)
+    _CATALOGS[retailer_id] = CatalogIndex(products)
+    _ATTRIBUTES[retailer_id] = AttributeIndex(products)
+    notify_catalog_reloaded(retailer_id)
+
+
+def _filter_mock(query: str, retailer_id: str, limit: int, filters: ProductFilter | None = None) -> list[RetailerProduct]:
+    index = _CATALOGS[retailer_id]
+    allowed = _ATTRIBUTES[retailer_id].mask(filters)
+    hits = [replace(p, relevance=round(score, 4)) for p, score in index.search(query, limit=limit, allowed=allowed)]
+    if len(hits) < limit:
+        # Demo: mit weiteren (filterkonformen) Katalogartikeln auffüllen, damit immer Ergebnisse erscheinen
+        hit_ids = {p.product_id for p in hits}
+        doc_ids = range(len(index.products)) if allowed is None else allowed.nonzero()[0]
+        for doc_id in doc_ids:
+            if len(hits) >= limit:
+                break
+            p = index.products[doc_id]
+            if p.product_id not in hit_ids:
+                hits.append(replace(p, relevance=0.0))
+    return hits
+
+
+def search_stylehub(
+    query: str, category: str | None = None, limit: int = 10, filters: ProductFilter | None = None,
+) -> list[RetailerProduct]:
+    return _filter_mock(query, "stylehub", limit, filters)
 
 
-def search_stylehub(query: str, category: str | None = None, limit: int = 10) -> list[RetailerProduct]:
-    return _filter_mock(query, STYLEHUB_PRODUCTS, limit)
+def search_urbanoutfit(
+    query: str, category: str | None = None, limit: int = 10, filters: ProductFilter | None = None,
+) -> list[RetailerProduct]:
+    return _filter_mock(query, "urbanoutfit", limit, filters)
 
 
-def search_urbanoutfit(query: str, category: str | None = None, limit: int = 10) -> list[RetailerProduct]:
-    return _filter_mock(query, URBAN_PRODUCTS, limit)
+def search_sportdirect(
+    query: str, category: str | None = None, limit: int = 10, filters: ProductFilter | None = None,
+) -> list[RetailerProduct]:
+    return _filter_mock(query, "sportdirect", limit, filters)
 
 
-def search_sportdirect(query: str, category: str | None = None, limit: int = 10) -> list[RetailerProduct]:
-    return _filter_mock(query, SPORTDIRECT_PRODUCTS, limit)
+load_catalog("stylehub", STYLEHUB_PRODUCTS)
+load_catalog("urbanoutfit", URBAN_PRODUCTS)
+load_catalog("sportdirect", SPORTDIRECT_PRODUCTS)
@@ -0,0 +1,325 @@
+"""
+Händler-Katalog auf der Platte (SQLite + FTS5): Titelsuche mit bm25-Ranking, Preis/Lieferzeit indiziert.
+Kataloge müssen nicht in den Speicher passen und werden beim Start nicht aufgebaut.
+Zusätzlich ein Trigramm-Index über Titel + Quelle für die Teilwort-Suche des Essen-Katalogs
+(search_catalog_substring, gleiche Treffer und Reihenfolge wie essen_data.EssenIndex).
+
+Bulk-Import: siehe ingest_catalog.py. Importe laufen meist in einem eigenen Prozess; jeder Import erhöht
+den Zähler in catalog_versions, der Server vergleicht ihn vor jeder Suche (check_catalog_changes).
+"""
+import json
+import sqlite3
+import threading
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from retailers.base import ProductFilter, RetailerProduct, notify_catalog_reloaded
+from retailers.catalog_index import normalize, substring_terms, tokenize, word_parts
+from schemas import ProductVariant
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_retailers (
+    retailer_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS catalog_versions (
+    retailer_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS catalog_products (
+    id INTEGER PRIMARY KEY,
+    retailer_id TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    price REAL NOT NULL,
+    currency TEXT NOT NULL DEFAULT 'EUR',
+    delivery_days INTEGER,
+    image_url TEXT,
+    product_url TEXT,
+    variants TEXT,
+    raw TEXT,
+    UNIQUE (retailer_id, product_id)
+);
+CREATE INDEX IF NOT EXISTS ix_catalog_products_price ON catalog_products (retailer_id, price);
+CREATE INDEX IF NOT EXISTS ix_catalog_products_delivery ON catalog_products (retailer_id, delivery_days);
+CREATE TABLE IF NOT EXISTS catalog_variants (
+    product_rowid INTEGER NOT NULL,
+    attr TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_catalog_variants_lookup ON catalog_variants (product_rowid, attr, value);
+CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(terms, tokenize = 'unicode61');
+CREATE VIRTUAL TABLE IF NOT EXISTS catalog_trigram USING fts5(terms, tokenize = 'trigram');
+"""
+
+_COLUMNS = "p.id, p.retailer_id, p.product_id, p.title, p.price, p.currency, p.delivery_days, " \
+           "p.image_url, p.product_url, p.variants, p.raw"
+
+_local = threading.local()
+# db_path → zuletzt gesehene Import-Zähler je Händler
+_seen_versions: dict[str, dict[str, int]] = {}
+_seen_lock = threading.Lock()
+
+
+def _read_connection(db_path: str) -> sqlite3.Connection:
+    """Eine lesende Verbindung pro Thread und Datei (sqlite3-Verbindungen sind nicht thread-safe)."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = conns[db_path] = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    return conn
+
+
+def _fts_query(query: str) -> str:
+    # Tokens bestehen nur aus [a-z0-9], Anführungszeichen machen sie zu FTS5-Literalen
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(tokenize(query)))
+
+
+def _filter_sql(filters: ProductFilter | None) -> tuple[str, list]:
+    """WHERE-Zusatz mit denselben Regeln wie AttributeIndex.mask (unbekannte Attribute schließen nicht aus)."""
+    if filters is None or filters.is_empty():
+        return "", []
+    clauses: list[str] = []
+    params: list = []
+    if filters.price_min is not None:
+        clauses.append("p.price >= ?")
+        params.append(filters.price_min)
+    if filters.price_max is not None:
+        clauses.append("p.price <= ?")
+        params.append(filters.price_max)
+    if filters.max_delivery_days is not None:
+        clauses.append("(p.delivery_days IS NULL OR p.delivery_days <= ?)")
+        params.append(filters.max_delivery_days)
+    for attr, values in (
+        ("size", [v.strip().upper() for v in filters.sizes]),
+        ("color", [normalize(v.strip()) for v in filters.colors]),
+    ):
+        if not values:
+            continue
+        marks = ",".join("?" * len(values))
+        clauses.append(
+            f"(NOT EXISTS (SELECT 1 FROM catalog_variants v WHERE v.product_rowid = p.id AND v.attr = '{attr}')"
+            f" OR EXISTS (SELECT 1 FROM catalog_variants v WHERE v.product_rowid = p.id AND v.attr = '{attr}'"
+            f" AND v.value IN ({marks})))"
+        )
+        params.extend(values)
+    return "".join(f" AND {c}" for c in clauses), params
+
+
+def _row_to_product(row: tuple, relevance: float | None) -> RetailerProduct:
+    _, retailer_id, product_id, title, price, currency, days, image_url, product_url, variants, raw = row
+    return RetailerProduct(
+        retailer_id=retailer_id,
+        product_id=product_id,
+        title=title,
+        price=price,
+        currency=currency,
+        delivery_estimate_days=days,
+        image_url=image_url,
+        product_url=product_url,
+        variants=[ProductVariant(**v) for v in json.loads(variants)] if variants else [],
+        raw=json.loads(raw) if raw else {},
+        relevance=relevance,
+    )
+
+
+def search_catalog(
+    db_path: str,
+    retailer_id: str,
+    query: str,
+    category: str | None = None,
+    limit: int = 10,
+    filters: ProductFilter | None = None,
+    fill: bool = True,
+) -> list[RetailerProduct]:
+    """
+    Händler-Suche gegen die Katalog-DB: FTS5-Treffer nach bm25 sortiert, Filter direkt im SQL.
+    fill: wie die Mock-Händler mit weiteren (filterkonformen) Produkten auffüllen.
+    """
+    conn = _read_connection(db_path)
+    where, params = _filter_sql(filters)
+    out: list[RetailerProduct] = []
+    match = _fts_query(query)
+    if match:
+        rows = conn.execute(
+            f"SELECT {_COLUMNS}, bm25(catalog_fts) AS rank FROM catalog_fts"
+            f" JOIN catalog_products p ON p.id = catalog_fts.rowid"
+            f" WHERE catalog_fts MATCH ? AND p.retailer_id = ?{where} ORDER BY rank LIMIT ?",
+            [match, retailer_id, *params, limit],
+        ).fetchall()
+        # FTS5-bm25 ist negativ (kleiner = besser) → als positive Relevanz ausgeben
+        out = [_row_to_product(r[:-1], round(-r[-1], 4)) for r in rows]
+    if fill and len(out) < limit:
+        seen = [r.product_id for r in out]
+        not_in = f" AND p.product_id NOT IN ({','.join('?' * len(seen))})" if seen else ""
+        rows = conn.execute(
+            f"SELECT {_COLUMNS} FROM catalog_products p WHERE p.retailer_id = ?{where}{not_in} ORDER BY p.id LIMIT ?",
+            [retailer_id, *params, *seen, limit - len(out)],
+        ).fetchall()
+        out.extend(_row_to_product(r, 0.0) for r in rows)
+    return out
+
+
+def _term_hits_sql(term: str) -> tuple[str, str]:
+    # Trigramm-MATCH findet Teilwörter ab 3 Zeichen; kürzere Begriffe über LIKE (Scan des Trigramm-Index)
+    if len(term) >= 3:
+        return "SELECT rowid AS id FROM catalog_trigram WHERE catalog_trigram MATCH ?", f'"{term}"'
+    return "SELECT rowid AS id FROM catalog_trigram WHERE terms LIKE ?", f"%{term}%"
+
+
+def search_catalog_substring(
+    db_path: str,
+    retailer_id: str,
+    query: str,
+    limit: int = 3,
+    filters: ProductFilter | None = None,
+) -> list[RetailerProduct]:
+    """
+    Teilwort-Suche wie essen_data.EssenIndex: ein Produkt trifft einen Begriff, wenn ein Wortteil aus Titel
+    oder Quelle ihn enthält ("chips" → "Crunchips"). Sortierung nach Anzahl getroffener Begriffe (relevance),
+    bei Gleichstand Import-Reihenfolge; ohne Begriffe die ersten filterkonformen Produkte.
+    """
+    conn = _read_connection(db_path)
+    where, params = _filter_sql(filters)
+    terms = substring_terms(query)
+    if not terms:
+        rows = conn.execute(
+            f"SELECT {_COLUMNS} FROM catalog_products p WHERE p.retailer_id = ?{where} ORDER BY p.id LIMIT ?",
+            [retailer_id, *params, limit],
+        ).fetchall()
+        return [_row_to_product(r, 0.0) for r in rows]
+    hits = [_term_hits_sql(t) for t in terms]
+    rows = conn.execute(
+        f"SELECT {_COLUMNS}, COUNT(*) AS coverage"
+        f" FROM ({' UNION ALL '.join(sql for sql, _ in hits)}) h JOIN catalog_products p ON p.id = h.id"
+        f" WHERE p.retailer_id = ?{where} GROUP BY p.id ORDER BY coverage DESC, p.id LIMIT ?",
+        [*(arg for _, arg in hits), retailer_id, *params, limit],
+    ).fetchall()
+    return [_row_to_product(r[:-1], float(r[-1])) for r in rows]
+
+
+def catalog_retailers(db_path: str) -> list[tuple[str, str]]:
+    """(retailer_id, name) aller Händler in der Katalog-DB; leer, wenn die Datei fehlt."""
+    if not db_path or not Path(db_path).exists():
+        return []
+    try:
+        return _read_connection(db_path).execute(
+            "SELECT retailer_id, name FROM catalog_retailers ORDER BY retailer_id"
+        ).fetchall()
+    except sqlite3.Error:
+        return []
+
+
+def catalog_versions(db_path: str) -> dict[str, int]:
+    """Import-Zähler je Händler; leer, wenn die Datei (oder die Tabelle in älteren Katalog-DBs) fehlt."""
+    if not db_path or not Path(db_path).exists():
+        return {}
+    try:
+        return dict(_read_connection(db_path).execute("SELECT retailer_id, version FROM catalog_versions").fetchall())
+    except sqlite3.Error:
+        return {}
+
+
+def check_catalog_changes(db_path: str) -> list[str]:
+    """
+    Import-Zähler mit dem zuletzt gesehenen Stand vergleichen und geänderte Händler per
+    notify_catalog_reloaded melden (leert u. a. den Such-Cache). Der erste Aufruf merkt sich nur den Stand.
+    """
+    current = catalog_versions(db_path)
+    with _seen_lock:
+        previous = _seen_versions.get(db_path)
+        _seen_versions[db_path] = current
+    if previous is None:
+        return []
+    changed = [rid for rid, version in current.items() if previous.get(rid) != version]
+    for rid in changed:
+        notify_catalog_reloaded(rid)
+    return changed
+
+
+# ---- Bulk-Import ----
+
+def _variant_rows(rowid: int, variants: list[ProductVariant]) -> Iterator[tuple[int, str, str]]:
+    for v in variants:
+        if v.size:
+            yield rowid, "size", v.size.strip().upper()
+        if v.color:
+            yield rowid, "color", normalize(v.color.strip())
+
+
+def ingest_products(
+    db_path: str,
+    retailer_id: str,
+    name: str,
+    products: Iterable[RetailerProduct],
+    batch_size: int = 5000,
+) -> int:
+    """
+    Ersetzt den Katalog eines Händlers in einer Transaktion (Leser sehen bis zum Commit den alten Stand)
+    und erhöht seinen Import-Zähler. Gibt die Anzahl importierter Produkte zurück.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.execute(
+                "DELETE FROM catalog_fts WHERE rowid IN (SELECT id FROM catalog_products WHERE retailer_id = ?)",
+                (retailer_id,),
+            )
+            conn.execute(
+                "DELETE FROM catalog_trigram WHERE rowid IN (SELECT id FROM catalog_products WHERE retailer_id = ?)",
+                (retailer_id,),
+            )
+            conn.execute(
+                "DELETE FROM catalog_variants WHERE product_rowid IN "
+                "(SELECT id FROM catalog_products WHERE retailer_id = ?)",
+                (retailer_id,),
+            )
+            conn.execute("DELETE FROM catalog_products WHERE retailer_id = ?", (retailer_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO catalog_retailers (retailer_id, name) VALUES (?, ?)",
+                (retailer_id, name),
+            )
+            conn.execute(
+                "INSERT INTO catalog_versions (retailer_id, version) VALUES (?, 1)"
+                " ON CONFLICT (retailer_id) DO UPDATE SET version = version + 1",
+                (retailer_id,),
+            )
+            next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM catalog_products").fetchone()[0]
+            total = 0
+            it = iter(products)
+            while batch := list(islice(it, batch_size)):
+                product_rows, fts_rows, trigram_rows, variant_rows = [], [], [], []
+                for p in batch:
+                    rowid = next_id
+                    next_id += 1
+                    product_rows.append((
+                        rowid, retailer_id, p.product_id, p.title, p.price, p.currency or "EUR",
+                        p.delivery_estimate_days, p.image_url, p.product_url,
+                        json.dumps([v.model_dump(exclude_defaults=True) for v in p.variants]) if p.variants else None,
+                        json.dumps(p.raw, ensure_ascii=False) if p.raw else None,
+                    ))
+                    fts_rows.append((rowid, " ".join(tokenize(p.title))))
+                    # Wortteile durch Leerzeichen getrennt: ein Teilwort-Treffer liegt so immer in einem Wortteil
+                    source = (p.raw or {}).get("source") or ""
+                    trigram_rows.append((rowid, " ".join(word_parts(f"{p.title} {source}"))))
+                    variant_rows.extend(_variant_rows(rowid, p.variants))
+                conn.executemany(
+                    "INSERT INTO catalog_products (id, retailer_id, product_id, title, price, currency,"
+                    " delivery_days, image_url, product_url, variants, raw) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                    product_rows,
+                )
+                conn.executemany("INSERT INTO catalog_fts (rowid, terms) VALUES (?, ?)", fts_rows)
+                conn.executemany("INSERT INTO catalog_trigram (rowid, terms) VALUES (?, ?)", trigram_rows)
+                conn.executemany(
+                    "INSERT INTO catalog_variants (product_rowid, attr, value) VALUES (?, ?, ?)", variant_rows
+                )
+                total += len(batch)
+    finally:
+        conn.close()
+    return total
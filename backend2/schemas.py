@@ -103,6 +103,7 @@ class ProductOut(BaseModel):
     product_url: str | None = None
     variants: list[ProductVariant] = []
     raw: dict[str, Any] = Field(default_factory=dict)
+    relevance: float | None = None  # Text-Relevanz (BM25) aus der Händler-Suche
 
     class Config:
         extra = "allow"
@@ -123,6 +124,64 @@ class SearchResultOut(BaseModel):
     products: list[RankedProductOut]
     ranking_explanation: str = ""
     why_first: str = ""
+    retailers_timed_out: list[str] = []  # Händler, die nicht rechtzeitig geantwortet haben
+    retailers_failed: list[str] = []     # Händler mit Fehler
+    total_count: int = 0                 # Anzahl aller gerankten Kandidaten
+    next_cursor: str | None = None       # für weitere Seiten (GET .../search/next)
+
+
+class SearchPageOut(BaseModel):
+    """Weitere Seite einer Suche (über next_cursor)."""
+    products: list[RankedProductOut]
+    total_count: int = 0
+    next_cursor: str | None = None
+
+
+class SearchBatchOut(BaseModel):
+    """Teilergebnis der Streaming-Suche: geranktes Batch eines Händlers."""
+    retailer_id: str
+    status: str = "ok"  # ok | failed | timeout
+    products: list[RankedProductOut] = []
+
+
+class CacheStatsOut(BaseModel):
+    """Kennzahlen eines Caches."""
+    size: int
+    maxsize: int
+    ttl_seconds: float
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    # nur beim persistenten SerpAPI-Cache
+    stale_seconds: float | None = None
+    stale_hits: int | None = None
+    hit_rate: float | None = None
+    refreshes: int | None = None
+    refresh_errors: int | None = None
+
+
+class LLMPurposeStatsOut(BaseModel):
+    """Zähler des Sprachmodell-Zugangs für einen Zweck (chat, plan, ...)."""
+    calls: int = 0
+    skipped: int = 0  # ohne Modellaufruf beantwortet (Regel-Pfad)
+    errors: int = 0
+    retries: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    prompt_tokens_avg: float = 0.0
+    prompt_tokens_max: int = 0
+    recent_prompt_tokens: list[int] = []  # Prompt-Größe der letzten Aufrufe (älteste zuerst)
+    latency_avg_ms: float = 0.0
+    latency_p95_ms: float = 0.0
+    latency_max_ms: float = 0.0
+    first_token_avg_ms: float = 0.0  # nur Streaming-Aufrufe
+
+
+class LLMStatsOut(BaseModel):
+    backend: str
+    max_concurrency: int
+    purposes: dict[str, LLMPurposeStatsOut] = {}
 
 
 # ---- Cart ----
@@ -234,6 +293,7 @@ class ShoppingPlanComponent(BaseModel):
     priority: str = "must_have"  # must_have | nice_to_have
     quantity: int = 1
     notes: list[str] = []
+    lookup_error: str | None = None  # "timeout" oder Fehlermeldung, wenn die Treffersuche scheiterte
 
 
 class ShoppingPlanOut(BaseModel):
@@ -250,5 +310,19 @@ class PlanComponentSearchOut(BaseModel):
     shopping_results: list[dict] = []  # Rohdaten von SerpAPI (title, link, price, ...)
 
 
+class JobOut(BaseModel):
+    """Hintergrund-Job: Status, Fortschritt (0–1) und Ergebnis im Format des synchronen Endpunkts."""
+    job_id: str
+    session_id: str
+    kind: str  # shopping_plan | google_shopping
+    status: str  # queued | running | succeeded | failed | cancelled
+    step: str | None = None  # plan | lookup
+    progress: float = 0.0
+    result: Any = None  # ShoppingPlanOut bzw. list[PlanComponentSearchOut]
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+
 # Für SessionResponse
 SessionResponse.model_rebuild()
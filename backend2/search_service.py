@@ -1,16 +1,93 @@
 """Suche: Demo-Händler (StyleHub, UrbanOutfit, SportDirect) + Ranking."""
-from retailers import search_products
-from ranking import rank_products, why_first
-from schemas import ShoppingSpecOut, SearchResultOut, RankedProductOut
+import hashlib
+import json
+import secrets
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterator
 
+import orjson
 
-def run_search(spec: ShoppingSpecOut) -> SearchResultOut:
-    """
-    Sucht passende Produkte basierend auf dem Brief.
-    Nutzt nur Demo-Daten der Mock-Händler und bewertet sie mit dem Ranking.
-    """
-    currency = (spec.budget_currency or "EUR").strip().upper()
-    query = " ".join(
+from config import (
+    SEARCH_CACHE_MAXSIZE,
+    SEARCH_CACHE_TTL_SECONDS,
+    SEARCH_CURSOR_MAXSIZE,
+    SEARCH_CURSOR_TTL_SECONDS,
+)
+from retailers import RETAILERS, ProductFilter, RetailerProduct, check_catalog_db, iter_products, search_products
+from retailers.base import on_catalog_reload
+from ranking import RankedCandidates, why_first
+from schemas import ShoppingSpecOut, SearchPageOut, SearchResultOut
+from ttl_cache import LRUTTLCache
+
+LIMIT_PER_RETAILER = 12
+
+RANKING_EXPLANATION = (
+    "Bewertung nach: Gesamtkosten, Lieferfähigkeit bis Frist, "
+    "Präferenz-Match und Set-Kohärenz. Gewichte: Kosten 35%, Lieferung 35%, Präferenz 20%, Kohärenz 10%."
+)
+
+
+@dataclass
+class SearchState:
+    """Gerankte, noch nicht materialisierte Suche; Basis für Cache und Cursor-Seiten."""
+    candidates: RankedCandidates
+    why_first: str
+    timed_out: list[str]
+    failed: list[str]
+
+
+# Identische Briefs liefern identische Ergebnisse → Ergebnis-Cache; beim Katalog-Reload leeren
+# (auch bei Importen in anderen Prozessen: check_catalog_db vor jedem Cache-Zugriff)
+SEARCH_CACHE = LRUTTLCache(maxsize=SEARCH_CACHE_MAXSIZE, ttl_seconds=SEARCH_CACHE_TTL_SECONDS)
+# Cursor-Token → SearchState, damit weitere Seiten ohne neue Suche geladen werden können;
+# eigene Grenzen, damit Cursor auch bei abgeschaltetem Such-Cache (SEARCH_CACHE_MAXSIZE=0) gelten
+_CURSOR_STATES = LRUTTLCache(maxsize=SEARCH_CURSOR_MAXSIZE, ttl_seconds=SEARCH_CURSOR_TTL_SECONDS)
+
+
+def _clear_caches(_retailer_id: str) -> None:
+    SEARCH_CACHE.clear()
+    _CURSOR_STATES.clear()
+
+
+on_catalog_reload(_clear_caches)
+
+
+def _cache_key(spec: ShoppingSpecOut, filters: ProductFilter | None = None) -> str:
+    """Kanonischer Hash der Brief-Felder und Filter, die Suche und Ranking beeinflussen."""
+    def text(value: str | None) -> str:
+        return (value or "").strip().lower()
+
+    def texts(values: list[str] | None) -> list[str]:
+        return sorted(text(v) for v in values or [] if text(v))
+
+    canonical = {
+        "reason": text(spec.reason),
+        "event_type": text(spec.event_type),
+        "event_name": text(spec.event_name),
+        "category": text(spec.category),
+        "must_haves": texts(spec.must_haves),
+        "nice_to_haves": texts(spec.nice_to_haves),
+        "preferences": texts(spec.preferences),
+        "budget_max": spec.budget_max,
+        "delivery_deadline": text(spec.delivery_deadline),
+        # Liefer-Score hängt vom heutigen Datum ab
+        "today": date.today().isoformat(),
+    }
+    if filters is not None and not filters.is_empty():
+        canonical["filters"] = {
+            "sizes": sorted(text(v).upper() for v in filters.sizes),
+            "colors": texts(filters.colors),
+            "price_min": filters.price_min,
+            "price_max": filters.price_max,
+            "max_delivery_days": filters.max_delivery_days,
+        }
+    raw = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _build_query(spec: ShoppingSpecOut) -> str:
+    return " ".join(
         filter(None, [
             spec.reason,
             spec.event_type,
@@ -19,22 +96,162 @@ def run_search(spec: ShoppingSpecOut) -> SearchResultOut:
             *(spec.nice_to_haves or []),
         ])
     ).strip() or "ski winter party"
-    limit_per_retailer = 12
-    products = search_products(
-        query=query,
+
+
+def _build_state(
+    spec: ShoppingSpecOut,
+    products: list[RetailerProduct],
+    timed_out: list[str],
+    failed: list[str],
+) -> SearchState:
+    candidates = RankedCandidates(products, spec)
+    top = candidates.materialize(0, 1)
+    why_first_text = why_first(top, spec) if top else "Keine Produkte in den Demo-Daten gefunden."
+    return SearchState(candidates, why_first_text, timed_out, failed)
+
+
+def _cache_state(key: str, state: SearchState) -> None:
+    """Neu berechnete Suche im Such-Cache ablegen – nur bei Miss, sonst liefe die TTL nie ab."""
+    # Teilergebnisse (Händler zu spät/fehlerhaft) nicht im Such-Cache ablegen
+    if not state.timed_out and not state.failed:
+        SEARCH_CACHE.set(key, state)
+
+
+def _register_cursor(state: SearchState) -> str:
+    """State unter neuem Cursor-Token für weitere Seiten ablegen."""
+    token = secrets.token_urlsafe(12)
+    _CURSOR_STATES.set(token, state)
+    return token
+
+
+def _next_cursor(token: str, state: SearchState, end: int) -> str | None:
+    return f"{token}:{end}" if end < len(state.candidates) else None
+
+
+def _result_payload(spec: ShoppingSpecOut, state: SearchState, token: str, limit: int | None) -> dict:
+    """SearchResultOut als plain dict (gleiches Layout), ohne Pydantic-Objekte pro Produkt."""
+    products = state.candidates.records(0, limit)
+    return {
+        "shopping_spec": spec.model_dump(),
+        "products": products,
+        "ranking_explanation": RANKING_EXPLANATION,
+        "why_first": state.why_first,
+        "retailers_timed_out": state.timed_out,
+        "retailers_failed": state.failed,
+        "total_count": len(state.candidates),
+        "next_cursor": _next_cursor(token, state, len(products)),
+    }
+
+
+def _search_payload(spec: ShoppingSpecOut, limit: int | None, filters: ProductFilter | None) -> dict:
+    check_catalog_db()
+    key = _cache_key(spec, filters)
+    state = SEARCH_CACHE.get(key)
+    if state is None:
+        outcome = search_products(
+            query=_build_query(spec),
+            category=spec.category,
+            limit_per_retailer=LIMIT_PER_RETAILER,
+            spec=spec,
+            filters=filters,
+        )
+        state = _build_state(spec, outcome.products, outcome.timed_out, outcome.failed)
+        _cache_state(key, state)
+    return _result_payload(spec, state, _register_cursor(state), limit)
+
+
+def run_search(
+    spec: ShoppingSpecOut,
+    limit: int | None = None,
+    filters: ProductFilter | None = None,
+) -> SearchResultOut:
+    """
+    Sucht passende Produkte basierend auf dem Brief.
+    Nutzt nur Demo-Daten der Mock-Händler und bewertet sie mit dem Ranking.
+    Wiederholte identische Briefs werden aus dem SEARCH_CACHE beantwortet.
+    limit: nur die besten N Produkte ausgeben; weitere Seiten über next_cursor (get_search_page).
+    filters: Größe/Farbe/Preis/Lieferzeit, werden schon in der Händler-Suche angewendet.
+    """
+    return SearchResultOut.model_validate(_search_payload(spec, limit, filters))
+
+
+def run_search_json(
+    spec: ShoppingSpecOut,
+    limit: int | None = None,
+    filters: ProductFilter | None = None,
+) -> bytes:
+    """Wie run_search, aber direkt als JSON-Bytes (Schema SearchResultOut) für die API-Antwort."""
+    return orjson.dumps(_search_payload(spec, limit, filters))
+
+
+def _page_payload(cursor: str, limit: int) -> dict | None:
+    token, _, offset_str = cursor.rpartition(":")
+    if not token or not offset_str.isdigit():
+        return None
+    state: SearchState | None = _CURSOR_STATES.get(token)
+    if state is None:
+        return None
+    offset = int(offset_str)
+    products = state.candidates.records(offset, limit)
+    return {
+        "products": products,
+        "total_count": len(state.candidates),
+        "next_cursor": _next_cursor(token, state, offset + len(products)),
+    }
+
+
+def get_search_page(cursor: str, limit: int = 20) -> SearchPageOut | None:
+    """Nächste Seite einer Suche anhand des Cursors; None wenn Cursor ungültig/abgelaufen."""
+    payload = _page_payload(cursor, limit)
+    return SearchPageOut.model_validate(payload) if payload is not None else None
+
+
+def get_search_page_json(cursor: str, limit: int = 20) -> bytes | None:
+    """Wie get_search_page, aber direkt als JSON-Bytes (Schema SearchPageOut)."""
+    payload = _page_payload(cursor, limit)
+    return orjson.dumps(payload) if payload is not None else None
+
+
+def iter_search(
+    spec: ShoppingSpecOut,
+    limit: int | None = None,
+    filters: ProductFilter | None = None,
+) -> Iterator[bytes]:
+    """
+    Streaming-Variante von run_search als NDJSON-Zeilen: pro antwortendem Händler sofort
+    {"event": "batch", "data": SearchBatchOut}, zum Schluss {"event": "result", "data": SearchResultOut}.
+    Bei Cache-Treffer kommt direkt nur das Endergebnis.
+    """
+    check_catalog_db()
+    key = _cache_key(spec, filters)
+    state = SEARCH_CACHE.get(key)
+    if state is not None:
+        yield _ndjson("result", _result_payload(spec, state, _register_cursor(state), limit))
+        return
+    by_retailer: dict[str, list[RetailerProduct]] = {}
+    timed_out: list[str] = []
+    failed: list[str] = []
+    for result in iter_products(
+        query=_build_query(spec),
         category=spec.category,
-        limit_per_retailer=limit_per_retailer,
+        limit_per_retailer=LIMIT_PER_RETAILER,
         spec=spec,
-    )
-    ranked: list[RankedProductOut] = rank_products(products, spec)
-    ranking_explanation = (
-        "Bewertung nach: Gesamtkosten, Lieferfähigkeit bis Frist, "
-        "Präferenz-Match und Set-Kohärenz. Gewichte: Kosten 35%, Lieferung 35%, Präferenz 20%, Kohärenz 10%."
-    )
-    why_first_text = why_first(ranked, spec) if ranked else "Keine Produkte in den Demo-Daten gefunden."
-    return SearchResultOut(
-        shopping_spec=spec,
-        products=ranked,
-        ranking_explanation=ranking_explanation,
-        why_first=why_first_text,
-    )
+        filters=filters,
+    ):
+        if result.status == "timeout":
+            timed_out.append(result.retailer_id)
+        elif result.status == "failed":
+            failed.append(result.retailer_id)
+        else:
+            by_retailer[result.retailer_id] = result.products
+        batch = RankedCandidates(result.products, spec).records(0, limit) if result.products else []
+        yield _ndjson("batch", {"retailer_id": result.retailer_id, "status": result.status, "products": batch})
+    # Finales Ranking in fester Händler-Reihenfolge (wie run_search)
+    products = [p for retailer_id, _, _ in RETAILERS for p in by_retailer.get(retailer_id, [])]
+    state = _build_state(spec, products, timed_out, failed)
+    _cache_state(key, state)
+    yield _ndjson("result", _result_payload(spec, state, _register_cursor(state), limit))
+
+
+def _ndjson(event: str, data: dict) -> bytes:
+    return orjson.dumps({"event": event, "data": data}) + b"\n"
@@ -3,13 +3,50 @@ KI-Denkprozess: Aus Session-Daten (Brief) eine strukturierte Einkaufsliste mit B
 Ausgabe ausschließlich als JSON – keine Fließtexte.
 """
 
+import asyncio
 import json
 import re
+import threading
+import time
+import unicodedata
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable
+
+import httpx
 from serpapi import GoogleSearch
 
-from config import GOOGLE_API_KEY, GEMINI_MODEL, SERPAPI_KEY
+import llm_gateway
+from config import (
+    PLAN_LOOKUP_MAX_WORKERS,
+    PLAN_LOOKUP_TIMEOUT_SECONDS,
+    SERPAPI_CACHE_MAXSIZE,
+    SERPAPI_CACHE_PATH,
+    SERPAPI_CACHE_STALE_SECONDS,
+    SERPAPI_CACHE_TTL_SECONDS,
+    SERPAPI_KEY,
+)
+from disk_cache import DiskTTLCache
 from essen_data import search_essen
 
+# Persistenter Cache für Google-Shopping-Antworten (leerer Pfad = aus)
+SERPAPI_CACHE: DiskTTLCache | None = (
+    DiskTTLCache(
+        SERPAPI_CACHE_PATH,
+        maxsize=SERPAPI_CACHE_MAXSIZE,
+        ttl_seconds=SERPAPI_CACHE_TTL_SECONDS,
+        stale_seconds=SERPAPI_CACHE_STALE_SECONDS,
+    )
+    if SERPAPI_CACHE_PATH
+    else None
+)
+
+# Gleicher Endpunkt wie serpapi.GoogleSearch, für den async Abruf per httpx
+SERPAPI_SEARCH_URL = "https://serpapi.com/search"
+
+_lookup_executor: ThreadPoolExecutor | None = None
+_lookup_executor_lock = threading.Lock()
+
 
 def _build_plan_prompt(requirements: dict) -> str:
     return f"""Analysiere den folgenden Shopping-Brief und erzeuge eine Einkaufsliste mit sinnvoller Budgetaufteilung.
@@ -71,6 +108,7 @@ def _extract_json_from_response(text: str) -> dict | None:
             pass
     return None
 
+
 def _is_food_component(component: dict, session_category: str | None) -> bool:
     """Entscheidung: Brauchen wir die Essen-API oder Google Shopping?"""
     comp_cat = (component.get("category") or "").strip().lower()
@@ -80,39 +118,145 @@ def _is_food_component(component: dict, session_category: str | None) -> bool:
     return comp_cat == "food"
 
 
-def search_google_shopping(query: str, location: str = "Germany") -> list[dict]:
+class SerpApiError(Exception):
+    """SerpAPI hat statt Treffern einen Fehler geliefert (wird nicht gecacht)."""
+
+
+def _normalize_query(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
+
+
+def _google_shopping_request(query: str, location: str) -> tuple[str, dict]:
+    """(Cache-Schlüssel, SerpAPI-Parameter) einer Google-Shopping-Suche – gleich für sync und async."""
     params = {
         "engine": "google_shopping",
         "q": query,
         "location": location,
         "api_key": SERPAPI_KEY,
     }
-    results = GoogleSearch(params).get_dict()
+    return f"google_shopping|{_normalize_query(location)}|{_normalize_query(query)}", params
+
+
+def _shopping_results(results: dict) -> list[dict]:
+    if "error" in results and not results.get("shopping_results"):
+        raise SerpApiError(results["error"])
     return results.get("shopping_results", [])
 
-def run_shopping_plan(requirements: dict) -> dict | None:
+
+def _fetch_google_shopping(params: dict) -> list[dict]:
+    return _shopping_results(GoogleSearch(params).get_dict())
+
+
+def search_google_shopping(query: str, location: str = "Germany") -> list[dict]:
+    key, params = _google_shopping_request(query, location)
+    try:
+        if SERPAPI_CACHE is None:
+            return _fetch_google_shopping(params)
+        return SERPAPI_CACHE.get_or_fetch(key, lambda: _fetch_google_shopping(params))
+    except SerpApiError:
+        return []
+
+
+def _get_lookup_executor() -> ThreadPoolExecutor:
+    """Gemeinsamer Pool für Komponenten-Suchen; max_workers begrenzt die gleichzeitigen Aufrufe."""
+    global _lookup_executor
+    with _lookup_executor_lock:
+        if _lookup_executor is None:
+            _lookup_executor = ThreadPoolExecutor(
+                max_workers=max(1, PLAN_LOOKUP_MAX_WORKERS), thread_name_prefix="plan-lookup"
+            )
+        return _lookup_executor
+
+
+def _component_queries(component: dict) -> tuple[str, str]:
+    """(Google-Shopping-Anfrage, Essen-Anfrage) für eine Plan-Komponente."""
+    name = component.get("name", "")
+    notes = component.get("notes") or []
+    notes_str = " ".join(notes) if isinstance(notes, list) else str(notes)
+    query_full = f"{name}, {notes_str}, {component.get('budget_min', 0)}€ bis {component.get('budget_max', 0)}€"
+    return query_full, f"{name} {notes_str}".strip() or query_full
+
+
+def _food_results(component: dict, query: str) -> list[dict]:
+    # Essen-Anfrage: statische Essen-Daten filtern (lokal, ohne Netz)
+    return search_essen(
+        query=query,
+        budget_min=component.get("budget_min"),
+        budget_max=component.get("budget_max"),
+        limit=3,
+    )
+
+
+def _lookup_component(component: dict, session_category: str | None, started: dict[int, float], key: int) -> list[dict]:
+    """Treffer für eine Plan-Komponente: Essen-Daten oder Google Shopping (SerpAPI)."""
+    started[key] = time.monotonic()
+    query, food_query = _component_queries(component)
+    if _is_food_component(component, session_category):
+        return _food_results(component, food_query)
+    # Kleidung, Sonstiges: Google Shopping (SerpAPI) wie bisher
+    return search_google_shopping(query=query, location="Germany")[:3]
+
+
+def lookup_components(
+    components: list[dict],
+    session_category: str | None,
+    timeout: float | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> None:
     """
-    Nimmt die gesammelten Session-Anforderungen (Brief) und erzeugt per KI einen
-    strukturierten Einkaufsplan mit Budgetaufteilung. Rückgabe nur JSON-Daten.
+    Sucht für alle Komponenten parallel Treffer und schreibt sie nach component["shopping_results"].
+    Fehlschlag oder Zeitüberschreitung (ab Start des Aufrufs) betrifft nur die eine Komponente:
+    sie bekommt leere Treffer und component["lookup_error"] ("timeout" bzw. Fehlermeldung).
+    on_progress(erledigt, gesamt) wird nach jeder fertigen Komponente aufgerufen.
     """
-    if not GOOGLE_API_KEY:
-        return None
+    timeout = PLAN_LOOKUP_TIMEOUT_SECONDS if timeout is None else timeout
+    executor = _get_lookup_executor()
+    started: dict[int, float] = {}
+    pending = {
+        executor.submit(_lookup_component, c, session_category, started, i): i
+        for i, c in enumerate(components)
+    }
 
-    from google import genai
+    done_count = 0
+
+    def finish(i: int, results: list[dict], error: str | None = None) -> None:
+        nonlocal done_count
+        components[i]["shopping_results"] = results
+        if error:
+            components[i]["lookup_error"] = error
+        done_count += 1
+        if on_progress:
+            on_progress(done_count, len(components))
+
+    while pending:
+        now = time.monotonic()
+        for f in [f for f, i in pending.items() if i in started and now >= started[i] + timeout]:
+            f.cancel()
+            finish(pending.pop(f), [], "timeout")
+        if not pending:
+            break
+        # Noch nicht gestartete Aufrufe warten auf einen freien Worker; dann spätestens nach timeout erneut prüfen
+        next_limit = min([now + timeout] + [started[i] + timeout for i in pending.values() if i in started])
+        done, _ = wait(pending, timeout=max(0.0, next_limit - now), return_when=FIRST_COMPLETED)
+        for f in done:
+            i = pending.pop(f)
+            try:
+                finish(i, list(f.result()))
+            except Exception as exc:
+                finish(i, [], f"{type(exc).__name__}: {exc}")
+
+
+def _plan_config():
     from google.genai import types
 
-    client = genai.Client(api_key=GOOGLE_API_KEY)
-    prompt = _build_plan_prompt(requirements)
-
-    response = client.models.generate_content(
-        model=GEMINI_MODEL,
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            temperature=0.3,
-            response_mime_type="application/json",
-        ),
+    return types.GenerateContentConfig(
+        temperature=0.3,
+        response_mime_type="application/json",
     )
 
+
+def _plan_from_response(response, requirements: dict) -> dict | None:
+    """Plan-JSON aus der Modellantwort; None, wenn die Antwort leer oder kein JSON ist."""
     if not response.candidates or not response.candidates[0].content:
         return None
 
@@ -139,33 +283,127 @@ def run_shopping_plan(requirements: dict) -> dict | None:
         plan["currency"] = requirements["budget_currency"] or "EUR"
     if "currency" not in plan:
         plan["currency"] = "EUR"
+    return plan
 
 
+def run_shopping_plan(
+    requirements: dict,
+    on_progress: Callable[[str, int, int], None] | None = None,
+) -> dict | None:
+    """
+    Nimmt die gesammelten Session-Anforderungen (Brief) und erzeugt per KI einen
+    strukturierten Einkaufsplan mit Budgetaufteilung. Rückgabe nur JSON-Daten.
+    on_progress(schritt, erledigt, gesamt): "plan" vor dem KI-Aufruf, dann "lookup" je Komponente.
+    """
+    if not llm_gateway.is_configured():
+        return None
 
-    session_category = requirements.get("category")
-    for component in plan["components"]:
-        name = component.get("name", "")
-        notes = component.get("notes") or []
-        notes_str = " ".join(notes) if isinstance(notes, list) else str(notes)
-        query_full = f"{name}, {notes_str}, {component.get('budget_min', 0)}€ bis {component.get('budget_max', 0)}€"
-        if _is_food_component(component, session_category):
-            # Essen-Anfrage: statische Essen-Daten filtern (nur im Quellcode)
-            component["shopping_results"] = search_essen(
-                query=f"{name} {notes_str}".strip() or query_full,
-                budget_min=component.get("budget_min"),
-                budget_max=component.get("budget_max"),
-                limit=3,
-            )
-        else:
-            # Kleidung, Sonstiges: Google Shopping (SerpAPI) wie bisher
-            results = search_google_shopping(query=query_full, location="Germany")
-            component["shopping_results"] = results[:3]
+    if on_progress:
+        on_progress("plan", 0, 1)
+    response = llm_gateway.generate(_build_plan_prompt(requirements), _plan_config(), purpose="plan")
+    plan = _plan_from_response(response, requirements)
+    if plan is None:
+        return None
 
+    if on_progress:
+        on_progress("lookup", 0, len(plan["components"]))
+    lookup_components(
+        plan["components"],
+        requirements.get("category"),
+        on_progress=(lambda done, total: on_progress("lookup", done, total)) if on_progress else None,
+    )
     return plan
 
 
+# ---- Async-Variante (async-Endpunkte): Modell und SerpAPI werden awaited ----
 
+_async_lookup_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+# Langlebiger HTTP-Client je Event-Loop (Verbindungspool zu SerpAPI wird wiederverwendet)
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
 
 
+def _get_async_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None:
+        client = _async_http_clients[loop] = httpx.AsyncClient(timeout=PLAN_LOOKUP_TIMEOUT_SECONDS)
+    return client
 
 
+async def _afetch_google_shopping(params: dict) -> list[dict]:
+    response = await _get_async_http_client().get(SERPAPI_SEARCH_URL, params={**params, "output": "json"})
+    try:
+        results = response.json()
+    except ValueError:
+        response.raise_for_status()
+        raise
+    return _shopping_results(results)
+
+
+async def asearch_google_shopping(query: str, location: str = "Germany") -> list[dict]:
+    """Wie search_google_shopping, aber über httpx.AsyncClient (gleicher Cache-Schlüssel)."""
+    key, params = _google_shopping_request(query, location)
+    try:
+        if SERPAPI_CACHE is None:
+            return await _afetch_google_shopping(params)
+        return await SERPAPI_CACHE.aget_or_fetch(key, lambda: _afetch_google_shopping(params))
+    except SerpApiError:
+        return []
+
+
+async def _alookup_component(component: dict, session_category: str | None) -> list[dict]:
+    query, food_query = _component_queries(component)
+    if _is_food_component(component, session_category):
+        # Lokale Daten ohne Netz: direkt im Event-Loop
+        return _food_results(component, food_query)
+    results = await asearch_google_shopping(query=query, location="Germany")
+    return results[:3]
+
+
+async def alookup_components(
+    components: list[dict],
+    session_category: str | None,
+    timeout: float | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> None:
+    """
+    Wie lookup_components, aber als Tasks im Event-Loop: höchstens PLAN_LOOKUP_MAX_WORKERS Suchen
+    gleichzeitig, Zeitlimit ab Start der jeweiligen Suche, Fehler nur für die eine Komponente.
+    """
+    timeout = PLAN_LOOKUP_TIMEOUT_SECONDS if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    slots = _async_lookup_slots.get(loop)
+    if slots is None:
+        slots = _async_lookup_slots[loop] = asyncio.Semaphore(max(1, PLAN_LOOKUP_MAX_WORKERS))
+    done_count = 0
+
+    async def one(component: dict) -> None:
+        nonlocal done_count
+        async with slots:
+            try:
+                component["shopping_results"] = list(
+                    await asyncio.wait_for(_alookup_component(component, session_category), timeout)
+                )
+            except asyncio.TimeoutError:
+                component["shopping_results"] = []
+                component["lookup_error"] = "timeout"
+            except Exception as exc:
+                component["shopping_results"] = []
+                component["lookup_error"] = f"{type(exc).__name__}: {exc}"
+        done_count += 1
+        if on_progress:
+            on_progress(done_count, len(components))
+
+    await asyncio.gather(*(one(c) for c in components))
+
+
+async def arun_shopping_plan(requirements: dict) -> dict | None:
+    """Wie run_shopping_plan, aber Modellaufruf und Komponenten-Suchen werden awaited."""
+    if not llm_gateway.is_configured():
+        return None
+    response = await llm_gateway.agenerate(_build_plan_prompt(requirements), _plan_config(), purpose="plan")
+    plan = _plan_from_response(response, requirements)
+    if plan is None:
+        return None
+    await alookup_components(plan["components"], requirements.get("category"))
+    return plan
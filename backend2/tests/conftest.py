@@ -0,0 +1,11 @@
+"""Testumgebung: eigene Wegwerf-DB, Fake-Sprachmodell, keine externen Caches (vor dem ersten Import von config)."""
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/app.db"
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["LLM_FAKE_LATENCY_SECONDS"] = "0"
+os.environ["SERPAPI_CACHE_PATH"] = ""
+os.environ["CATALOG_DB_PATH"] = ""
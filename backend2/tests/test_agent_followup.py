@@ -0,0 +1,34 @@
+"""Lokale Rückfragen (agent._local_followup) und Sprachwahl für den Rückfrage-Modus."""
+from agent import _SAVED_REPLY, _is_german, _local_followup
+
+UPDATE_PARTY = {"name": "update_shopping_requirements", "arguments": {"reason": "party", "category": "clothing"}}
+NO_CHANGE = {"name": "update_shopping_requirements", "arguments": {}}
+
+
+def _history(*messages: tuple[str, str]) -> list[dict]:
+    return [{"role": role, "content": content} for role, content in messages]
+
+
+def test_earlier_answered_questions_do_not_close_the_brief():
+    history = _history(
+        ("user", "Hallo"), ("assistant", "Wofür brauchst du es?"),
+        ("user", "Party"), ("assistant", "Welches Budget hast du?"),
+        ("user", "Ich brauche ein Party-Outfit"),
+    )
+    text, calls = _local_followup(history, {"budget_max": 100}, [UPDATE_PARTY])
+    assert text == "Bis wann brauchst du es?" and calls == []
+
+
+def test_unanswered_question_closes_after_two_asks():
+    brief = {"reason": "party", "category": "clothing"}
+    once = _history(("user", "Party"), ("assistant", "Welches Budget hast du?"), ("user", "weiß nicht"))
+    assert _local_followup(once, brief, [NO_CHANGE]) == ("Welches Budget hast du?", [])
+    twice = once + _history(("assistant", "Welches Budget hast du?"), ("user", "egal"))
+    text, calls = _local_followup(twice, brief, [NO_CHANGE])
+    assert text == _SAVED_REPLY and calls[0]["name"] == "mark_requirements_complete"
+
+
+def test_language_detection():
+    assert _is_german(_history(("user", "Ich brauche was für eine Party")))
+    assert _is_german(_history(("user", "200€")))
+    assert not _is_german(_history(("user", "I need an outfit for the party")))
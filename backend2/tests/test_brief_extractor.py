@@ -0,0 +1,74 @@
+"""Regelbasierte Brief-Erkennung (brief_extractor) – Fehlalarme und Datumsformate."""
+from datetime import date
+
+import pytest
+
+from brief_extractor import extract_brief, is_brief_complete
+
+TODAY = date(2026, 10, 17)
+
+
+def test_greeting_is_not_a_deadline():
+    brief = extract_brief("Guten Morgen! Ich brauche ein Party-Outfit für 300€", TODAY)
+    assert "delivery_deadline" not in brief
+    assert brief["reason"] == "party"
+    assert not is_brief_complete(brief)
+
+
+@pytest.mark.parametrize("text", ["morgens geliefert", "Guten Morgen"])
+def test_morgen_needs_whole_word(text):
+    assert "delivery_deadline" not in extract_brief(text, TODAY)
+
+
+def test_tomorrow_and_day_after():
+    assert extract_brief("Ich brauche es morgen", TODAY)["delivery_deadline"] == "2026-10-18"
+    assert extract_brief("Ich brauche es übermorgen", TODAY)["delivery_deadline"] == "2026-10-19"
+
+
+def test_occasion_needs_word_boundary():
+    brief = extract_brief("Skinny Jeans für eine Hochzeit", TODAY)
+    assert brief["reason"] == "hochzeit"
+
+
+@pytest.mark.parametrize("text, reason", [
+    ("Ski-Outfit", "ski"),
+    ("Skijacke für den Skiurlaub", "ski"),
+    ("Snacks für den Hackathon", "hackathon"),
+    ("Geburtstagsparty am Samstag", "party"),
+])
+def test_occasion_keywords(text, reason):
+    assert extract_brief(text, TODAY)["reason"] == reason
+
+
+def test_invalid_dot_date_falls_through_to_relative():
+    assert extract_brief("Budget 12.50. in 5 Tagen", TODAY) == {"delivery_deadline": "2026-10-22"}
+
+
+def test_invalid_date_uses_next_valid_match():
+    assert extract_brief("12.50. oder bis 24.12.", TODAY)["delivery_deadline"] == "2026-12-24"
+
+
+def test_absolute_dates():
+    assert extract_brief("bis 2026-11-03", TODAY)["delivery_deadline"] == "2026-11-03"
+    assert extract_brief("bis 3. November", TODAY)["delivery_deadline"] == "2026-11-03"
+    assert extract_brief("bis 1.3.", TODAY)["delivery_deadline"] == "2027-03-01"
+
+
+def test_weak_hits_do_not_close_brief():
+    brief = extract_brief("Mai Tai Cocktail Party 50€ in einer Woche", TODAY)
+    assert brief["budget_max"] == 50 and brief["delivery_deadline"] == "2026-10-24"
+    assert not is_brief_complete(brief)
+
+
+def test_prompt_example_closes_brief():
+    brief = extract_brief("Ski-Outfit, 400€, Größe M, in 5 Tagen", TODAY)
+    assert brief == {
+        "budget_max": 400.0,
+        "budget_currency": "EUR",
+        "delivery_deadline": "2026-10-22",
+        "preferences": ["Größe M"],
+        "reason": "ski",
+        "event_type": "ski",
+        "category": "clothing",
+    }
+    assert is_brief_complete(brief)
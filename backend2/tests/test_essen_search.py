@@ -0,0 +1,35 @@
+"""Essen-Suche: Katalog-DB (Trigramm-Index) und In-Memory-Index liefern dieselben Treffer."""
+import pytest
+
+import config
+import essen_data
+from ingest_catalog import essen_products
+from retailers.sqlite_catalog import ingest_products, search_catalog_substring
+
+QUERIES = [
+    "Chips", "chip", "Kaffee", "saft", "Orangen Saft", "Pringles Chips Rewe", "er", "bär", "Äpfel",
+    "Erdbeere Marmelade", "Wasser still", "Club-Mate", "Party Snacks", "rewe", "1l", "x", "", "zzz",
+]
+BUDGETS = [(None, None), (None, 2.0), (1.5, 5.0), (10.0, None)]
+
+
+@pytest.fixture
+def catalog_db(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "catalog.db")
+    ingest_products(db_path, "essen", "Essen", essen_products())
+    monkeypatch.setattr(config, "CATALOG_DB_PATH", db_path)
+    return db_path
+
+
+@pytest.mark.parametrize("budget_min,budget_max", BUDGETS)
+@pytest.mark.parametrize("query", QUERIES)
+def test_catalog_db_matches_in_memory_index(catalog_db, monkeypatch, query, budget_min, budget_max):
+    from_db = essen_data.search_essen(query, budget_min, budget_max, limit=5)
+    # Ohne Katalog-DB läuft search_essen über EssenIndex
+    monkeypatch.setattr(config, "CATALOG_DB_PATH", "")
+    assert from_db == essen_data.search_essen(query, budget_min, budget_max, limit=5)
+
+
+def test_substring_match_in_catalog_db(catalog_db):
+    products = search_catalog_substring(catalog_db, "essen", "Chips", limit=5)
+    assert [p.title for p in products] == ["Pringles Original Chips 165g", "Lorenz Crunchips Paprika 175g"]
@@ -0,0 +1,34 @@
+"""Migrationen gegen models.py: eine frisch migrierte DB muss genau das Schema der Modelle haben."""
+from sqlalchemy import create_engine, inspect
+
+import migrations
+from models import Base  # über models importiert, damit alle Tabellen an Base registriert sind
+
+
+def _schema(engine) -> dict:
+    insp = inspect(engine)
+    return {
+        table: (
+            {c["name"]: (str(c["type"]), c["nullable"]) for c in insp.get_columns(table)},
+            sorted((i["name"], tuple(i["column_names"]), bool(i["unique"])) for i in insp.get_indexes(table)),
+            sorted(tuple(u["column_names"]) for u in insp.get_unique_constraints(table)),
+        )
+        for table in insp.get_table_names()
+        if table != "schema_version"
+    }
+
+
+def test_migrated_schema_matches_models(tmp_path):
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    assert migrations.migrate(migrated) == migrations.LATEST
+    reference_engine = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    Base.metadata.create_all(reference_engine)
+    # Weicht das ab, fehlt für eine Änderung an models.py die Migration
+    assert _schema(migrated) == _schema(reference_engine)
+
+
+def test_migrate_is_idempotent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    assert migrations.migrate(engine) == migrations.LATEST
+    assert migrations.migrate(engine) == migrations.LATEST
+    assert migrations.current_version(engine) == migrations.LATEST
@@ -0,0 +1,20 @@
+"""SQL-Queries pro Endpunkt (benchmarks.query_counts): Budget und keine mit der Session wachsenden Lese-Queries."""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.query_counts import BUDGETS, measure, within_budget
+
+
+@pytest.fixture(scope="module")
+def query_counts():
+    with TestClient(main.app) as client:
+        return measure(client, items=20)
+
+
+@pytest.mark.parametrize("endpoint", list(BUDGETS))
+def test_query_budget(query_counts, endpoint):
+    small, large = query_counts[endpoint]
+    assert within_budget(endpoint, small, large), (
+        f"{endpoint}: {small[0]} / {large[0]} Queries, davon {small[1]} / {large[1]} lesend (Budget {BUDGETS[endpoint]})"
+    )
@@ -0,0 +1,34 @@
+"""Zeitlimits der Händler-Suche (retailers.base): pro Händler und gesamt, auch ohne Parallelität."""
+import time
+
+import pytest
+
+from retailers.base import search_all_retailers
+
+
+def _slow(query, category, limit):
+    time.sleep(2.0)
+    return []
+
+
+def _fast(query, category, limit):
+    return []
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_single_slow_retailer_times_out(concurrent):
+    started = time.monotonic()
+    outcome = search_all_retailers(
+        [("slow", _slow, "Slow")], query="x", concurrent=concurrent, retailer_timeout=0.3, deadline=0.5,
+    )
+    assert outcome.timed_out == ["slow"]
+    assert time.monotonic() - started < 1.0
+
+
+def test_sequential_respects_deadline_across_retailers():
+    retailers = [("slow", _slow, "Slow"), ("late", _slow, "Late"), ("fast", _fast, "Fast")]
+    started = time.monotonic()
+    outcome = search_all_retailers(retailers, query="x", concurrent=False, retailer_timeout=0.3, deadline=0.5)
+    # slow nach 0,3 s, late an der Frist (0,5 s), fast startet erst nach der Frist
+    assert outcome.timed_out == ["slow", "late", "fast"]
+    assert time.monotonic() - started < 1.0
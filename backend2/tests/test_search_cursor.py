@@ -0,0 +1,33 @@
+"""Cursor-Seiten der Suche (search_service): unabhängig vom Such-Cache."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import search_service
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Eigener Prozess, weil config die Umgebungsvariablen beim Import liest
+_NEXT_PAGE_SCRIPT = """
+import search_service
+from schemas import ShoppingSpecOut
+
+first = search_service.run_search(ShoppingSpecOut(reason="ski", category="clothing", must_haves=["jacke"]), limit=2)
+assert first.next_cursor is not None
+page = search_service.get_search_page(first.next_cursor, limit=2)
+assert page is not None and page.total_count == first.total_count
+assert {p.product_id for p in page.products}.isdisjoint(p.product_id for p in first.products)
+"""
+
+
+def test_next_page_with_search_cache_disabled():
+    env = {**os.environ, "SEARCH_CACHE_MAXSIZE": "0", "CATALOG_DB_PATH": ""}
+    result = subprocess.run(
+        [sys.executable, "-c", _NEXT_PAGE_SCRIPT], cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_unknown_cursor_returns_none():
+    assert search_service.get_search_page("unbekannt:2") is None